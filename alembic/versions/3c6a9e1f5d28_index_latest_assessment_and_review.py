@@ -0,0 +1,36 @@
+"""index latest assessment and review per claim
+
+Revision ID: 3c6a9e1f5d28
+Revises: 8f41c6d2b9a7
+Create Date: 2026-10-20 11:26:04.917352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c6a9e1f5d28'
+down_revision: Union[str, None] = '8f41c6d2b9a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The export joins each claim to its newest assessment and review (ORDER BY id DESC LIMIT 1 per claim)
+INDEXES = {
+    'ix_damage_assessments_claim_id_id': ('damage_assessments', '(claim_id, id)'),
+    'ix_senior_reviews_claim_id_id': ('senior_reviews', '(claim_id, id)'),
+}
+
+
+def upgrade() -> None:
+    # Built CONCURRENTLY outside the migration transaction so stage writes are not blocked
+    with op.get_context().autocommit_block():
+        for name, (table, columns) in INDEXES.items():
+            op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} {}".format(name, table, columns))
+
+
+def downgrade() -> None:
+    for name, (table, _) in INDEXES.items():
+        op.drop_index(name, table_name=table)
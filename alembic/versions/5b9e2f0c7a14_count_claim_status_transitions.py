@@ -0,0 +1,62 @@
+"""count claim status transitions in sharded rollups
+
+Revision ID: 5b9e2f0c7a14
+Revises: e3a7c94d1f60
+Create Date: 2026-10-20 09:12:40.518273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9e2f0c7a14'
+down_revision: Union[str, None] = 'e3a7c94d1f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = ('estimates', 'line_items', 'estimated_cost', 'approvals', 'denials', 'escalations', 'approved_amount')
+
+
+def upgrade() -> None:
+    op.add_column('senior_reviews', sa.Column('claim_status', sa.String(length=32), nullable=True))
+    # Existing reviews: the first approval or denial of each claim decided it, and its first
+    # escalation escalated it; later reviews of the same claim did not move it
+    for statuses in ("'approved', 'denied'", "'escalated'"):
+        op.execute("""
+            UPDATE senior_reviews SET claim_status = review_data ->> 'status'
+            WHERE id IN (
+                SELECT DISTINCT ON (claim_id) id FROM senior_reviews
+                WHERE claim_id IS NOT NULL AND review_data ->> 'status' IN ({statuses})
+                ORDER BY claim_id, id
+            )
+        """.format(statuses=statuses))
+
+    op.add_column('claim_daily_rollups', sa.Column('shard', sa.SmallInteger(), server_default='0', nullable=False))
+    op.drop_constraint('claim_daily_rollups_pkey', 'claim_daily_rollups', type_='primary')
+    op.create_primary_key(
+        'claim_daily_rollups_pkey', 'claim_daily_rollups', ['day', 'damage_type', 'damage_severity', 'shard']
+    )
+    # Re-run `python -m app.analytics rebuild` afterwards to drop repeat reviews from the rollups
+
+
+def downgrade() -> None:
+    # Fold every shard into shard 0 before restoring the one-row-per-key primary key
+    op.execute("""
+        INSERT INTO claim_daily_rollups (day, damage_type, damage_severity, shard, {columns})
+        SELECT day, damage_type, damage_severity, 0, {sums}
+        FROM claim_daily_rollups WHERE shard <> 0
+        GROUP BY day, damage_type, damage_severity
+        ON CONFLICT (day, damage_type, damage_severity, shard) DO UPDATE SET {updates}
+    """.format(
+        columns=', '.join(COUNTERS),
+        sums=', '.join('sum({})'.format(column) for column in COUNTERS),
+        updates=', '.join('{0} = claim_daily_rollups.{0} + excluded.{0}'.format(column) for column in COUNTERS),
+    ))
+    op.execute("DELETE FROM claim_daily_rollups WHERE shard <> 0")
+    op.drop_constraint('claim_daily_rollups_pkey', 'claim_daily_rollups', type_='primary')
+    op.create_primary_key('claim_daily_rollups_pkey', 'claim_daily_rollups', ['day', 'damage_type', 'damage_severity'])
+    op.drop_column('claim_daily_rollups', 'shard')
+    op.drop_column('senior_reviews', 'claim_status')
@@ -0,0 +1,37 @@
+"""index auto-adjudication lookups
+
+Revision ID: 8f41c6d2b9a7
+Revises: 5b9e2f0c7a14
+Create Date: 2026-10-20 10:03:17.284511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f41c6d2b9a7'
+down_revision: Union[str, None] = '5b9e2f0c7a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Each /api/auto-adjudicate batch probes senior_reviews for a review of every pending estimate
+# (the NOT EXISTS in fetch_pending_estimates) and counts recent claims per policy number
+INDEXES = {
+    'ix_senior_reviews_repair_estimate_id': ('senior_reviews', '(repair_estimate_id)'),
+    'ix_claims_policy_number_created_at': ('claims', '(policy_number, created_at)'),
+}
+
+
+def upgrade() -> None:
+    # Built CONCURRENTLY outside the migration transaction so claim writes are not blocked
+    with op.get_context().autocommit_block():
+        for name, (table, columns) in INDEXES.items():
+            op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} {}".format(name, table, columns))
+
+
+def downgrade() -> None:
+    for name, (table, _) in INDEXES.items():
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,87 @@
+"""add search vectors
+
+Revision ID: e3a7c94d1f60
+Revises: 9c5d2e61b7f3
+Create Date: 2026-10-19 17:20:14.218305
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7c94d1f60'
+down_revision: Union[str, None] = '9c5d2e61b7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows updated per backfill transaction
+BACKFILL_BATCH_SIZE = int(os.getenv("SEARCH_BACKFILL_BATCH_SIZE", "10000"))
+
+# table -> (JSON column, key) of the text searched; keep in step with app/search.py
+DOCUMENTS = {
+    'damage_assessments': ('assessment_data', 'reasoning'),
+    'senior_reviews': ('review_data', 'denial_comments'),
+    'system_logs': ('log_data', 'comments'),
+}
+INDEX_WHERE = {
+    'system_logs': "WHERE log_type = 'claim_denial'",
+}
+
+
+def _to_tsvector(column: str, key: str) -> str:
+    return "to_tsvector('english', coalesce({} ->> '{}', ''))".format(column, key)
+
+
+def upgrade() -> None:
+    # A plain column kept current by a trigger rather than a GENERATED column: adding a
+    # generated column rewrites the whole table under an exclusive lock, while this way
+    # existing rows are backfilled in short batches and new writes are covered from the start.
+    for table, (column, key) in DOCUMENTS.items():
+        op.add_column(table, sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute("""
+            CREATE FUNCTION {table}_search_vector() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {expression};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """.format(table=table, expression=_to_tsvector('NEW.' + column, key)))
+        op.execute("""
+            CREATE TRIGGER {table}_search_vector
+            BEFORE INSERT OR UPDATE OF {column} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()
+        """.format(table=table, column=column))
+
+    # Backfill and index outside the migration transaction: each batch commits on its own
+    # and the GIN indexes are built CONCURRENTLY, so writers are never blocked for long
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        for table, (column, key) in DOCUMENTS.items():
+            max_id = bind.execute(sa.text("SELECT max(id) FROM {}".format(table))).scalar() or 0
+            for start in range(0, max_id, BACKFILL_BATCH_SIZE):
+                bind.execute(
+                    sa.text(
+                        "UPDATE {table} SET search_vector = {expression} "
+                        "WHERE id > :start AND id <= :stop AND search_vector IS NULL".format(
+                            table=table, expression=_to_tsvector(column, key)
+                        )
+                    ),
+                    {"start": start, "stop": start + BACKFILL_BATCH_SIZE},
+                )
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search_vector "
+                "ON {table} USING gin (search_vector) {where}".format(table=table, where=INDEX_WHERE.get(table, ''))
+            )
+
+
+def downgrade() -> None:
+    for table in DOCUMENTS:
+        op.drop_index('ix_{}_search_vector'.format(table), table_name=table)
+        op.execute("DROP TRIGGER IF EXISTS {table}_search_vector ON {table}".format(table=table))
+        op.execute("DROP FUNCTION IF EXISTS {table}_search_vector()".format(table=table))
+        op.drop_column(table, 'search_vector')
@@ -0,0 +1,300 @@
+"""Declarative, vectorized auto-adjudication of pending repair estimates.
+
+Rules are plain data (see DEFAULT_RULES, or a JSON file named by
+ADJUDICATION_RULES_PATH). They are compiled once into NumPy arrays of
+bounds and damage-type bitmasks, and a batch of estimates is evaluated as
+an (estimates x rules) boolean matrix. Rules are checked in order and the
+first match decides; estimates matching no rule get DEFAULT_ACTION.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Literal, Optional, Sequence
+
+from pydantic import BaseModel
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Claim, RepairEstimate, SeniorReview
+
+
+Action = Literal["approve", "route", "escalate"]
+
+DEFAULT_ACTION = "route"
+
+# Review status written for each action
+ACTION_STATUS = {"approve": "approved", "route": "routed", "escalate": "escalated"}
+# Claim status each action moves the claim to; routed claims stay in the review queue
+ACTION_CLAIM_STATUS = {"approve": "approved", "route": "pending_review", "escalate": "escalated"}
+
+AUTO_REVIEWER_ID = "auto_adjudicator"
+
+# One bit per known damage type; anything else maps to OTHER
+DAMAGE_TYPE_BITS = {"scratches": 1, "dents": 2, "structural_damage": 4}
+OTHER_DAMAGE_TYPE_BIT = 8
+
+# Window used for the repeat-policy frequency feature
+POLICY_CLAIM_WINDOW_DAYS = int(os.getenv("ADJUDICATION_POLICY_WINDOW_DAYS", "365"))
+
+
+class AdjudicationRule(BaseModel):
+    """One rule; every condition that is set must hold for the rule to match."""
+    name: str
+    action: Action
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    damage_types_any: Optional[List[str]] = None  # at least one of these types present
+    damage_types_none: Optional[List[str]] = None  # none of these types present
+    major_damage_types_any: Optional[List[str]] = None  # at least one of these present with major severity
+    min_major_count: Optional[int] = None
+    max_major_count: Optional[int] = None
+    min_major_ratio: Optional[float] = None
+    max_major_ratio: Optional[float] = None
+    min_policy_claims: Optional[int] = None  # claims on the same policy within the window
+    max_policy_claims: Optional[int] = None
+
+
+DEFAULT_RULES = [
+    {"name": "escalate_major_structural", "action": "escalate", "major_damage_types_any": ["structural_damage"]},
+    {"name": "escalate_high_value", "action": "escalate", "min_amount": 5000},
+    {"name": "escalate_repeat_policy", "action": "escalate", "min_policy_claims": 3},
+    {
+        "name": "approve_low_value_cosmetic",
+        "action": "approve",
+        "max_amount": 1500,
+        "damage_types_none": ["structural_damage"],
+        "max_major_count": 1,
+    },
+    {"name": "route_structural", "action": "route", "damage_types_any": ["structural_damage"]},
+    {"name": "approve_moderate_minor", "action": "approve", "max_amount": 3000, "max_major_ratio": 0.5},
+]
+
+
+def _type_mask(damage_types: Optional[Sequence[str]]) -> int:
+    mask = 0
+    for damage_type in damage_types or ():
+        mask |= DAMAGE_TYPE_BITS.get(damage_type.replace(" ", "_"), OTHER_DAMAGE_TYPE_BIT)
+    return mask
+
+
+class CompiledRules:
+    """Rules flattened into per-condition arrays (one entry per rule) for batch evaluation."""
+
+    def __init__(self, rules: Sequence[AdjudicationRule]):
+        import numpy as np
+
+        self.rules = list(rules)
+        self.names = [rule.name for rule in self.rules] + ["default"]
+        self.actions = [rule.action for rule in self.rules] + [DEFAULT_ACTION]
+        self.version = hashlib.sha256(
+            json.dumps([rule.model_dump() for rule in self.rules], sort_keys=True).encode()
+        ).hexdigest()[:12]
+
+        def bounds(attr: str, default: float):
+            return np.array(
+                [default if getattr(rule, attr) is None else getattr(rule, attr) for rule in self.rules],
+                dtype=np.float64,
+            )
+
+        self.min_amount = bounds("min_amount", -np.inf)
+        self.max_amount = bounds("max_amount", np.inf)
+        self.min_major_count = bounds("min_major_count", -np.inf)
+        self.max_major_count = bounds("max_major_count", np.inf)
+        self.min_major_ratio = bounds("min_major_ratio", -np.inf)
+        self.max_major_ratio = bounds("max_major_ratio", np.inf)
+        self.min_policy_claims = bounds("min_policy_claims", -np.inf)
+        self.max_policy_claims = bounds("max_policy_claims", np.inf)
+        self.types_any = np.array([_type_mask(rule.damage_types_any) for rule in self.rules], dtype=np.uint8)
+        self.types_none = np.array([_type_mask(rule.damage_types_none) for rule in self.rules], dtype=np.uint8)
+        self.major_types_any = np.array(
+            [_type_mask(rule.major_damage_types_any) for rule in self.rules], dtype=np.uint8
+        )
+
+    def evaluate(self, features: Dict[str, Any]):
+        """Return the index (into names/actions) of the deciding rule for each estimate."""
+        import numpy as np
+
+        if not self.rules:
+            return np.full(len(features["amount"]), 0, dtype=np.int64)
+
+        amount = features["amount"][:, None]
+        type_mask = features["type_mask"][:, None]
+        major_type_mask = features["major_type_mask"][:, None]
+        major_count = features["major_count"][:, None]
+        major_ratio = features["major_ratio"][:, None]
+        policy_claims = features["policy_claims"][:, None]
+
+        matches = (
+            (amount >= self.min_amount) & (amount <= self.max_amount)
+            & (major_count >= self.min_major_count) & (major_count <= self.max_major_count)
+            & (major_ratio >= self.min_major_ratio) & (major_ratio <= self.max_major_ratio)
+            & (policy_claims >= self.min_policy_claims) & (policy_claims <= self.max_policy_claims)
+            & ((self.types_any == 0) | ((type_mask & self.types_any) != 0))
+            & ((type_mask & self.types_none) == 0)
+            & ((self.major_types_any == 0) | ((major_type_mask & self.major_types_any) != 0))
+        )
+        # First matching rule wins; no match falls through to the default action
+        return np.where(matches.any(axis=1), matches.argmax(axis=1), len(self.rules))
+
+
+def approved_amount(estimate_data: Dict[str, Any]) -> float:
+    """Amount to approve for an estimate (same basis as the agent's review)."""
+    total_parts_cost = estimate_data.get("total_parts_cost", 0) or 0
+    total_labor_cost = estimate_data.get("total_labor_cost", 0) or 0
+    if total_parts_cost or total_labor_cost:
+        return float(total_parts_cost + total_labor_cost)
+    return float(estimate_data.get("total_base_cost", 0) or 0)
+
+
+def extract_features(estimates: Sequence[Dict[str, Any]], policy_claims: Sequence[int]) -> Dict[str, Any]:
+    """Build columnar feature arrays from estimate_data payloads."""
+    import numpy as np
+
+    # Parse the JSON payloads into plain lists once, then convert each column in one go
+    amount, type_mask, major_type_mask, major_count, item_count = [], [], [], [], []
+    for estimate_data in estimates:
+        types = majors = count = major = 0
+        for item in estimate_data.get("line_items") or ():
+            bit = DAMAGE_TYPE_BITS.get(item.get("damage_type"), OTHER_DAMAGE_TYPE_BIT)
+            types |= bit
+            count += 1
+            if item.get("damage_severity") == "major":
+                majors |= bit
+                major += 1
+        amount.append(approved_amount(estimate_data))
+        type_mask.append(types)
+        major_type_mask.append(majors)
+        major_count.append(major)
+        item_count.append(count)
+
+    major_counts = np.array(major_count, dtype=np.float64)
+    return {
+        "amount": np.array(amount, dtype=np.float64),
+        "type_mask": np.array(type_mask, dtype=np.uint8),
+        "major_type_mask": np.array(major_type_mask, dtype=np.uint8),
+        "major_count": major_counts,
+        "major_ratio": major_counts / np.maximum(np.array(item_count, dtype=np.float64), 1),
+        "policy_claims": np.asarray(policy_claims, dtype=np.float64),
+    }
+
+
+def load_rules() -> List[AdjudicationRule]:
+    path = os.getenv("ADJUDICATION_RULES_PATH")
+    if path:
+        with open(path) as f:
+            raw = json.load(f)
+        raw = raw["rules"] if isinstance(raw, dict) else raw
+    else:
+        raw = DEFAULT_RULES
+    return [AdjudicationRule(**rule) for rule in raw]
+
+
+_compiled: Optional[CompiledRules] = None
+_compiled_lock = threading.Lock()
+
+
+def get_compiled_rules() -> CompiledRules:
+    """Compile the configured rules once per process."""
+    global _compiled
+    if _compiled is None:
+        with _compiled_lock:
+            if _compiled is None:
+                _compiled = CompiledRules(load_rules())
+    return _compiled
+
+
+def fetch_pending_estimates(db: Session, limit: int):
+    """Latest estimates of claims awaiting review with no senior review yet, locking the claims.
+
+    Superseded estimates and claims already decided or escalated are never picked up, and claims
+    currently leased to a reviewer through the review queue are left alone. The claim rows stay
+    locked until commit, so a concurrent review or new estimate waits for the decisions to land.
+    """
+    now = datetime.now(timezone.utc)
+    has_review = select(SeniorReview.id).where(SeniorReview.repair_estimate_id == RepairEstimate.id).exists()
+    query = (
+        select(RepairEstimate.id, Claim.id.label("claim_id"), RepairEstimate.estimate_data, Claim.policy_number)
+        .select_from(Claim)
+        .join(RepairEstimate, RepairEstimate.id == Claim.latest_estimate_id)
+        .where(
+            Claim.status == "pending_review",
+            ~has_review,
+            or_(Claim.lease_expires_at.is_(None), Claim.lease_expires_at < now),
+        )
+        .order_by(Claim.id)
+        .limit(limit)
+        .with_for_update(of=Claim, skip_locked=True)
+    )
+    return db.execute(query).all()
+
+
+def policy_claim_counts(db: Session, policy_numbers: Sequence[Optional[str]]) -> Dict[str, int]:
+    """Claims per policy number within the repeat-policy window."""
+    distinct = sorted({p for p in policy_numbers if p})
+    if not distinct:
+        return {}
+    since = datetime.now(timezone.utc) - timedelta(days=POLICY_CLAIM_WINDOW_DAYS)
+    rows = db.execute(
+        select(Claim.policy_number, func.count(Claim.id))
+        .where(Claim.policy_number.in_(distinct), Claim.created_at >= since)
+        .group_by(Claim.policy_number)
+    ).all()
+    return {policy_number: count for policy_number, count in rows}
+
+
+def adjudicate_pending(db: Session, limit: int, rules: Optional[CompiledRules] = None) -> List[Dict[str, Any]]:
+    """Evaluate up to `limit` pending estimates and return one decision per estimate."""
+    rules = rules or get_compiled_rules()
+    rows = fetch_pending_estimates(db, limit)
+    if not rows:
+        return []
+
+    counts = policy_claim_counts(db, [row.policy_number for row in rows])
+    features = extract_features(
+        [row.estimate_data or {} for row in rows],
+        [counts.get(row.policy_number, 0) for row in rows],
+    )
+    decided = rules.evaluate(features)
+
+    return [
+        {
+            "estimate_id": row.id,
+            "claim_id": row.claim_id,
+            "action": rules.actions[index],
+            "rule": rules.names[index],
+            "approved_amount": float(amount),
+        }
+        for row, index, amount in zip(rows, decided.tolist(), features["amount"].tolist())
+    ]
+
+
+def review_rows(decisions: Sequence[Dict[str, Any]], rules_version: str) -> List[Dict[str, Any]]:
+    """SeniorReview insert parameters for a batch of decisions."""
+    timestamp = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "claim_id": decision["claim_id"],
+            "repair_estimate_id": decision["estimate_id"],
+            "review_data": {
+                "status": ACTION_STATUS[decision["action"]],
+                "reviewer_id": AUTO_REVIEWER_ID,
+                "review_timestamp": timestamp,
+                "approved_amount": decision["approved_amount"] if decision["action"] == "approve" else None,
+                "rule": decision["rule"],
+                "rules_version": rules_version,
+                "requires_additional_approval": decision["action"] != "approve",
+            },
+        }
+        for decision in decisions
+    ]
+
+
+def claim_status_updates(decisions: Sequence[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Claim ids grouped by the claim status their decision moves them to."""
+    updates: Dict[str, List[int]] = {}
+    for decision in decisions:
+        if decision["claim_id"] is not None:
+            updates.setdefault(ACTION_CLAIM_STATUS[decision["action"]], []).append(decision["claim_id"])
+    return updates
@@ -0,0 +1,229 @@
+"""Admission control: per-route concurrency limits, per-client rate limits and load shedding.
+
+Requests fall into three priority classes by route:
+
+- heavy: image analysis, bulk adjudication and exports (ADMISSION_HEAVY_ROUTES)
+- write: every other non-GET endpoint
+- read: every other GET endpoint
+
+Each request is checked, before its body is read, against:
+
+1. the overload level, the worse of recent event-loop lag over
+   ADMISSION_MAX_LOOP_LAG_MS and recent DB pool checkout wait over
+   ADMISSION_MAX_POOL_WAIT_MS. Heavy requests are shed (503) from level 1,
+   writes from level 2 and cheap reads only from level 4, so reads keep being
+   served while uploads back off;
+2. the route's concurrency limit (ADMISSION_ROUTE_LIMITS), 503 when full;
+3. a token bucket per client (X-Client-Id header, else address) for heavy and
+   write requests, 429 when empty.
+
+/api/analyze-damage additionally rate-limits per policy_number once the form
+is parsed (`check_policy_rate`). Every rejection carries Retry-After and is
+counted in admission_rejections_total; shed 503s are marked in the scope so
+they are not also counted as server errors.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.database import client_key, pool_wait
+from app.metrics import ADMISSION_REJECTED_KEY, ADMISSION_REJECTIONS, EVENT_LOOP_LAG, DecayingMax, route_template
+from app.serialization import json_dumps
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _route_limits(value: str) -> Dict[str, int]:
+    """Parse "/api/a=8,/api/b=2" into {"/api/a": 8, "/api/b": 2}."""
+    limits = {}
+    for item in value.split(","):
+        if item.strip():
+            route, limit = item.rsplit("=", 1)
+            limits[route.strip()] = int(limit)
+    return limits
+
+
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "1").lower() in ("1", "true", "yes")
+HEAVY_ROUTES = tuple(
+    route.strip()
+    for route in os.getenv(
+        "ADMISSION_HEAVY_ROUTES", "/api/analyze-damage,/api/reviews/auto-adjudicate,/api/export/claims"
+    ).split(",")
+    if route.strip()
+)
+ROUTE_LIMITS = _route_limits(os.getenv(
+    "ADMISSION_ROUTE_LIMITS", "/api/analyze-damage=8,/api/reviews/auto-adjudicate=2,/api/export/claims=2"
+))
+# Per-client token bucket for heavy and write requests (rate 0 disables it)
+CLIENT_RATE = _env_float("ADMISSION_CLIENT_RATE", 10.0)  # requests per second
+CLIENT_BURST = _env_float("ADMISSION_CLIENT_BURST", 30.0)
+# Per-policy_number token bucket for /api/analyze-damage (rate 0 disables it)
+POLICY_RATE = _env_float("ADMISSION_POLICY_RATE", 1.0)
+POLICY_BURST = _env_float("ADMISSION_POLICY_BURST", 10.0)
+# Overload thresholds: level 1 is reached at these values
+MAX_LOOP_LAG = _env_float("ADMISSION_MAX_LOOP_LAG_MS", 200.0) / 1000.0
+MAX_POOL_WAIT = _env_float("ADMISSION_MAX_POOL_WAIT_MS", 500.0) / 1000.0
+RETRY_AFTER_SECONDS = _env_float("ADMISSION_RETRY_AFTER_SECONDS", 2.0)
+
+LOOP_LAG_INTERVAL = 0.1  # seconds between event-loop lag probes
+# Overload level from which each class is shed
+SHED_LEVELS = {"heavy": 1.0, "write": 2.0, "read": 4.0}
+# Idle buckets are dropped beyond this many keys
+MAX_BUCKETS = 10000
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float):
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+
+class RateLimiter:
+    """Token buckets keyed by client or policy. Runs on the event loop thread only."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def take(self, key: str) -> float:
+        """Spend a token for `key`. Returns 0 if allowed, else seconds until a token is available."""
+        if self.rate <= 0:
+            return 0.0
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.burst)
+            if len(self.buckets) > MAX_BUCKETS:
+                # Least recently used first; an idle bucket has refilled, so forgetting it changes nothing
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        now = time.monotonic()
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+
+client_limiter = RateLimiter(CLIENT_RATE, CLIENT_BURST)
+policy_limiter = RateLimiter(POLICY_RATE, POLICY_BURST)
+loop_lag = DecayingMax()
+# The running lag probe; the event loop holds only a weak reference to its tasks
+_lag_probe: Optional["asyncio.Task[None]"] = None
+
+
+def overload_level() -> float:
+    return max(loop_lag.value() / MAX_LOOP_LAG, pool_wait.value() / MAX_POOL_WAIT)
+
+
+def request_class(method: str, route: str) -> str:
+    if route in HEAVY_ROUTES:
+        return "heavy"
+    return "read" if method in ("GET", "HEAD") else "write"
+
+
+async def _probe_loop_lag() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag = max(0.0, loop.time() - start - LOOP_LAG_INTERVAL)
+        EVENT_LOOP_LAG.observe(lag)
+        loop_lag.update(lag)
+
+
+def _retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def check_policy_rate(policy_number: Optional[str]) -> None:
+    """Raise 429 if `policy_number` is submitting analyses faster than ADMISSION_POLICY_RATE."""
+    if not ADMISSION_CONTROL_ENABLED or not policy_number:
+        return
+    wait = policy_limiter.take(policy_number)
+    if wait:
+        ADMISSION_REJECTIONS.inc("/api/analyze-damage", "policy_rate")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many submissions for this policy",
+            headers={"Retry-After": _retry_after(wait)},
+        )
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying the concurrency, rate and overload checks above."""
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight: Dict[str, int] = {}
+
+    async def _reject(self, scope, send, status: int, detail: str, retry_after: str) -> None:
+        # MetricsMiddleware leaves deliberate rejections out of http_request_errors_total
+        scope[ADMISSION_REJECTED_KEY] = True
+        body = json_dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", retry_after.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_CONTROL_ENABLED or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        global _lag_probe
+        loop = asyncio.get_running_loop()
+        if _lag_probe is None or _lag_probe.get_loop() is not loop:
+            # One lag probe per event loop, started with the first request it serves
+            _lag_probe = loop.create_task(_probe_loop_lag())
+
+        route = route_template(scope)
+        kind = request_class(scope["method"], route)
+
+        level = overload_level()
+        if level >= SHED_LEVELS[kind]:
+            ADMISSION_REJECTIONS.inc(route, "overload")
+            await self._reject(scope, send, 503, "Server overloaded, retry later", _retry_after(RETRY_AFTER_SECONDS))
+            return
+
+        limit = ROUTE_LIMITS.get(route)
+        if limit is not None and self.in_flight.get(route, 0) >= limit:
+            ADMISSION_REJECTIONS.inc(route, "concurrency")
+            await self._reject(
+                scope, send, 503, "Too many concurrent requests, retry later", _retry_after(RETRY_AFTER_SECONDS)
+            )
+            return
+
+        if kind != "read":
+            wait = client_limiter.take(client_key(Request(scope)) or "unknown")
+            if wait:
+                ADMISSION_REJECTIONS.inc(route, "client_rate")
+                await self._reject(scope, send, 429, "Too many requests", _retry_after(wait))
+                return
+
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        self.in_flight[route] = self.in_flight.get(route, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[route] -= 1
@@ -20,3 +20,6 @@ class AgentInterface(ABC):
         """Claim Approval & Authorization: Review and approve/reject estimate."""
         pass
 
+    def warm_up(self) -> None:
+        """Optionally pre-load models/dependencies before the worker accepts traffic."""
+        pass
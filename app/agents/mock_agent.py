@@ -1,13 +1,125 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from io import BytesIO
-from PIL import Image, ImageEnhance, ImageFilter
-import numpy as np
+import hashlib
+import json
+import os
 from app.agents.agent_interface import AgentInterface
+from app.metrics import track_stage
+
+
+# Image features the damage heuristics threshold on (also the columns of the app.calibration feature store)
+FEATURE_NAMES = ("edge_intensity", "edge_ratio", "dark_ratio", "contrast_variance")
+
+# Per damage type, feature -> [detection threshold, major threshold]. A damage type is detected when any of
+# its features exceeds its detection threshold, and rated major when any exceeds its major threshold.
+# Re-tune with `python -m app.calibration` and load the result through DAMAGE_THRESHOLDS_PATH.
+DEFAULT_THRESHOLDS = {
+    # Scratches: High edge intensity and linear patterns
+    "scratches": {"edge_intensity": [30, 50], "edge_ratio": [0.05, 0.1]},
+    # Dents: Dark spots/areas
+    "dents": {"dark_ratio": [0.02, 0.05]},
+    # Structural damage: High contrast variance (indicates significant damage)
+    "structural_damage": {"contrast_variance": [500, 1000]},
+}
+
+
+def thresholds_version(thresholds: Dict[str, Dict[str, List[float]]]) -> str:
+    return hashlib.sha256(json.dumps(thresholds, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def load_thresholds(path: Optional[str] = None) -> Tuple[Dict[str, Dict[str, List[float]]], str]:
+    """Thresholds and their version from a calibration config (DAMAGE_THRESHOLDS_PATH), or the defaults."""
+    path = path or os.getenv("DAMAGE_THRESHOLDS_PATH")
+    if not path:
+        return DEFAULT_THRESHOLDS, "default"
+    with open(path) as f:
+        config = json.load(f)
+    thresholds = config["thresholds"]
+    for damage_type, rules in thresholds.items():
+        unknown = set(rules) - set(FEATURE_NAMES)
+        if unknown:
+            raise ValueError("Unknown features for {} in {}: {}".format(damage_type, path, ", ".join(sorted(unknown))))
+        for name, pair in rules.items():
+            # classify() unpacks each value as (detect, major); with major below detect,
+            # every detection on that feature would be graded major
+            if (
+                not isinstance(pair, list) or len(pair) != 2
+                or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in pair)
+                or pair[0] > pair[1]
+            ):
+                raise ValueError(
+                    "Threshold {}.{} in {} must be a [detect, major] pair of numbers with detect <= major, got {!r}"
+                    .format(damage_type, name, path, pair)
+                )
+    return thresholds, config.get("version") or thresholds_version(thresholds)
+
+
+def prepare_image(img):
+    """Convert a decoded image to the RGB thumbnail the features are computed on."""
+    from PIL import Image
+
+    img = img.convert('RGB')
+    # Resize for faster processing (max 800px on longest side)
+    img.thumbnail((800, 800), Image.Resampling.LANCZOS)
+    return img
+
+
+def extract_features(img) -> Dict[str, float]:
+    """FEATURE_NAMES values for an image returned by prepare_image."""
+    from PIL import ImageEnhance, ImageFilter
+    import numpy as np
+
+    # Convert to numpy array for analysis
+    img_array = np.array(img)
+
+    # Basic image analysis
+    # 1. Detect edges (potential scratches)
+    gray = img.convert('L')
+    edges = gray.filter(ImageFilter.FIND_EDGES)
+    edge_array = np.array(edges)
+    edge_intensity = np.mean(edge_array)
+
+    # 2. Detect dark spots (potential dents)
+    dark_threshold = 50  # Pixels darker than this
+    dark_pixels = np.sum(img_array[:, :, :].mean(axis=2) < dark_threshold)
+    dark_ratio = dark_pixels / (img_array.shape[0] * img_array.shape[1])
+
+    # 3. Detect contrast variations (potential damage areas)
+    contrast = ImageEnhance.Contrast(gray)
+    high_contrast = contrast.enhance(2.0)
+    contrast_array = np.array(high_contrast)
+    contrast_variance = np.var(contrast_array)
+
+    # 4. Detect linear features (scratches)
+    # Use edge detection and look for linear patterns
+    edge_threshold = 100
+    strong_edges = np.sum(edge_array > edge_threshold)
+    edge_ratio = strong_edges / (edge_array.shape[0] * edge_array.shape[1])
+
+    return {
+        "edge_intensity": float(edge_intensity),
+        "edge_ratio": float(edge_ratio),
+        "dark_ratio": float(dark_ratio),
+        "contrast_variance": float(contrast_variance),
+    }
+
+
+def classify(features: Dict[str, float], thresholds: Dict[str, Dict[str, List[float]]]) -> List[Dict[str, str]]:
+    """Damage assessments (type and severity) implied by `features` under `thresholds`."""
+    assessments = []
+    for damage_type, rules in thresholds.items():
+        if any(features[name] > detect for name, (detect, _) in rules.items()):
+            major = any(features[name] > major for name, (_, major) in rules.items())
+            assessments.append({"damage_type": damage_type, "severity": "major" if major else "minor"})
+    return assessments
 
 
 class MockAgent(AgentInterface):
     """Mock implementation of the agent interface with hardcoded responses."""
 
+    def __init__(self, thresholds_path: Optional[str] = None):
+        self.thresholds, self.thresholds_version = load_thresholds(thresholds_path)
+
     def analyze_damage(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Return mock damage analysis based on basic image analysis."""
         damage_labels = []
@@ -16,59 +128,20 @@ class MockAgent(AgentInterface):
         # Try to analyze the image if bytes are provided
         image_bytes = payload.get("image_bytes")
         if image_bytes:
+            # Imported lazily so importing the agent doesn't pull in PIL/NumPy
+            from PIL import Image
+
             try:
-                # Load image
-                img = Image.open(BytesIO(image_bytes))
-                img = img.convert('RGB')
-                
-                # Resize for faster processing (max 800px on longest side)
-                img.thumbnail((800, 800), Image.Resampling.LANCZOS)
-                
-                # Convert to numpy array for analysis
-                img_array = np.array(img)
-                
-                # Basic image analysis
-                # 1. Detect edges (potential scratches)
-                gray = img.convert('L')
-                edges = gray.filter(ImageFilter.FIND_EDGES)
-                edge_array = np.array(edges)
-                edge_intensity = np.mean(edge_array)
-                
-                # 2. Detect dark spots (potential dents)
-                dark_threshold = 50  # Pixels darker than this
-                dark_pixels = np.sum(img_array[:, :, :].mean(axis=2) < dark_threshold)
-                dark_ratio = dark_pixels / (img_array.shape[0] * img_array.shape[1])
-                
-                # 3. Detect contrast variations (potential damage areas)
-                contrast = ImageEnhance.Contrast(gray)
-                high_contrast = contrast.enhance(2.0)
-                contrast_array = np.array(high_contrast)
-                contrast_variance = np.var(contrast_array)
-                
-                # 4. Detect linear features (scratches)
-                # Use edge detection and look for linear patterns
-                edge_threshold = 100
-                strong_edges = np.sum(edge_array > edge_threshold)
-                edge_ratio = strong_edges / (edge_array.shape[0] * edge_array.shape[1])
-                
+                with track_stage("prepare"):
+                    # Load image (reusing the caller's decode when provided) and downscale it for analysis
+                    img = prepare_image(payload.get("image") or Image.open(BytesIO(image_bytes)))
+
+                with track_stage("features"):
+                    features = extract_features(img)
+
                 # Determine damage types based on analysis
-                # Scratches: High edge intensity and linear patterns
-                if edge_intensity > 30 or edge_ratio > 0.05:
-                    scratches_severity = "major" if edge_intensity > 50 or edge_ratio > 0.1 else "minor"
-                    damage_labels.append("scratches")
-                    damage_assessments.append({"damage_type": "scratches", "severity": scratches_severity})
-                
-                # Dents: Dark spots/areas
-                if dark_ratio > 0.02:
-                    dents_severity = "major" if dark_ratio > 0.05 else "minor"
-                    damage_labels.append("dents")
-                    damage_assessments.append({"damage_type": "dents", "severity": dents_severity})
-                
-                # Structural damage: High contrast variance (indicates significant damage)
-                if contrast_variance > 500:
-                    structural_severity = "major" if contrast_variance > 1000 else "minor"
-                    damage_labels.append("structural_damage")
-                    damage_assessments.append({"damage_type": "structural_damage", "severity": structural_severity})
+                damage_assessments = classify(features, self.thresholds)
+                damage_labels = [assessment["damage_type"] for assessment in damage_assessments]
                 
             except Exception as e:
                 # If analysis fails, fall back to filename-based variation
@@ -154,9 +227,18 @@ class MockAgent(AgentInterface):
             "status": "success",
             "damage_labels": damage_labels,
             "damage_assessments": damage_assessments,
-            "reasoning": reasoning
+            "reasoning": reasoning,
+            "thresholds_version": self.thresholds_version
         }
 
+    def warm_up(self) -> None:
+        """Import PIL/NumPy and run the analysis pipeline once on a tiny image."""
+        from PIL import Image
+
+        buf = BytesIO()
+        Image.new("RGB", (32, 32), (128, 128, 128)).save(buf, "PNG")
+        self.analyze_damage({"image_filename": "warm_up.png", "image_bytes": buf.getvalue()})
+
     def generate_estimate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Return mock repair estimate."""
         return {
@@ -0,0 +1,353 @@
+"""Daily claim/cost rollups by damage type and severity.
+
+The stage writes in app/persistence.py fold each estimate, and each review
+that moved its claim to a new status, into claim_daily_rollups in the same
+transaction (one upsert per write, with the deltas pre-aggregated per key),
+so /api/analytics reads a few thousand small rows instead of scanning the
+JSON columns. Approvals, denials and escalations count claim status
+transitions (senior_reviews.claim_status), not review events, so a claim
+reviewed twice is counted once.
+
+Every writer thread adds to its own `shard` of each row, so concurrent
+writers never queue on the same claim-level row lock; queries sum the
+shards. Shard 0 belongs to the maintenance commands:
+
+    python -m app.analytics rebuild [--since 2024-01-01]
+    python -m app.analytics compact [--before 2024-06-01]
+
+`rebuild` recomputes the totals from repair_estimates and senior_reviews and
+writes the difference to the live rollups into shard 0, all from one
+snapshot, so it takes no locks and concurrent writes are neither blocked nor
+lost. `compact` folds the writer shards of past days into shard 0.
+
+A review's approved amount is attributed to damage type/severity in
+proportion to the line-item costs of the estimate it approves.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+from datetime import date, datetime, time, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, select, true
+from sqlalchemy.orm import Session
+
+from app.adjudication import approved_amount
+from app.models import ClaimDailyRollup, RepairEstimate, SeniorReview
+
+# damage_type / damage_severity of the claim-level rows
+ALL = "all"
+
+COUNTERS = (
+    "estimates", "line_items", "estimated_cost", "approvals", "denials", "escalations", "approved_amount"
+)
+
+# Claim status a review moved the claim to -> counter it increments (a routed claim stays pending)
+STATUS_COUNTERS = {"approved": "approvals", "denied": "denials", "escalated": "escalations"}
+
+# Writer shards per rollup row; shard 0 is only written by rebuild and compact
+ROLLUP_SHARDS = max(1, int(os.getenv("ANALYTICS_ROLLUP_SHARDS", "16")))
+MAINTENANCE_SHARD = 0
+
+Key = Tuple[date, str, str]
+Deltas = Dict[Key, Dict[str, float]]
+
+_rollups = ClaimDailyRollup.__table__
+_writer = threading.local()
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def utc_day(value: Optional[datetime]) -> date:
+    if value is None:
+        return _today()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _item_cost(item: Dict[str, Any]) -> float:
+    parts_cost = item.get("parts_cost", 0) or 0
+    labor_cost = item.get("labor_cost", 0) or 0
+    if parts_cost or labor_cost:
+        return float(parts_cost + labor_cost)
+    return float(item.get("base_cost", 0) or 0)
+
+
+def _item_groups(estimate_data: Dict[str, Any]) -> Dict[Tuple[str, str], Tuple[int, float]]:
+    """(damage_type, damage_severity) -> (line item count, cost) for an estimate."""
+    groups: Dict[Tuple[str, str], Tuple[int, float]] = {}
+    for item in estimate_data.get("line_items") or ():
+        key = (item.get("damage_type") or "unknown", item.get("damage_severity") or "unknown")
+        count, cost = groups.get(key, (0, 0.0))
+        groups[key] = (count + 1, cost + _item_cost(item))
+    return groups
+
+
+def _add(deltas: Deltas, key: Key, values: Dict[str, float]) -> None:
+    row = deltas.setdefault(key, {})
+    for column, value in values.items():
+        row[column] = row.get(column, 0) + value
+
+
+def add_estimate(deltas: Deltas, estimate_data: Dict[str, Any], day: date) -> None:
+    groups = _item_groups(estimate_data)
+    _add(deltas, (day, ALL, ALL), {
+        "estimates": 1,
+        "line_items": sum(count for count, _ in groups.values()),
+        "estimated_cost": approved_amount(estimate_data),
+    })
+    for (damage_type, severity), (count, cost) in groups.items():
+        _add(deltas, (day, damage_type, severity), {"estimates": 1, "line_items": count, "estimated_cost": cost})
+
+
+def add_review(
+    deltas: Deltas,
+    estimate_data: Optional[Dict[str, Any]],
+    review_data: Dict[str, Any],
+    claim_status: Optional[str],
+    day: date,
+) -> None:
+    """Count a review under the claim status it moved its claim to (None if the claim did not move)."""
+    counter = STATUS_COUNTERS.get(claim_status)
+    if counter is None:
+        return
+    amount = float(review_data.get("approved_amount") or 0) if counter == "approvals" else 0.0
+    _add(deltas, (day, ALL, ALL), {counter: 1, "approved_amount": amount})
+
+    groups = _item_groups(estimate_data or {})
+    total_cost = sum(cost for _, cost in groups.values())
+    for (damage_type, severity), (_, cost) in groups.items():
+        share = cost / total_cost if total_cost else 1.0 / len(groups)
+        _add(deltas, (day, damage_type, severity), {counter: 1, "approved_amount": amount * share})
+
+
+_upserts: Dict[str, Any] = {}
+
+
+def _upsert_statement(dialect_name: str):
+    """The rollup upsert for a dialect, built once so every write hits the compiled cache."""
+    if dialect_name not in _upserts:
+        _upserts[dialect_name] = _build_upsert(dialect_name)
+    return _upserts[dialect_name]
+
+
+def _build_upsert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError("claim rollups need INSERT ... ON CONFLICT (got {})".format(dialect_name))
+    statement = insert(_rollups)
+    return statement.on_conflict_do_update(
+        index_elements=[_rollups.c.day, _rollups.c.damage_type, _rollups.c.damage_severity, _rollups.c.shard],
+        set_={column: _rollups.c[column] + statement.excluded[column] for column in COUNTERS},
+    )
+
+
+def writer_shard() -> int:
+    """This thread's rollup shard, picked at random once per thread."""
+    try:
+        return _writer.shard
+    except AttributeError:
+        _writer.shard = random.randint(1, ROLLUP_SHARDS)
+        return _writer.shard
+
+
+def apply_deltas(db: Session, deltas: Deltas, shard: Optional[int] = None) -> None:
+    """Add `deltas` to the rollups (this thread's shard by default) with one multi-row upsert."""
+    if not deltas:
+        return
+    if shard is None:
+        shard = writer_shard()
+    # Fixed key order keeps concurrent upserts to a shared shard from deadlocking on each other's rows
+    rows = []
+    for (day, damage_type, severity) in sorted(deltas):
+        row = {column: 0 for column in COUNTERS}
+        row.update(deltas[(day, damage_type, severity)])
+        row.update({"day": day, "damage_type": damage_type, "damage_severity": severity, "shard": shard})
+        rows.append(row)
+    db.execute(_upsert_statement(db.get_bind().dialect.name), rows)
+
+
+def record_estimate_rollup(db: Session, estimate_data: Dict[str, Any]) -> None:
+    deltas: Deltas = {}
+    add_estimate(deltas, estimate_data, _today())
+    apply_deltas(db, deltas)
+
+
+def record_review_rollups(
+    db: Session, reviews: Iterable[Tuple[Optional[Dict[str, Any]], Dict[str, Any], Optional[str]]]
+) -> None:
+    """Fold (estimate_data, review_data, claim status it moved the claim to) into today's rollups."""
+    deltas: Deltas = {}
+    day = _today()
+    for estimate_data, review_data, claim_status in reviews:
+        add_review(deltas, estimate_data, review_data, claim_status, day)
+    apply_deltas(db, deltas)
+
+
+def _sums():
+    return [func.sum(_rollups.c[column]).label(column) for column in COUNTERS]
+
+
+def _with_rates(row: Dict[str, Any]) -> Dict[str, Any]:
+    for column in ("estimated_cost", "approved_amount"):
+        row[column] = float(row[column] or 0)
+    for column in COUNTERS:
+        row[column] = row[column] or 0
+    decided = row["approvals"] + row["denials"]
+    row["denial_rate"] = row["denials"] / decided if decided else None
+    return row
+
+
+def query_analytics(
+    db: Session,
+    start: date,
+    end: date,
+    damage_type: Optional[str] = None,
+    damage_severity: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Per-day claim totals and per damage type/severity totals for [start, end]."""
+    in_range = _rollups.c.day.between(start, end)
+
+    days = [
+        _with_rates(dict(row._mapping))
+        for row in db.execute(
+            select(_rollups.c.day, *_sums())
+            .where(in_range, _rollups.c.damage_type == ALL)
+            .group_by(_rollups.c.day)
+            .order_by(_rollups.c.day)
+        )
+    ]
+
+    by_damage_query = (
+        select(_rollups.c.damage_type, _rollups.c.damage_severity, *_sums())
+        .where(in_range, _rollups.c.damage_type != ALL)
+        .group_by(_rollups.c.damage_type, _rollups.c.damage_severity)
+        .order_by(_rollups.c.damage_type, _rollups.c.damage_severity)
+    )
+    if damage_type:
+        by_damage_query = by_damage_query.where(_rollups.c.damage_type == damage_type)
+    if damage_severity:
+        by_damage_query = by_damage_query.where(_rollups.c.damage_severity == damage_severity)
+    by_damage = [_with_rates(dict(row._mapping)) for row in db.execute(by_damage_query)]
+
+    totals = {column: sum(day[column] for day in days) for column in COUNTERS}
+    return {"totals": _with_rates(totals), "days": days, "by_damage": by_damage}
+
+
+def _snapshot(db: Session) -> None:
+    """Run the rest of this session's transaction on one snapshot (PostgreSQL REPEATABLE READ).
+
+    Stage rows and their rollup deltas commit together, so a snapshot sees both or neither; the
+    maintenance commands can then write differences while writers keep adding to their shards.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def _current_totals(db: Session, where) -> Deltas:
+    """Rollup totals per key, summed over shards."""
+    key = (_rollups.c.day, _rollups.c.damage_type, _rollups.c.damage_severity)
+    return {
+        (row.day, row.damage_type, row.damage_severity): {
+            column: float(row._mapping[column] or 0) for column in COUNTERS
+        }
+        for row in db.execute(select(*key, *_sums()).where(where).group_by(*key))
+    }
+
+
+def rebuild(db: Session, since: Optional[date] = None, batch_size: int = 1000) -> int:
+    """Recompute the rollups (for days >= `since`, or all days) from the stage tables. Returns rows corrected.
+
+    Needs a session with no transaction in progress; the caller commits.
+    """
+    _snapshot(db)
+
+    deltas: Deltas = {}
+    estimates = select(RepairEstimate.estimate_data, RepairEstimate.created_at)
+    reviews = (
+        select(RepairEstimate.estimate_data, SeniorReview.review_data, SeniorReview.claim_status, SeniorReview.created_at)
+        .select_from(SeniorReview)
+        .outerjoin(RepairEstimate, RepairEstimate.id == SeniorReview.repair_estimate_id)
+        .where(SeniorReview.claim_status.in_(list(STATUS_COUNTERS)))
+    )
+    if since is not None:
+        # Midnight UTC, not a bare date, which timestamptz would read in the session's TimeZone
+        start = datetime.combine(since, time.min, tzinfo=timezone.utc)
+        estimates = estimates.where(RepairEstimate.created_at >= start)
+        reviews = reviews.where(SeniorReview.created_at >= start)
+
+    for estimate_data, created_at in db.execute(estimates.execution_options(yield_per=batch_size)):
+        add_estimate(deltas, estimate_data or {}, utc_day(created_at))
+    for estimate_data, review_data, claim_status, created_at in db.execute(
+        reviews.execution_options(yield_per=batch_size)
+    ):
+        add_review(deltas, estimate_data, review_data or {}, claim_status, utc_day(created_at))
+
+    if since is not None:
+        # Rows straddling the boundary in UTC belong to the kept days
+        deltas = {key: values for key, values in deltas.items() if key[0] >= since}
+
+    # Write only the difference, so increments committed after the snapshot are kept
+    current = _current_totals(db, _rollups.c.day >= since if since is not None else true())
+    corrections: Deltas = {}
+    for key in set(deltas) | set(current):
+        expected, actual = deltas.get(key, {}), current.get(key, {})
+        difference = {column: expected.get(column, 0) - actual.get(column, 0) for column in COUNTERS}
+        if any(abs(value) >= 0.005 for value in difference.values()):
+            corrections[key] = difference
+    apply_deltas(db, corrections, MAINTENANCE_SHARD)
+    return len(corrections)
+
+
+def compact(db: Session, before: Optional[date] = None) -> int:
+    """Fold the writer shards of days before `before` (default today) into shard 0. Returns rows folded.
+
+    Needs a session with no transaction in progress; the caller commits.
+    """
+    _snapshot(db)
+    past = and_(_rollups.c.day < (before or _today()), _rollups.c.shard != MAINTENANCE_SHARD)
+    totals = _current_totals(db, past)
+    apply_deltas(db, totals, MAINTENANCE_SHARD)
+    return db.execute(delete(_rollups).where(past)).rowcount
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the claim_daily_rollups table")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Recompute rollups from the stage tables")
+    rebuild_parser.add_argument("--since", type=date.fromisoformat, help="Only rebuild days on or after this date")
+    rebuild_parser.add_argument("--batch-size", type=int, default=1000)
+    compact_parser = subparsers.add_parser("compact", help="Fold the writer shards of past days into one row per key")
+    compact_parser.add_argument("--before", type=date.fromisoformat,
+                                help="Only compact days before this date (default: today)")
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal, get_engine
+
+    get_engine()
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            message = "Corrected {} rollup rows".format(rebuild(db, args.since, args.batch_size))
+        else:
+            message = "Folded {} rollup rows".format(compact(db, args.before))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(message)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
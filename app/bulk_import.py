@@ -0,0 +1,370 @@
+"""Bulk import of historical claims (claims, damage assessments, repair estimates and reviews).
+
+Input is NDJSON, one claim per line (optionally gzipped):
+
+    {"external_id": "C-1", "policy_number": "P-9", "created_at": "2023-04-01T10:00:00Z",
+     "damage_assessments": [{"damage_type": "dents", "severity": "major"}],
+     "reasoning": "...", "estimate": {...}}
+
+Lines are validated with the API's Pydantic models in chunks, spread over
+worker processes (`--workers`, validation is the CPU-bound part). For each chunk
+ids are reserved up front from the tables' sequences, so claims, assessments
+and estimates can reference each other before anything is written, and the
+tables are loaded with PostgreSQL COPY (plain executemany INSERTs on other
+dialects). Claims imported as escalated, approved or denied also get the
+senior review that moved them there (its review_data taken from `review`).
+Records without an `estimate` can be priced from
+damage_cost_reference in the same pass (`--price-estimates`). Each chunk is
+committed with its analytics rollup deltas; invalid lines are skipped and
+optionally written to a rejects file.
+
+    python -m app.bulk_import claims.ndjson.gz --price-estimates --rejects rejected.ndjson
+
+Resume a failed run with `--start-line` set to the first line of the chunk that failed.
+"""
+import argparse
+import gzip
+import io
+import os
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Literal, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app import analytics
+from app.models import (
+    CLAIM_STAGES, Claim, DamageAssessment, DamageCostReference, RepairEstimate, SeniorReview, SystemLog
+)
+from app.pricing import DAMAGE_SEVERITIES, build_estimate, normalize_damage_type
+from app.schemas import DamageAssessmentItem
+from app.serialization import json_dumps
+
+DEFAULT_CHUNK_SIZE = 10000
+# Statuses a senior review decided; imported claims in them get the matching senior_reviews row
+REVIEWED_STATUSES = ("escalated", "approved", "denied")
+
+
+class ImportClaimRecord(BaseModel):
+    """One line of an import file."""
+    external_id: Optional[str] = None  # partner's claim reference, only used in error reports
+    policy_number: Optional[str] = None
+    created_at: Optional[datetime] = None
+    status: Optional[Literal["assessed", "pending_review", "escalated", "approved", "denied"]] = None
+    damage_labels: Optional[List[str]] = None
+    damage_assessments: List[DamageAssessmentItem] = []
+    reasoning: Optional[str] = None
+    estimate: Optional[Dict[str, Any]] = None  # already priced estimate_data
+    review: Optional[Dict[str, Any]] = None  # review_data of an escalated/approved/denied claim, e.g. approved_amount
+
+
+def _open(path: str):
+    if path == "-":
+        return sys.stdin.buffer
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_chunks(lines: Iterator[bytes], chunk_size: int, start_line: int = 1) -> Iterator[List[Tuple[int, bytes]]]:
+    """(line number, raw line) chunks, skipping blank lines and everything before `start_line`."""
+    numbered = ((number, line) for number, line in enumerate(lines, 1) if number >= start_line and line.strip())
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def validate_chunk(chunk: Sequence[Tuple[int, bytes]]) -> Tuple[List[ImportClaimRecord], List[Dict[str, Any]]]:
+    records, rejects = [], []
+    for number, line in chunk:
+        try:
+            records.append(ImportClaimRecord.model_validate_json(line))
+        except ValidationError as e:
+            rejects.append({"line": number, "errors": e.errors(include_url=False), "record": line.decode(errors="replace")})
+    return records, rejects
+
+
+CostReference = namedtuple(
+    "CostReference", ["damage_type", "damage_severity", "base_cost", "parts_cost", "labor_hours", "notes"]
+)
+
+
+def load_cost_references(db: Session) -> Dict[Tuple[str, str], CostReference]:
+    """damage_cost_reference rows as plain tuples, so they can be shipped to worker processes."""
+    return {
+        (ref.damage_type, ref.damage_severity): CostReference(
+            ref.damage_type, ref.damage_severity, ref.base_cost, ref.parts_cost, float(ref.labor_hours), ref.notes
+        )
+        for ref in db.query(DamageCostReference).all()
+    }
+
+
+def price(assessments: Sequence[DamageAssessmentItem], cost_refs: Dict[Tuple[str, str], Any]) -> Optional[Dict[str, Any]]:
+    """Estimate for the recognised assessments, as /api/generate-estimate would price them."""
+    refs = []
+    for assessment in assessments:
+        damage_type = normalize_damage_type(assessment.damage_type)
+        if damage_type and assessment.severity in DAMAGE_SEVERITIES and (damage_type, assessment.severity) in cost_refs:
+            refs.append(cost_refs[(damage_type, assessment.severity)])
+    return build_estimate(refs) if refs else None
+
+
+def prepare_chunk(
+    chunk: Sequence[Tuple[int, bytes]],
+    cost_refs: Optional[Dict[Tuple[str, str], CostReference]] = None,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Validate and price one chunk without touching the database.
+
+    Returns (claims, rejects). Each claim is a plain dict with its assessment_data
+    and estimate (either may be None), cheap to pickle back from a worker process.
+    """
+    records, rejects = validate_chunk(chunk)
+    claims = []
+    for record in records:
+        assessments = [item.model_dump() for item in record.damage_assessments]
+        assessment_data = None
+        if assessments or record.damage_labels:
+            assessment_data = {
+                "status": "success",
+                "damage_labels": record.damage_labels or list(dict.fromkeys(item["damage_type"] for item in assessments)),
+                "damage_assessments": assessments,
+                "reasoning": record.reasoning or "",
+            }
+        estimate = record.estimate
+        if estimate is None and cost_refs is not None and record.damage_assessments:
+            estimate = price(record.damage_assessments, cost_refs)
+        claims.append({
+            "policy_number": record.policy_number,
+            "created_at": record.created_at,
+            "status": record.status,
+            "assessment_data": assessment_data,
+            "estimate": estimate,
+            "review": record.review,
+        })
+    return claims, rejects
+
+
+def _reserve_ids(db: Session, table: str, count: int) -> List[int]:
+    """Allocate `count` primary keys for `table` before its rows are written."""
+    if count == 0:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return list(db.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+            {"table": table, "count": count},
+        ).scalars())
+    # Other dialects (SQLite) serialize writers, so the next ids after max(id) are ours for this transaction
+    start = (db.execute(text("SELECT max(id) FROM {}".format(table))).scalar() or 0) + 1
+    return list(range(start, start + count))
+
+
+def _copy_field(value: Any) -> str:
+    """One COPY CSV field: NULL is the bare empty field, every value (even "") is quoted."""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        value = json_dumps(value)
+    elif isinstance(value, datetime):
+        # Naive timestamps are UTC (as analytics.utc_day reads them), not the session's TimeZone
+        value = (value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    return '"{}"'.format(str(value).replace('"', '""'))
+
+
+def _copy(db: Session, table, rows: List[Dict[str, Any]]) -> None:
+    """Write `rows` into `table` with COPY on PostgreSQL, executemany elsewhere."""
+    if not rows:
+        return
+    if db.get_bind().dialect.name != "postgresql":
+        db.execute(insert(table), rows)
+        return
+
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_field(row[column]) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(table.name, ", ".join(columns)), buffer
+        )
+    finally:
+        cursor.close()
+
+
+def import_chunk(db: Session, prepared: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+    """Load one prepared chunk in the session's transaction. Returns row counts per table."""
+    now = datetime.now(timezone.utc)
+    claim_ids = _reserve_ids(db, "claims", len(prepared))
+    assessment_ids = iter(_reserve_ids(db, "damage_assessments", sum(1 for p in prepared if p["assessment_data"])))
+    estimate_ids = iter(_reserve_ids(db, "repair_estimates", sum(1 for p in prepared if p["estimate"] is not None)))
+
+    claims, assessment_rows, estimate_rows, review_rows = [], [], [], []
+    deltas: analytics.Deltas = {}
+    for claim_id, record in zip(claim_ids, prepared):
+        created_at = record["created_at"] or now
+        estimate = record["estimate"]
+        assessment_id = estimate_id = None
+        if record["assessment_data"]:
+            assessment_id = next(assessment_ids)
+            assessment_rows.append({
+                "id": assessment_id,
+                "claim_id": claim_id,
+                "assessment_data": record["assessment_data"],
+                "created_at": created_at,
+            })
+        if estimate is not None:
+            estimate_id = next(estimate_ids)
+            estimate_rows.append({
+                "id": estimate_id,
+                "claim_id": claim_id,
+                "damage_assessment_id": assessment_id,
+                "estimate_data": estimate,
+                "created_at": created_at,
+            })
+            analytics.add_estimate(deltas, estimate, analytics.utc_day(created_at))
+        status = record["status"] or ("pending_review" if estimate is not None else "assessed")
+        if status in REVIEWED_STATUSES:
+            # Without the review that decided it the claim would look unreviewed to
+            # auto-adjudication and be missing from the approval/denial analytics
+            review_data = dict(record["review"] or {}, status=status)
+            review_rows.append({
+                "claim_id": claim_id,
+                "repair_estimate_id": estimate_id,
+                "review_data": review_data,
+                "claim_status": status,
+                "created_at": created_at,
+            })
+            analytics.add_review(deltas, estimate, review_data, status, analytics.utc_day(created_at))
+        claims.append({
+            "id": claim_id,
+            "policy_number": record["policy_number"],
+            "status": status,
+            "current_stage": CLAIM_STAGES[status],
+            "latest_estimate_id": estimate_id,
+            "created_at": created_at,
+        })
+
+    _copy(db, Claim.__table__, claims)
+    _copy(db, DamageAssessment.__table__, assessment_rows)
+    _copy(db, RepairEstimate.__table__, estimate_rows)
+    _copy(db, SeniorReview.__table__, review_rows)
+    analytics.apply_deltas(db, deltas)
+    return {
+        "claims": len(claims),
+        "damage_assessments": len(assessment_rows),
+        "repair_estimates": len(estimate_rows),
+        "senior_reviews": len(review_rows),
+    }
+
+
+def _prepared_chunks(chunks, cost_refs, workers: int):
+    """(chunk, prepared, rejects) in input order, prepared in `workers` processes when workers > 1."""
+    if workers <= 1:
+        for chunk in chunks:
+            yield (chunk,) + prepare_chunk(chunk, cost_refs)
+        return
+    # Keep a bounded number of chunks in flight so a huge file is never read ahead into memory
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(prepare_chunk, chunk, cost_refs)))
+            if len(pending) > workers * 2:
+                chunk, future = pending.popleft()
+                yield (chunk,) + future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield (chunk,) + future.result()
+
+
+def run_import(
+    db: Session,
+    lines: Iterator[bytes],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    price_estimates: bool = False,
+    start_line: int = 1,
+    rejects_file=None,
+    source: Optional[str] = None,
+    log=None,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """Validate and load `lines` chunk by chunk, committing after each chunk.
+
+    With `workers` > 1 validation and pricing run in that many processes while
+    this one loads the previous chunks; chunks are still committed in order.
+    """
+    cost_refs = load_cost_references(db) if price_estimates else None
+    totals = {"claims": 0, "damage_assessments": 0, "repair_estimates": 0, "senior_reviews": 0, "rejected": 0}
+    started = time.perf_counter()
+    for chunk, prepared, rejects in _prepared_chunks(read_chunks(lines, chunk_size, start_line), cost_refs, workers):
+        for reject in rejects:
+            if rejects_file is not None:
+                rejects_file.write(json_dumps(reject) + "\n")
+        counts = import_chunk(db, prepared)
+        db.commit()
+        for table, count in counts.items():
+            totals[table] += count
+        totals["rejected"] += len(rejects)
+        if log is not None:
+            elapsed = time.perf_counter() - started
+            log("lines {}-{}: {} claims total, {:.0f} claims/sec".format(
+                chunk[0][0], chunk[-1][0], totals["claims"], totals["claims"] / elapsed if elapsed else 0
+            ))
+
+    totals["seconds"] = time.perf_counter() - started
+    db.execute(insert(SystemLog.__table__), {
+        "log_type": "bulk_import",
+        "log_data": dict(
+            totals, source=source, price_estimates=price_estimates, start_line=start_line, workers=workers
+        ),
+    })
+    db.commit()
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import historical claims from NDJSON")
+    parser.add_argument("path", help="NDJSON file (.gz supported, - for stdin)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--price-estimates", action="store_true",
+                        help="Price records without an estimate from damage_cost_reference")
+    parser.add_argument("--start-line", type=int, default=1, help="Skip input lines before this one")
+    parser.add_argument("--rejects", help="Write invalid lines and their validation errors here")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes validating and pricing chunks (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal, get_engine
+
+    get_engine()
+    db = SessionLocal()
+    rejects_file = open(args.rejects, "w") if args.rejects else None
+    try:
+        with _open(args.path) as lines:
+            totals = run_import(
+                db, lines, args.chunk_size, args.price_estimates, args.start_line, rejects_file,
+                source=args.path, log=lambda message: print(message, file=sys.stderr), workers=args.workers,
+            )
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        if rejects_file is not None:
+            rejects_file.close()
+    print("Imported {claims} claims, {damage_assessments} assessments, {repair_estimates} estimates, "
+          "{senior_reviews} reviews ({rejected} rejected) in {seconds:.1f}s".format(**totals))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
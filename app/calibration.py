@@ -0,0 +1,323 @@
+"""Offline feature store and threshold calibration for the MockAgent damage heuristics.
+
+`extract` decodes a labeled photo corpus once, in parallel across cores, and
+writes the agent's feature vectors (app.agents.mock_agent.FEATURE_NAMES) into
+a memory-mapped `features.npy`, with the labels alongside in `labels.npy`.
+The labels file is a CSV with a `path` column (relative to the CSV) and one
+column per damage type holding none / minor / major (empty means none):
+
+    path,scratches,dents,structural_damage
+    photos/0001.jpg,minor,,major
+
+`sweep` then tunes every damage type's thresholds from the store alone. Each
+feature's candidate values are quantiles of its distribution; for each label
+class the images are bucketed by candidate index and a cumulative histogram
+over the feature axes gives, for every combination of candidates at once, how
+many images stay below all of them. That is all precision and recall need, so
+a full grid costs one bincount instead of one pass over the corpus per
+candidate. Detection thresholds maximize F-beta for "damage present" and
+major thresholds (no lower than the detection ones) for "major". The result
+is written as a versioned config for DAMAGE_THRESHOLDS_PATH.
+
+    python -m app.calibration extract labels.csv --store calibration/ [--workers 8]
+    python -m app.calibration sweep --store calibration/ --output thresholds.json [--grid-size 64]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.agents.mock_agent import (
+    DEFAULT_THRESHOLDS, FEATURE_NAMES, extract_features, prepare_image, thresholds_version
+)
+
+DAMAGE_TYPES = tuple(DEFAULT_THRESHOLDS)
+# Label codes in labels.npy
+SEVERITY_CODES = {"": 0, "none": 0, "minor": 1, "major": 2}
+DEFAULT_GRID_SIZE = 64
+
+
+def read_labels(path: str) -> Tuple[List[str], np.ndarray]:
+    """Image paths and an (images x damage types) array of severity codes from a labels CSV."""
+    base = os.path.dirname(os.path.abspath(path))
+    paths, labels = [], []
+    with open(path, newline="") as f:
+        for line, row in enumerate(csv.DictReader(f), 2):
+            try:
+                labels.append([SEVERITY_CODES[(row.get(damage_type) or "").strip().lower()] for damage_type in DAMAGE_TYPES])
+            except KeyError as e:
+                raise ValueError("{}:{}: unknown severity {}".format(path, line, e))
+            paths.append(os.path.join(base, row["path"]))
+    return paths, np.array(labels, dtype=np.int8).reshape(-1, len(DAMAGE_TYPES))
+
+
+def image_features(path: str) -> List[float]:
+    """Feature vector for one image file, NaNs if it cannot be decoded."""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            features = extract_features(prepare_image(img))
+        return [features[name] for name in FEATURE_NAMES]
+    except Exception:
+        return [float("nan")] * len(FEATURE_NAMES)
+
+
+def extract(labels_path: str, store: str, workers: Optional[int] = None, log=None) -> Dict[str, Any]:
+    """Build the feature store for the corpus listed in `labels_path`."""
+    paths, labels = read_labels(labels_path)
+    os.makedirs(store, exist_ok=True)
+    features = np.lib.format.open_memmap(
+        os.path.join(store, "features.npy"), mode="w+", dtype=np.float64, shape=(len(paths), len(FEATURE_NAMES))
+    )
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for index, vector in enumerate(pool.map(image_features, paths, chunksize=16)):
+            features[index] = vector
+            if log is not None and (index + 1) % 1000 == 0:
+                log("{} / {} images".format(index + 1, len(paths)))
+    features.flush()
+    del features
+    np.save(os.path.join(store, "labels.npy"), labels)
+
+    failed = int(np.isnan(np.load(os.path.join(store, "features.npy"), mmap_mode="r")).any(axis=1).sum())
+    manifest = {
+        "feature_names": list(FEATURE_NAMES),
+        "damage_types": list(DAMAGE_TYPES),
+        "images": len(paths),
+        "failed": failed,
+        "labels": os.path.abspath(labels_path),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "seconds": time.perf_counter() - started,
+    }
+    with open(os.path.join(store, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    with open(os.path.join(store, "paths.txt"), "w") as f:
+        f.writelines(path + "\n" for path in paths)
+    return manifest
+
+
+def load_store(store: str) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any], Optional[np.ndarray]]:
+    """(features, labels, manifest, rows) for a feature store.
+
+    `features` stays the whole memory-mapped array; `rows` holds the indexes of
+    the images that decoded (None when all did) and `labels` is already limited
+    to them. Functions below take `rows` and read only the columns they need,
+    so the store is never copied into memory as a whole.
+    """
+    with open(os.path.join(store, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest["feature_names"] != list(FEATURE_NAMES) or manifest["damage_types"] != list(DAMAGE_TYPES):
+        raise ValueError("Feature store {} was built for different features; re-run extract".format(store))
+    features = np.load(os.path.join(store, "features.npy"), mmap_mode="r")
+    labels = np.load(os.path.join(store, "labels.npy"))
+    valid = np.ones(len(features), dtype=bool)
+    for column in range(features.shape[1]):
+        valid &= ~np.isnan(features[:, column])
+    rows = None
+    if not valid.all():
+        rows = np.flatnonzero(valid)
+        labels = labels[rows]
+    return features, labels, manifest, rows
+
+
+def _column(features: np.ndarray, name: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """One feature's values, limited to `rows` (a copy of that column only) when given."""
+    index = FEATURE_NAMES.index(name)
+    return features[:, index] if rows is None else features[rows, index]
+
+
+def candidate_grid(values: np.ndarray, size: int) -> np.ndarray:
+    """Candidate thresholds: `size` quantiles of the observed values (deduplicated, ascending)."""
+    return np.unique(np.quantile(values, np.linspace(0.0, 1.0, size)))
+
+
+def counts_below(columns: Sequence[np.ndarray], grids: Sequence[np.ndarray], mask: np.ndarray) -> np.ndarray:
+    """For every combination of candidates, how many masked rows have every feature <= its candidate.
+
+    Result has shape (len(grid_1), ..., len(grid_k)).
+    """
+    # Number of candidates strictly below each value; value <= grid[j] exactly when that index is <= j
+    indexes = [np.searchsorted(grid, column[mask], side="left") for grid, column in zip(grids, columns)]
+    shape = tuple(len(grid) + 1 for grid in grids)
+    counts = np.bincount(np.ravel_multi_index(indexes, shape), minlength=int(np.prod(shape))).reshape(shape)
+    for axis in range(len(grids)):
+        counts = counts.cumsum(axis=axis)
+    # The last bucket holds values above every candidate
+    return counts[tuple(slice(0, len(grid)) for grid in grids)]
+
+
+def _fbeta(tp: np.ndarray, fp: np.ndarray, fn: np.ndarray, beta: float) -> np.ndarray:
+    b2 = beta * beta
+    denominator = (1 + b2) * tp + b2 * fn + fp
+    return np.divide((1 + b2) * tp, denominator, out=np.zeros(tp.shape, dtype=np.float64), where=denominator > 0)
+
+
+def best_thresholds(
+    columns: Sequence[np.ndarray],
+    grids: Sequence[np.ndarray],
+    positive: np.ndarray,
+    beta: float = 1.0,
+    floor: Optional[Sequence[float]] = None,
+) -> Tuple[List[float], float]:
+    """Candidate combination maximizing F-beta for `positive` under an any-feature-above rule.
+
+    `floor` restricts each feature's candidates to values >= the given threshold.
+    """
+    below_positive = counts_below(columns, grids, positive)
+    below_negative = counts_below(columns, grids, ~positive)
+    tp = positive.sum() - below_positive
+    fp = (~positive).sum() - below_negative
+    score = _fbeta(tp, fp, below_positive, beta)
+    if floor is not None:
+        allowed = np.ones(score.shape, dtype=bool)
+        for axis, (grid, minimum) in enumerate(zip(grids, floor)):
+            shape = [1] * len(grids)
+            shape[axis] = len(grid)
+            allowed &= (grid >= minimum).reshape(shape)
+        score = np.where(allowed, score, -1.0)
+    best = np.unravel_index(np.argmax(score), score.shape)
+    return [float(grid[i]) for grid, i in zip(grids, best)], float(score[best])
+
+
+def predict(
+    features: np.ndarray, thresholds: Dict[str, Dict[str, List[float]]], rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Severity codes (images x damage types) the agent would assign under `thresholds`."""
+    column = {name: _column(features, name, rows) for name in FEATURE_NAMES}
+    predicted = np.zeros((len(features) if rows is None else len(rows), len(DAMAGE_TYPES)), dtype=np.int8)
+    for t, damage_type in enumerate(DAMAGE_TYPES):
+        rules = thresholds.get(damage_type, {})
+        if not rules:
+            continue
+        detected = np.logical_or.reduce([column[name] > detect for name, (detect, _) in rules.items()])
+        major = np.logical_or.reduce([column[name] > major for name, (_, major) in rules.items()])
+        predicted[:, t] = np.where(detected, np.where(major, 2, 1), 0)
+    return predicted
+
+
+def _precision_recall(predicted: np.ndarray, actual: np.ndarray) -> Dict[str, Any]:
+    tp = int((predicted & actual).sum())
+    return {
+        "precision": tp / int(predicted.sum()) if predicted.any() else None,
+        "recall": tp / int(actual.sum()) if actual.any() else None,
+        "support": int(actual.sum()),
+    }
+
+
+def evaluate(
+    features: np.ndarray,
+    labels: np.ndarray,
+    thresholds: Dict[str, Dict[str, List[float]]],
+    rows: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """Precision / recall per damage type for detection and for each severity."""
+    predicted = predict(features, thresholds, rows)
+    return {
+        damage_type: {
+            "detected": _precision_recall(predicted[:, t] > 0, labels[:, t] > 0),
+            "minor": _precision_recall(predicted[:, t] == 1, labels[:, t] == 1),
+            "major": _precision_recall(predicted[:, t] == 2, labels[:, t] == 2),
+        }
+        for t, damage_type in enumerate(DAMAGE_TYPES)
+    }
+
+
+def sweep(
+    features: np.ndarray,
+    labels: np.ndarray,
+    grid_size: int = DEFAULT_GRID_SIZE,
+    beta: float = 1.0,
+    rows: Optional[np.ndarray] = None,
+) -> Dict[str, Dict[str, List[float]]]:
+    """Best thresholds for each damage type, using the same features per type as DEFAULT_THRESHOLDS."""
+    thresholds = {}
+    for t, damage_type in enumerate(DAMAGE_TYPES):
+        names = list(DEFAULT_THRESHOLDS[damage_type])
+        columns = [_column(features, name, rows) for name in names]
+        grids = [candidate_grid(column, grid_size) for column in columns]
+        detect, _ = best_thresholds(columns, grids, labels[:, t] > 0, beta)
+        major, _ = best_thresholds(columns, grids, labels[:, t] == 2, beta, floor=detect)
+        thresholds[damage_type] = {name: [low, high] for name, low, high in zip(names, detect, major)}
+    return thresholds
+
+
+def calibrate(store: str, grid_size: int = DEFAULT_GRID_SIZE, beta: float = 1.0) -> Dict[str, Any]:
+    """Sweep the store and build the versioned threshold config."""
+    features, labels, manifest, rows = load_store(store)
+    started = time.perf_counter()
+    thresholds = sweep(features, labels, grid_size, beta, rows)
+    elapsed = time.perf_counter() - started
+    return {
+        "version": thresholds_version(thresholds),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "thresholds": thresholds,
+        "metrics": evaluate(features, labels, thresholds, rows),
+        "baseline": {
+            "thresholds": DEFAULT_THRESHOLDS, "metrics": evaluate(features, labels, DEFAULT_THRESHOLDS, rows)
+        },
+        "calibration": {
+            "store": os.path.abspath(store),
+            "labels": manifest.get("labels"),
+            "images": int(len(labels)),
+            "grid_size": grid_size,
+            "beta": beta,
+            "sweep_seconds": elapsed,
+        },
+    }
+
+
+def _format_metrics(config: Dict[str, Any]) -> str:
+    def cell(value):
+        return "    -" if value is None else "{:.3f}".format(value)
+
+    lines = ["{:<18} {:<9} {:>15} {:>15} {:>8}".format("damage type", "class", "precision", "recall", "support")]
+    for damage_type, classes in config["metrics"].items():
+        for name, tuned in classes.items():
+            baseline = config["baseline"]["metrics"][damage_type][name]
+            lines.append("{:<18} {:<9} {:>6} ({:>6}) {:>6} ({:>6}) {:>8}".format(
+                damage_type, name, cell(tuned["precision"]), cell(baseline["precision"]),
+                cell(tuned["recall"]), cell(baseline["recall"]), tuned["support"],
+            ))
+    lines.append("(current thresholds in parentheses)")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Feature store and threshold calibration for the damage heuristics")
+    commands = parser.add_subparsers(dest="command", required=True)
+    extract_parser = commands.add_parser("extract", help="Extract feature vectors for a labeled corpus")
+    extract_parser.add_argument("labels", help="CSV with path and per-damage-type severity columns")
+    extract_parser.add_argument("--store", required=True, help="Feature store directory")
+    extract_parser.add_argument("--workers", type=int, help="Processes decoding images (default: CPU count)")
+    sweep_parser = commands.add_parser("sweep", help="Tune thresholds from a feature store")
+    sweep_parser.add_argument("--store", required=True, help="Feature store directory")
+    sweep_parser.add_argument("--output", required=True, help="Threshold config to write (for DAMAGE_THRESHOLDS_PATH)")
+    sweep_parser.add_argument("--grid-size", type=int, default=DEFAULT_GRID_SIZE, help="Candidates per feature")
+    sweep_parser.add_argument("--beta", type=float, default=1.0, help="F-beta weight of recall over precision")
+    args = parser.parse_args(argv)
+
+    if args.command == "extract":
+        manifest = extract(args.labels, args.store, args.workers, log=lambda message: print(message, file=sys.stderr))
+        print("Extracted {images} images ({failed} failed to decode) in {seconds:.1f}s".format(**manifest))
+        return 0
+
+    config = calibrate(args.store, args.grid_size, args.beta)
+    with open(args.output, "w") as f:
+        json.dump(config, f, indent=2)
+    print(_format_metrics(config))
+    print("Wrote thresholds version {} to {} (sweep took {:.2f}s)".format(
+        config["version"], args.output, config["calibration"]["sweep_seconds"]
+    ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,20 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from starlette.requests import Request
+from typing import Dict, List, Optional
+import itertools
+import logging
 import os
+import threading
+import time
+import traceback
 from dotenv import load_dotenv
 
+from app.metrics import DB_POOL_WAIT, DB_READ_SESSIONS, DecayingMax
+
 load_dotenv()
 
 DATABASE_URL = os.getenv(
@@ -11,16 +22,280 @@ DATABASE_URL = os.getenv(
     "postgresql://davidnogueiravazquez@localhost:5432/claims_db"
 )
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Optional read replicas (comma-separated URLs); read-only endpoints are routed to them
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Replicas further behind the primary than this are skipped until they catch up
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+# How often each replica's health and lag are re-checked
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "5"))
+# Connect timeout for replica connections; a health check runs on the request that picks the
+# replica, so an unreachable replica must fail fast rather than hang that request
+REPLICA_CONNECT_TIMEOUT_SECONDS = int(os.getenv("REPLICA_CONNECT_TIMEOUT_SECONDS", "2"))
+# Reads from a client that wrote within this window go to the primary (read-your-writes)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Log statements slower than this many milliseconds (unset disables the hooks entirely)
+SLOW_QUERY_THRESHOLD_MS = os.getenv("SLOW_QUERY_THRESHOLD_MS")
+
+slow_query_logger = logging.getLogger("app.database.slow_query")
+replica_logger = logging.getLogger("app.database.replicas")
+
+# The engine (and its DBAPI driver) is built on first use, so tools that only
+# need the models - Alembic's env.py, maintenance scripts - never pay for it.
+# `engine` is still importable from this module and triggers the same lazy build.
+_engine = None
+_engine_lock = threading.Lock()
+_replicas: Optional["ReplicaRouter"] = None
+
+# Recent worst connection pool checkout wait, in seconds (fed by TimedQueuePool)
+pool_wait = DecayingMax()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
 
-def get_db():
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection.
+
+    The recent maximum (`pool_wait`) is one of the overload signals app.admission sheds load on.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_POOL_WAIT.observe(elapsed)
+            pool_wait.update(elapsed)
+
+
+def _create_engine(url: str, connect_timeout: Optional[int] = None):
+    from app.serialization import json_dumps, json_loads
+
+    kwargs = {}
+    # Only swap in the timed pool where the dialect would pick QueuePool anyway (not in-memory SQLite)
+    parsed = make_url(url)
+    if parsed.get_dialect().get_pool_class(parsed) is QueuePool:
+        kwargs["poolclass"] = TimedQueuePool
+    if connect_timeout and parsed.get_backend_name() == "postgresql":
+        kwargs["connect_args"] = {"connect_timeout": connect_timeout}
+    new_engine = create_engine(url, json_serializer=json_dumps, json_deserializer=json_loads, **kwargs)
+    if SLOW_QUERY_THRESHOLD_MS:
+        install_slow_query_hooks(new_engine, float(SLOW_QUERY_THRESHOLD_MS))
+    return new_engine
+
+
+def get_engine():
+    """Return the application engine, creating it on first call."""
+    global _engine, _replicas
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                new_engine = _create_engine(DATABASE_URL)
+                SessionLocal.configure(bind=new_engine)
+                _replicas = ReplicaRouter([
+                    _create_engine(url, REPLICA_CONNECT_TIMEOUT_SECONDS) for url in DATABASE_REPLICA_URLS
+                ])
+                _engine = new_engine
+    return _engine
+
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def install_slow_query_hooks(target_engine, threshold_ms: float) -> None:
+    """Log statements on `target_engine` that take longer than `threshold_ms`, with the calling stack."""
+    threshold = threshold_ms / 1000.0
+
+    @event.listens_for(target_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(target_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        if elapsed < threshold:
+            return
+        # Skip SQLAlchemy's own frames so the trace points at application code
+        stack = [
+            "{}:{} in {}".format(frame.filename, frame.lineno, frame.name)
+            for frame in traceback.extract_stack()[:-1]
+            if "sqlalchemy" not in frame.filename
+        ]
+        slow_query_logger.warning(
+            "slow query (%.1f ms): %s\n  %s",
+            elapsed * 1000,
+            statement,
+            "\n  ".join(stack[-5:]),
+            extra={
+                "duration_ms": elapsed * 1000,
+                "statement": statement,
+                "parameters": repr(parameters)[:500],
+                "executemany": executemany,
+                "trace": stack[-10:],
+            },
+        )
+
+
+def warm_up_pool(connections: int = 1) -> None:
+    """Open `connections` pooled connections up front so the first requests skip the connect handshake."""
+    target_engine = get_engine()
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = target_engine.connect()
+            conn.exec_driver_sql("SELECT 1")
+            opened.append(conn)
+    finally:
+        # Closing returns them to the pool rather than disconnecting
+        for conn in opened:
+            conn.close()
+
+
+# Health and lag of a replica. Lag is zero while the replica has replayed everything it has
+# received, so an idle primary does not make its replicas look stale.
+_REPLICA_LAG = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def check(self) -> None:
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name == "postgresql":
+                    self.lag = float(conn.execute(_REPLICA_LAG).scalar())
+                else:
+                    # Stand-ins (e.g. a SQLite copy of the primary) have no replication to measure
+                    conn.execute(text("SELECT 1"))
+                    self.lag = 0.0
+            self.healthy = self.lag <= REPLICA_MAX_LAG_SECONDS
+            if not self.healthy:
+                replica_logger.warning("replica %s is %.1fs behind, skipping it", self.engine.url, self.lag)
+        except Exception as e:
+            self.healthy = False
+            self.lag = None
+            replica_logger.warning("replica %s failed its health check: %s", self.engine.url, e)
+        self.checked_at = time.monotonic()
+
+
+class ReplicaRouter:
+    """Round-robin over the healthy, caught-up replicas.
+
+    A replica is re-checked at most every REPLICA_CHECK_INTERVAL_SECONDS, by
+    whichever request picks it first once the last check is stale; other
+    requests keep using the previous result meanwhile rather than wait on it.
+    """
+
+    def __init__(self, engines):
+        self.replicas = [Replica(engine) for engine in engines]
+        self._turn = itertools.count()
+
+    def pick(self):
+        """Engine of the next usable replica, or None to read from the primary."""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._turn) % len(self.replicas)]
+            if time.monotonic() - replica.checked_at >= REPLICA_CHECK_INTERVAL_SECONDS and replica.lock.acquire(False):
+                try:
+                    replica.check()
+                finally:
+                    replica.lock.release()
+            if replica.healthy:
+                return replica.engine
+        return None
+
+    def status(self) -> List[Dict[str, object]]:
+        return [
+            {"url": replica.engine.url.render_as_string(hide_password=True), "healthy": replica.healthy, "lag": replica.lag}
+            for replica in self.replicas
+        ]
+
+
+def get_replica_router() -> "ReplicaRouter":
+    get_engine()
+    return _replicas
+
+
+# Client key -> time.monotonic() of its last committed write, for read-your-writes routing.
+# Per process: with several workers a client's next read may land on a worker that did not see the write.
+_recent_writes: Dict[str, float] = {}
+_RECENT_WRITES_MAX = 10000
+
+
+def note_write(client: Optional[str]) -> None:
+    if client is None or READ_YOUR_WRITES_SECONDS <= 0:
+        return
+    now = time.monotonic()
+    if len(_recent_writes) >= _RECENT_WRITES_MAX:
+        for key, wrote_at in list(_recent_writes.items()):
+            if now - wrote_at > READ_YOUR_WRITES_SECONDS:
+                _recent_writes.pop(key, None)
+    _recent_writes[client] = now
+
+
+def recently_wrote(client: Optional[str]) -> bool:
+    wrote_at = _recent_writes.get(client) if client is not None else None
+    return wrote_at is not None and time.monotonic() - wrote_at < READ_YOUR_WRITES_SECONDS
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session):
+    # Stamped at commit rather than at the end of the request, so a read the client sends as soon
+    # as it has the write's response already sees the stickiness
+    if not session.info.get("read_only"):
+        note_write(session.info.get("client"))
+
+
+def client_key(request: Request) -> Optional[str]:
+    """Identity used for read-your-writes: the X-Client-Id header, else the client address."""
+    return request.headers.get("x-client-id") or (request.client.host if request.client else None)
+
+
+def read_session(client: Optional[str] = None):
+    """A session for read-only work: on a replica when one is usable, unless `client` wrote recently."""
+    get_engine()
+    if recently_wrote(client):
+        bind, target = None, "sticky"
+    else:
+        bind = _replicas.pick()
+        target = "replica" if bind is not None else "fallback"
+    DB_READ_SESSIONS.inc(target)
+    db = SessionLocal(bind=bind) if bind is not None else SessionLocal()
+    db.info["read_only"] = True
+    db.info["client"] = client
+    return db
+
+
+def get_db(request: Request):
+    get_engine()
     db = SessionLocal()
+    db.info["client"] = client_key(request)
     try:
         yield db
     finally:
         db.close()
 
+
+def get_read_db(request: Request):
+    """Like get_db, for endpoints that only read: replicas when configured, primary otherwise."""
+    db = read_session(client_key(request))
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,311 @@
+"""Streaming export of joined claim records as NDJSON, CSV or Parquet.
+
+One record per claim, joined with its latest damage assessment, its latest
+repair estimate (claims.latest_estimate_id) and its latest senior review.
+Rows are read through a server-side cursor (`stream_results` + `yield_per`)
+and encoded chunk by chunk, so memory stays flat however many claims are
+exported. Records come out in claim id order; to resume an interrupted
+export pass the last claim_id received as `after_id`.
+
+    python -m app.export --format parquet --output claims.parquet [--since 2024-01-01] [--after-id 123]
+
+Parquet output needs the optional `pyarrow` package.
+"""
+import argparse
+import csv
+import io
+import sys
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import select, true
+from sqlalchemy.orm import Session, aliased
+
+from app.adjudication import approved_amount
+from app.models import Claim, DamageAssessment, RepairEstimate, SeniorReview
+from app.serialization import json_dumps
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+DEFAULT_BATCH_SIZE = 5000
+# Rows buffered per Parquet row group
+PARQUET_ROW_GROUP_SIZE = 50000
+
+COLUMNS = (
+    "claim_id", "policy_number", "status", "current_stage", "claim_created_at",
+    "assessment_id", "assessment_created_at", "image_digest", "damage_labels", "assessment_data",
+    "estimate_id", "estimate_created_at", "estimated_cost", "estimate_data",
+    "review_id", "review_created_at", "review_status", "approved_amount", "review_data",
+)
+# Columns holding nested JSON, written as JSON text in CSV and Parquet
+JSON_COLUMNS = ("damage_labels", "assessment_data", "estimate_data", "review_data")
+
+
+def _latest_id(model):
+    """Id of the claim's newest `model` row: a top-1 probe of the (claim_id, id) index."""
+    row = aliased(model)
+    return select(row.id).where(row.claim_id == Claim.id).order_by(row.id.desc()).limit(1)
+
+
+def _join_latest(query, model, name: str, dialect_name: str):
+    if dialect_name == "postgresql":
+        latest = _latest_id(model).lateral(name)
+        return query.outerjoin(latest, true()).outerjoin(model, model.id == latest.c.id)
+    return query.outerjoin(model, model.id == _latest_id(model).scalar_subquery())
+
+
+def export_query(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    dialect_name: str = "postgresql",
+):
+    """Claims in id order, filtered to created_at in [since, until) and id > after_id.
+
+    The latest assessment and review are looked up per claim, as LATERAL joins
+    on PostgreSQL and correlated subqueries elsewhere, so only the exported
+    claims' rows are read (never a GROUP BY over the whole table).
+    """
+    query = select(
+        Claim.id.label("claim_id"),
+        Claim.policy_number,
+        Claim.status,
+        Claim.current_stage,
+        Claim.created_at.label("claim_created_at"),
+        DamageAssessment.id.label("assessment_id"),
+        DamageAssessment.created_at.label("assessment_created_at"),
+        DamageAssessment.image_digest,
+        DamageAssessment.assessment_data,
+        RepairEstimate.id.label("estimate_id"),
+        RepairEstimate.created_at.label("estimate_created_at"),
+        RepairEstimate.estimate_data,
+        SeniorReview.id.label("review_id"),
+        SeniorReview.created_at.label("review_created_at"),
+        SeniorReview.review_data,
+    ).select_from(Claim)
+    query = _join_latest(query, DamageAssessment, "latest_assessment", dialect_name)
+    query = query.outerjoin(RepairEstimate, RepairEstimate.id == Claim.latest_estimate_id)
+    query = _join_latest(query, SeniorReview, "latest_review", dialect_name).order_by(Claim.id)
+    if since is not None:
+        query = query.where(Claim.created_at >= since)
+    if until is not None:
+        query = query.where(Claim.created_at < until)
+    if after_id is not None:
+        query = query.where(Claim.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _record(row) -> Dict[str, Any]:
+    assessment_data = row.assessment_data
+    estimate_data = row.estimate_data
+    review_data = row.review_data
+    return {
+        "claim_id": row.claim_id,
+        "policy_number": row.policy_number,
+        "status": row.status,
+        "current_stage": row.current_stage,
+        "claim_created_at": row.claim_created_at,
+        "assessment_id": row.assessment_id,
+        "assessment_created_at": row.assessment_created_at,
+        "image_digest": row.image_digest,
+        "damage_labels": assessment_data.get("damage_labels") if assessment_data else None,
+        "assessment_data": assessment_data,
+        "estimate_id": row.estimate_id,
+        "estimate_created_at": row.estimate_created_at,
+        "estimated_cost": approved_amount(estimate_data) if estimate_data else None,
+        "estimate_data": estimate_data,
+        "review_id": row.review_id,
+        "review_created_at": row.review_created_at,
+        "review_status": review_data.get("status") if review_data else None,
+        "approved_amount": review_data.get("approved_amount") if review_data else None,
+        "review_data": review_data,
+    }
+
+
+def iter_records(db: Session, batch_size: int = DEFAULT_BATCH_SIZE, **filters) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of export records, `batch_size` rows at a time, from a server-side cursor."""
+    query = export_query(dialect_name=db.get_bind().dialect.name, **filters)
+    result = db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+    for partition in result.partitions():
+        yield [_record(row) for row in partition]
+
+
+def _tap(batches, callback):
+    for batch in batches:
+        callback(batch)
+        yield batch
+
+
+def _flat(record: Dict[str, Any]) -> Dict[str, Any]:
+    flat = dict(record)
+    for column in JSON_COLUMNS:
+        if flat[column] is not None:
+            flat[column] = json_dumps(flat[column])
+    return flat
+
+
+def _ndjson_chunks(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(json_dumps(record) + "\n" for record in batch).encode()
+
+
+def _csv_chunks(batches: Iterator[List[Dict[str, Any]]], header: bool = True) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    if header:
+        writer.writeheader()
+    for batch in batches:
+        writer.writerows(_flat(record) for record in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the generator in chunks."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    timestamp = pa.timestamp("us", tz="UTC")
+    types = {
+        "claim_id": pa.int64(), "assessment_id": pa.int64(), "estimate_id": pa.int64(), "review_id": pa.int64(),
+        "claim_created_at": timestamp, "assessment_created_at": timestamp,
+        "estimate_created_at": timestamp, "review_created_at": timestamp,
+        "estimated_cost": pa.float64(), "approved_amount": pa.float64(),
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in COLUMNS])
+
+
+def _parquet_chunks(batches: Iterator[List[Dict[str, Any]]], row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> Iterator[bytes]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    pending: List[Dict[str, Any]] = []
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in batches:
+            pending.extend(_flat(record) for record in batch)
+            if len(pending) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist(pending, schema=schema))
+                pending = []
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_pylist(pending, schema=schema))
+    yield sink.drain()
+
+
+def iter_export(
+    db: Session,
+    fmt: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    **filters
+) -> Iterator[bytes]:
+    """Encoded export output for `fmt`, as a stream of byte chunks.
+
+    `progress` is called with each batch of records before it is encoded.
+    """
+    batches = iter_records(db, batch_size, **filters)
+    if progress is not None:
+        batches = _tap(batches, progress)
+    if fmt == "ndjson":
+        return _ndjson_chunks(batches)
+    if fmt == "csv":
+        return _csv_chunks(batches)
+    if fmt == "parquet":
+        return _parquet_chunks(batches)
+    raise ValueError("Unknown export format: {}".format(fmt))
+
+
+def stream_export(fmt: str, batch_size: int = DEFAULT_BATCH_SIZE, progress=None, **filters) -> Iterator[bytes]:
+    """Like iter_export, but owns its session for the lifetime of the stream (for streaming responses).
+
+    Always reads from the primary, even with DATABASE_REPLICA_URLS set: a hot
+    standby cancels long queries that conflict with replayed WAL (vacuum
+    cleanup), which would cut a multi-minute export off partway through.
+    """
+    from app.database import SessionLocal, get_engine
+
+    get_engine()
+    db = SessionLocal()
+    db.info["read_only"] = True
+    try:
+        yield from iter_export(db, fmt, batch_size, progress, **filters)
+    finally:
+        db.close()
+
+
+def _parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export joined claim records")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--output", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--since", type=_parse_datetime, help="Only claims created at or after this time")
+    parser.add_argument("--until", type=_parse_datetime, help="Only claims created before this time")
+    parser.add_argument("--after-id", type=int, help="Resume after this claim id")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    # NDJSON and CSV emit one chunk per batch, so the last batch read is written once its chunk is
+    state: Dict[str, Any] = {"read": None, "written": args.after_id, "count": 0}
+
+    def progress(batch):
+        state["read"] = batch[-1]["claim_id"]
+        state["count"] += len(batch)
+
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for chunk in stream_export(
+            args.format, args.batch_size, progress,
+            since=args.since, until=args.until, after_id=args.after_id, limit=args.limit,
+        ):
+            output.write(chunk)
+            state["written"] = state["read"]
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        print("Exported {} claims; resume with --after-id {}".format(state["count"], state["written"]), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""Content-addressed storage for uploaded claim images and their WebP thumbnails.
+
+Files are keyed by the SHA-256 of the uploaded bytes and sharded two levels
+deep (``ab/cd/abcd....jpg``), so identical uploads are stored once and every
+URL is immutable. Thumbnails are generated from the image already decoded
+for damage analysis rather than decoding the upload a second time.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from io import BytesIO
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+
+IMAGE_STORE_DIR = os.getenv(
+    "IMAGE_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public", "uploads", "images"),
+)
+
+# Longest-side pixel sizes of the generated thumbnails, largest first
+THUMBNAIL_SIZES = (1024, 256)
+THUMBNAIL_QUALITY = 80
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# PIL format -> (file extension, media type) for stored originals
+_ORIGINAL_FORMATS = {
+    "JPEG": (".jpg", "image/jpeg"),
+    "PNG": (".png", "image/png"),
+    "WEBP": (".webp", "image/webp"),
+    "GIF": (".gif", "image/gif"),
+    "BMP": (".bmp", "image/bmp"),
+    "TIFF": (".tiff", "image/tiff"),
+}
+_FALLBACK_FORMAT = (".bin", "application/octet-stream")
+
+
+def is_valid_digest(digest: str) -> bool:
+    return bool(_DIGEST_RE.match(digest))
+
+
+def image_digest(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def _shard_dir(digest: str) -> str:
+    return os.path.join(IMAGE_STORE_DIR, digest[:2], digest[2:4])
+
+
+def thumbnail_path(digest: str, size: int) -> str:
+    return os.path.join(_shard_dir(digest), "{}_{}.webp".format(digest, size))
+
+
+def find_original(digest: str) -> Optional[Tuple[str, str]]:
+    """Return (path, media type) of a stored original, if present."""
+    for extension, media_type in list(_ORIGINAL_FORMATS.values()) + [_FALLBACK_FORMAT]:
+        path = os.path.join(_shard_dir(digest), digest + extension)
+        if os.path.exists(path):
+            return path, media_type
+    return None
+
+
+def decode_image(image_bytes: bytes):
+    """Decode an upload with PIL, returning None if it isn't a readable image."""
+    from PIL import Image
+
+    try:
+        image = Image.open(BytesIO(image_bytes))
+        image.load()
+    except Exception:
+        return None
+    return image
+
+
+def _atomic_write(path: str, write) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def store_image(image_bytes: bytes, image=None) -> Dict[str, Any]:
+    """Persist an upload and its thumbnails, returning its digest and the sizes available.
+
+    `image` is the decoded PIL image, when the caller already has one.
+    """
+    digest = image_digest(image_bytes)
+    extension, _ = _ORIGINAL_FORMATS.get(getattr(image, "format", None), _FALLBACK_FORMAT)
+    original = os.path.join(_shard_dir(digest), digest + extension)
+    if not os.path.exists(original):
+        _atomic_write(original, lambda f: f.write(image_bytes))
+
+    thumbnails = []
+    if image is not None:
+        from PIL import Image, ImageOps
+
+        current = None
+        for size in THUMBNAIL_SIZES:
+            path = thumbnail_path(digest, size)
+            if os.path.exists(path):
+                thumbnails.append(size)
+                continue
+            # Downscale from the previous (larger) thumbnail rather than the full image
+            if current is None:
+                # WebP thumbnails carry no EXIF, so apply the camera's orientation to the pixels
+                current = ImageOps.exif_transpose(image).convert("RGB")
+            else:
+                current = current.copy()
+            current.thumbnail((size, size), Image.Resampling.LANCZOS)
+            _atomic_write(path, lambda f: current.save(f, "WEBP", quality=THUMBNAIL_QUALITY))
+            thumbnails.append(size)
+
+    return {"digest": digest, "thumbnails": thumbnails}
+
+
+def image_urls(stored: Mapping[str, Any]) -> Dict[str, Any]:
+    """API URLs for a stored image and its thumbnails."""
+    digest = stored["digest"]
+    return {
+        "image_digest": digest,
+        "image_url": "/api/images/{}".format(digest),
+        "thumbnail_urls": {
+            str(size): "/api/images/{}/thumbnails/{}".format(digest, size) for size in stored["thumbnails"]
+        },
+    }
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=start-end` range; multiple ranges are not supported."""
+    if not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    start_text, _, end_text = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(end_text))
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end:
+        return None
+    return start, end
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header lists `etag` (weak comparison) or is `*`."""
+    quoted = '"{}"'.format(etag)
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == quoted:
+            return True
+    return False
+
+
+class ImmutableFileResponse(Response):
+    """Serve a content-addressed file with immutable caching, conditional GET and byte ranges.
+
+    Uses the ASGI zero-copy send extension (sendfile) when the server offers it.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, media_type: str, etag: str, request_headers: Mapping[str, str]):
+        self.path = path
+        self.media_type = media_type
+        self.background = None
+        size = os.stat(path).st_size
+        self.start, self.end = 0, size - 1
+        self.status_code = 200
+        headers = {
+            "cache-control": IMMUTABLE_CACHE_CONTROL,
+            "etag": '"{}"'.format(etag),
+            "accept-ranges": "bytes",
+        }
+
+        if_none_match = request_headers.get("if-none-match")
+        range_header = request_headers.get("range")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            self.status_code = 304
+            self.start, self.end = 0, -1
+        elif range_header:
+            byte_range = _parse_range(range_header, size)
+            if byte_range is None:
+                self.status_code = 416
+                self.start, self.end = 0, -1
+                headers["content-range"] = "bytes */{}".format(size)
+            else:
+                self.status_code = 206
+                self.start, self.end = byte_range
+                headers["content-range"] = "bytes {}-{}/{}".format(self.start, self.end, size)
+
+        if self.status_code != 304:
+            # A 304 carries no body and must not claim one of length 0 (RFC 9110 8.6)
+            headers["content-length"] = str(self.end - self.start + 1)
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        length = self.end - self.start + 1
+        if length <= 0 or scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": length,
+                    "more_body": False,
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            remaining = length
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -1,17 +1,44 @@
-from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Form, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional, List
 from pydantic import BaseModel
-from datetime import datetime
-
-from app.database import get_db, engine
-from app.models import (
-    Claim, DamageAssessment, RepairEstimate, SeniorReview, SystemLog, DamageCostReference, RepairShop
+from datetime import date, datetime, timedelta
+import importlib.util
+import os
+import secrets
+
+from app.database import get_db, get_read_db, warm_up_pool
+from app.models import DamageCostReference, RepairShop
+from app.persistence import (
+    record_damage_analysis, record_denial, record_estimate, record_review, record_reviews_bulk
 )
+from app.analytics import query_analytics
+from app.pricing import build_estimate
+from app.schemas import ClaimApprovalAuthorizationRequest, ClaimDenialRequest, GenerateEstimateRequest
+from app.export import FORMATS as EXPORT_FORMATS, stream_export
+from app.review_queue import DEFAULT_LEASE_SECONDS, MAX_PAGE_SIZE, claim_next, list_queue, release
+from app.search import DEFAULT_SOURCES as SEARCH_SOURCES, MAX_PAGE_SIZE as MAX_SEARCH_PAGE_SIZE, SOURCES, search
+from app.adjudication import adjudicate_pending, claim_status_updates, get_compiled_rules, review_rows
 from app.agents.mock_agent import MockAgent
+from app.image_store import (
+    THUMBNAIL_SIZES, ImmutableFileResponse, decode_image, find_original, image_urls, is_valid_digest,
+    store_image, thumbnail_path,
+)
+from app.admission import AdmissionControlMiddleware, check_policy_rate
+from app.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, render_metrics, track_stage
+from app.profiling import ProfilingMiddleware, install_signal_handler, profiler
+from app.serialization import JSONResponse
+
+# orjson-backed responses; endpoints with a response_model are serialized by pydantic-core
+# instead of walking the payload with jsonable_encoder
+app = FastAPI(title="Claims Processing API", default_response_class=JSONResponse)
 
-app = FastAPI(title="Claims Processing API")
+# Per-route concurrency limits, per-client rate limits and overload shedding. Added first so
+# it runs inside CORS (rejections still carry CORS headers) and inside the request metrics
+app.add_middleware(AdmissionControlMiddleware)
 
 # CORS middleware for frontend
 app.add_middleware(
@@ -22,34 +49,192 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in sampling profiler (a no-op until enabled via /admin/profiling or SIGUSR2)
+app.add_middleware(ProfilingMiddleware)
+
+# Request latency, status and in-flight metrics exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
 # Initialize agent
 agent = MockAgent()
 
 
 
 
-class DamageAssessmentItem(BaseModel):
-    damage_type: str
-    severity: str
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency guarding admin-only endpoints."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
 
-class GenerateEstimateRequest(BaseModel):
-    damage_assessment_id: Optional[int] = None
-    damage_labels: Optional[List[str]] = None
-    # Kept for backward compatibility/fallback purposes when damage_assessments is not provided
-    damage_severity: Optional[str] = None  # minor or major (deprecated, use damage_assessments)
-    damage_assessments: Optional[List[DamageAssessmentItem]] = None
 
+@app.on_event("startup")
+def setup_profiling():
+    install_signal_handler()
+    if os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes"):
+        profiler.enable()
+
+
+@app.on_event("startup")
+def warm_up():
+    """Optionally pre-initialize the analyzer and DB pool before the worker accepts traffic."""
+    if os.getenv("WARMUP_ON_STARTUP", "").lower() not in ("1", "true", "yes"):
+        return
+    agent.warm_up()
+    warm_up_pool(int(os.getenv("WARMUP_DB_CONNECTIONS", "1")))
+
+
+class AnalyzeDamageResponse(BaseModel):
+    success: bool
+    assessment_id: int
+    claim_id: int
+    result: Dict[str, Any]
+    image_digest: str
+    image_url: str
+    thumbnail_urls: Dict[str, str]
+
+
+class GenerateEstimateResponse(BaseModel):
+    success: bool
+    estimate_id: int
+    result: Dict[str, Any]
+
+
+class ClaimApprovalAuthorizationResponse(BaseModel):
+    """Response model for Claim Approval & Authorization stage."""
+    success: bool
+    review_id: int
+    result: Dict[str, Any]
+
+
+class ClaimDenialResponse(BaseModel):
+    """Response model for Claim Approval & Authorization: claim denial."""
+    success: bool
+    review_id: int
+    status: str
+
+
+class AutoAdjudicateRequest(BaseModel):
+    """Request model for bulk auto-adjudication of pending estimates."""
+    limit: int = 1000
+    dry_run: bool = False
+
+
+class AdjudicationDecision(BaseModel):
+    estimate_id: int
+    claim_id: Optional[int] = None
+    action: str
+    rule: str
+    approved_amount: float
 
-class ClaimApprovalAuthorizationRequest(BaseModel):
-    """Request model for Claim Approval & Authorization stage."""
-    estimate_id: Optional[int] = None
-    estimate_data: Optional[Dict[str, Any]] = None
 
+class AutoAdjudicateResponse(BaseModel):
+    success: bool
+    rules_version: str
+    reviewed: int
+    counts: Dict[str, int]
+    decisions: List[AdjudicationDecision]
 
-class ClaimDenialRequest(BaseModel):
-    """Request model for Claim Approval & Authorization: claim denial."""
+
+class ReviewQueueClaimRequest(BaseModel):
+    """Request model for leasing claims from the review queue."""
+    reviewer_id: str
+    limit: int = 1
+    lease_seconds: int = DEFAULT_LEASE_SECONDS
+
+
+class ReviewQueueReleaseRequest(BaseModel):
+    """Request model for handing a leased claim back to the review queue."""
+    claim_id: int
+    reviewer_id: str
+
+
+class ReviewQueueItem(BaseModel):
+    claim_id: int
+    policy_number: Optional[str] = None
+    status: str
+    current_stage: str
     estimate_id: Optional[int] = None
-    denial_comments: str
+    assigned_to: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+
+class ReviewQueueResponse(BaseModel):
+    success: bool
+    items: List[ReviewQueueItem]
+    next_cursor: Optional[int] = None
+
+
+class ReviewQueueReleaseResponse(BaseModel):
+    success: bool
+    released: bool
+
+
+class AnalyticsTotals(BaseModel):
+    estimates: int
+    line_items: int
+    estimated_cost: float
+    approvals: int
+    denials: int
+    escalations: int
+    approved_amount: float
+    denial_rate: Optional[float] = None
+
+
+class AnalyticsDay(AnalyticsTotals):
+    day: date
+
+
+class AnalyticsDamageGroup(AnalyticsTotals):
+    damage_type: str
+    damage_severity: str
+
+
+class AnalyticsResponse(BaseModel):
+    success: bool
+    start: date
+    end: date
+    totals: AnalyticsTotals
+    days: List[AnalyticsDay]
+    by_damage: List[AnalyticsDamageGroup]
+
+
+class SearchResult(BaseModel):
+    source: str
+    id: int
+    claim_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    rank: float
+    highlight: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    success: bool
+    results: List[SearchResult]
+    next_offset: Optional[int] = None
+
+
+class RepairShopItem(BaseModel):
+    id: int
+    name: str
+    address: Optional[str] = None
+    phone: Optional[str] = None
+
+
+class ApprovedRepairShopsResponse(BaseModel):
+    success: bool
+    repair_shops: List[RepairShopItem]
+
+
+class ProfilingSettingsRequest(BaseModel):
+    """Request model for toggling the request profiler."""
+    enabled: bool
+    sample_rate: Optional[float] = None
 
 
 @app.get("/")
@@ -57,7 +242,46 @@ def root():
     return {"message": "Claims Processing API"}
 
 
-@app.post("/api/analyze-damage")
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics in text exposition format."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+def get_profiling_status():
+    """Current profiler settings."""
+    return {"success": True, "profiling": profiler.status()}
+
+
+@app.post("/admin/profiling", dependencies=[Depends(require_admin)])
+def update_profiling(request: ProfilingSettingsRequest):
+    """Enable or disable request profiling at runtime."""
+    if request.sample_rate is not None and not 0.0 <= request.sample_rate <= 1.0:
+        raise HTTPException(status_code=400, detail="sample_rate must be between 0 and 1")
+    if request.enabled:
+        profiler.enable(request.sample_rate)
+    else:
+        profiler.disable()
+    return {"success": True, "profiling": profiler.status()}
+
+
+def _analyze_image(image_bytes: bytes, payload: Dict[str, Any]):
+    """Decode, analyze and store an upload. Returns (analysis result, stored image)."""
+    # Decode once; the agent and the thumbnail generator share the result
+    with track_stage("decode"):
+        decoded_image = decode_image(image_bytes)
+
+    # Call agent with image data for basic analysis
+    result = agent.analyze_damage(dict(payload, image_bytes=image_bytes, image=decoded_image))
+
+    # Persist the upload in the content-addressed store so later pages can reference it by digest
+    with track_stage("image_store"):
+        stored_image = store_image(image_bytes, decoded_image)
+    return result, stored_image
+
+
+@app.post("/api/analyze-damage", response_model=AnalyzeDamageResponse)
 async def analyze_damage(
     image: UploadFile = File(...),
     policy_number: Optional[str] = Form(None),
@@ -66,6 +290,9 @@ async def analyze_damage(
 ):
     """Analyze damage from claim submission with uploaded image."""
     try:
+        # Per-policy rate limit (the per-client one runs in AdmissionControlMiddleware)
+        check_policy_rate(policy_number)
+
         # Validate image file
         if not image.content_type or not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
@@ -73,45 +300,35 @@ async def analyze_damage(
         # Read image for basic analysis
         image_filename = image.filename or "unknown"
         image_content_type = image.content_type or "image/unknown"
-        image_bytes = await image.read()
-        
-        # Call agent with image data for basic analysis
-        payload = {
-            "policy_number": policy_number,
-            "accident_description": accident_description,
-            "image_filename": image_filename,
-            "image_content_type": image_content_type,
-            "image_bytes": image_bytes  # Pass image bytes for analysis
-        }
-        result = agent.analyze_damage(payload)
-
-        # Create or get claim
-        claim = Claim(policy_number=policy_number)
-        db.add(claim)
-        db.flush()
-
-        # Store damage assessment
-        assessment = DamageAssessment(
-            claim_id=claim.id,
-            assessment_data=result
+        with track_stage("read"):
+            image_bytes = await image.read()
+
+        # Decode, analysis and the image store are CPU-bound: run them in the threadpool so the
+        # event loop keeps serving (and admission control doesn't read our own work as loop lag)
+        result, stored_image = await run_in_threadpool(
+            _analyze_image, image_bytes, {
+                "policy_number": policy_number,
+                "accident_description": accident_description,
+                "image_filename": image_filename,
+                "image_content_type": image_content_type,
+            }
         )
-        db.add(assessment)
-        db.flush()
 
-        # Log to system
-        log = SystemLog(
-            log_type="damage_analysis",
-            log_data={"claim_id": claim.id, "result": result, "image_filename": image_filename}
-        )
-        db.add(log)
+        with track_stage("db_write"):
+            # Create claim, store damage assessment and log to system in one statement
+            claim_id, assessment_id = record_damage_analysis(
+                db, policy_number, result, image_filename, stored_image["digest"]
+            )
 
-        db.commit()
+        with track_stage("commit"):
+            db.commit()
 
         return {
             "success": True,
-            "assessment_id": assessment.id,
-            "claim_id": claim.id,
-            "result": result
+            "assessment_id": assessment_id,
+            "claim_id": claim_id,
+            "result": result,
+            **image_urls(stored_image)
         }
     except HTTPException:
         raise
@@ -120,7 +337,7 @@ async def analyze_damage(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/generate-estimate")
+@app.post("/api/generate-estimate", response_model=GenerateEstimateResponse)
 async def generate_estimate(
     request: GenerateEstimateRequest,
     db: Session = Depends(get_db)
@@ -197,65 +414,17 @@ async def generate_estimate(
                 detail="No cost reference found for the provided damage assessments"
             )
 
-        # Calculate totals
-        total_base_cost = sum(ref.base_cost for ref in cost_refs)
-        total_parts_cost = sum(ref.parts_cost for ref in cost_refs)
-        total_labor_hours = sum(float(ref.labor_hours) for ref in cost_refs)
-        total_labor_cost = total_labor_hours * 100  # $100/hour
-
-        # Build line items
-        line_items = []
-        for ref in cost_refs:
-            line_items.append({
-                "damage_type": ref.damage_type,
-                "damage_severity": ref.damage_severity,
-                "base_cost": ref.base_cost,
-                "parts_cost": ref.parts_cost,
-                "labor_hours": float(ref.labor_hours),
-                "labor_cost": float(ref.labor_hours) * 100,
-                "notes": ref.notes
-            })
-
-        # Build result
-        result = {
-            "total_base_cost": total_base_cost,
-            "total_parts_cost": total_parts_cost,
-            "total_labor_hours": total_labor_hours,
-            "total_labor_cost": total_labor_cost,
-            "line_items": line_items
-        }
+        # Price the estimate from the matched cost references
+        result = build_estimate(cost_refs)
 
-        # Get damage assessment if provided
-        damage_assessment_id = request.damage_assessment_id
-        claim_id = None
-        if damage_assessment_id:
-            assessment = db.query(DamageAssessment).filter(
-                DamageAssessment.id == damage_assessment_id
-            ).first()
-            if assessment:
-                claim_id = assessment.claim_id
-
-        # Store repair estimate
-        estimate = RepairEstimate(
-            claim_id=claim_id,
-            damage_assessment_id=damage_assessment_id,
-            estimate_data=result
-        )
-        db.add(estimate)
-        db.flush()
-
-        # Log to system
-        log = SystemLog(
-            log_type="estimate_generation",
-            log_data={"estimate_id": estimate.id, "result": result}
-        )
-        db.add(log)
+        # Store repair estimate (linked to the assessment's claim) and log to system
+        _, estimate_id = record_estimate(db, request.damage_assessment_id, result)
 
         db.commit()
 
         return {
             "success": True,
-            "estimate_id": estimate.id,
+            "estimate_id": estimate_id,
             "result": result
         }
     except HTTPException:
@@ -265,7 +434,7 @@ async def generate_estimate(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/review-estimate")
+@app.post("/api/review-estimate", response_model=ClaimApprovalAuthorizationResponse)
 async def approve_and_authorize_claim(
     request: ClaimApprovalAuthorizationRequest,
     db: Session = Depends(get_db)
@@ -276,37 +445,14 @@ async def approve_and_authorize_claim(
         payload = request.model_dump()
         result = agent.review_estimate(payload)  # Agent interface method name unchanged for compatibility
 
-        # Get repair estimate if provided
-        estimate_id = request.estimate_id
-        claim_id = None
-        if estimate_id:
-            estimate = db.query(RepairEstimate).filter(
-                RepairEstimate.id == estimate_id
-            ).first()
-            if estimate:
-                claim_id = estimate.claim_id
-
-        # Store Claim Approval & Authorization review
-        review = SeniorReview(
-            claim_id=claim_id,
-            repair_estimate_id=estimate_id,
-            review_data=result
-        )
-        db.add(review)
-        db.flush()
-
-        # Log to system
-        log = SystemLog(
-            log_type="claim_approval_authorization",  # Claim Approval & Authorization stage
-            log_data={"review_id": review.id, "result": result}
-        )
-        db.add(log)
+        # Store Claim Approval & Authorization review (linked to the estimate's claim) and log to system
+        _, review_id = record_review(db, request.estimate_id, result)
 
         db.commit()
 
         return {
             "success": True,
-            "review_id": review.id,
+            "review_id": review_id,
             "result": result
         }
     except Exception as e:
@@ -314,47 +460,30 @@ async def approve_and_authorize_claim(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/deny-claim")
+@app.post("/api/deny-claim", response_model=ClaimDenialResponse)
 async def deny_claim_authorization(
     request: ClaimDenialRequest,
     db: Session = Depends(get_db)
 ):
     """Claim Approval & Authorization: Deny a claim with comments."""
     try:
-        # Store denial in database
-        claim_id = None
-        if request.estimate_id:
-            estimate = db.query(RepairEstimate).filter(
-                RepairEstimate.id == request.estimate_id
-            ).first()
-            if estimate:
-                claim_id = estimate.claim_id
-
-        # Store Claim Approval & Authorization denial review
-        review = SeniorReview(
-            claim_id=claim_id,
-            repair_estimate_id=request.estimate_id,
-            review_data={
+        # Store Claim Approval & Authorization denial review and log to system
+        _, review_id = record_denial(
+            db,
+            request.estimate_id,
+            {
                 "status": "denied",
                 "denial_comments": request.denial_comments,
                 "review_timestamp": datetime.utcnow().isoformat()
-            }
-        )
-        db.add(review)
-        db.flush()
-
-        # Log to system
-        log = SystemLog(
-            log_type="claim_denial",
-            log_data={"review_id": review.id, "comments": request.denial_comments}
+            },
+            request.denial_comments
         )
-        db.add(log)
 
         db.commit()
 
         return {
             "success": True,
-            "review_id": review.id,
+            "review_id": review_id,
             "status": "denied"
         }
     except Exception as e:
@@ -362,8 +491,216 @@ async def deny_claim_authorization(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/approved-repair-shops")
-async def get_approved_repair_shops(db: Session = Depends(get_db)):
+@app.post("/api/reviews/auto-adjudicate", response_model=AutoAdjudicateResponse)
+async def auto_adjudicate_reviews(
+    request: AutoAdjudicateRequest,
+    db: Session = Depends(get_db)
+):
+    """Claim Approval & Authorization: Auto-approve, route or escalate pending estimates in bulk."""
+    try:
+        if request.limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be positive")
+
+        rules = get_compiled_rules()
+        decisions = adjudicate_pending(db, request.limit, rules)
+        counts: Dict[str, int] = {}
+        for decision in decisions:
+            counts[decision["action"]] = counts.get(decision["action"], 0) + 1
+
+        reviewed = 0
+        if not request.dry_run:
+            # One executemany for the reviews and one batch entry in the system log
+            reviewed = record_reviews_bulk(
+                db,
+                review_rows(decisions, rules.version),
+                claim_status_updates(decisions),
+                "auto_adjudication",
+                {
+                    "rules_version": rules.version,
+                    "counts": counts,
+                    "estimate_ids": [decision["estimate_id"] for decision in decisions],
+                }
+            )
+            db.commit()
+        else:
+            db.rollback()
+
+        return {
+            "success": True,
+            "rules_version": rules.version,
+            "reviewed": reviewed,
+            "counts": counts,
+            "decisions": decisions
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _queue_items(rows) -> List[Dict[str, Any]]:
+    return [
+        {
+            "claim_id": row.id,
+            "policy_number": row.policy_number,
+            "status": row.status,
+            "current_stage": row.current_stage,
+            "estimate_id": row.latest_estimate_id,
+            "assigned_to": row.assigned_to,
+            "lease_expires_at": row.lease_expires_at,
+            "created_at": row.created_at,
+        }
+        for row in rows
+    ]
+
+
+@app.get("/api/review-queue", response_model=ReviewQueueResponse)
+async def get_review_queue(
+    after: Optional[int] = None,
+    limit: int = 50,
+    status: Optional[List[str]] = Query(None),
+    include_leased: bool = False,
+    db: Session = Depends(get_read_db)
+):
+    """Claim Approval & Authorization: Page through claims awaiting senior review (keyset on claim id)."""
+    try:
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and {}".format(MAX_PAGE_SIZE))
+
+        kwargs = {"statuses": status} if status else {}
+        rows = list_queue(db, after, limit, include_leased=include_leased, **kwargs)
+
+        return {
+            "success": True,
+            "items": _queue_items(rows),
+            "next_cursor": rows[-1].id if len(rows) == limit else None
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/review-queue/claim", response_model=ReviewQueueResponse)
+async def claim_review_queue_items(
+    request: ReviewQueueClaimRequest,
+    db: Session = Depends(get_db)
+):
+    """Claim Approval & Authorization: Lease the oldest available claims to a reviewer."""
+    try:
+        if not 1 <= request.limit <= MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and {}".format(MAX_PAGE_SIZE))
+        if request.lease_seconds < 1:
+            raise HTTPException(status_code=400, detail="lease_seconds must be positive")
+
+        rows = claim_next(db, request.reviewer_id, request.limit, request.lease_seconds)
+
+        db.commit()
+
+        return {
+            "success": True,
+            "items": _queue_items(rows)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/review-queue/release", response_model=ReviewQueueReleaseResponse)
+async def release_review_queue_item(
+    request: ReviewQueueReleaseRequest,
+    db: Session = Depends(get_db)
+):
+    """Claim Approval & Authorization: Hand a leased claim back to the review queue."""
+    try:
+        released = release(db, request.claim_id, request.reviewer_id)
+
+        db.commit()
+
+        return {
+            "success": True,
+            "released": released
+        }
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Longest date range /api/analytics will aggregate in one request
+MAX_ANALYTICS_DAYS = 366
+
+
+@app.get("/api/analytics", response_model=AnalyticsResponse)
+async def get_analytics(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    damage_type: Optional[str] = None,
+    damage_severity: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Daily approved amounts, denial rates and cost by damage type and severity (from the rollups)."""
+    try:
+        end = end or datetime.utcnow().date()
+        start = start or end - timedelta(days=29)
+        if start > end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+        if (end - start).days >= MAX_ANALYTICS_DAYS:
+            raise HTTPException(status_code=400, detail="date range is limited to {} days".format(MAX_ANALYTICS_DAYS))
+
+        result = query_analytics(db, start, end, damage_type, damage_severity)
+
+        return {
+            "success": True,
+            "start": start,
+            "end": end,
+            **result
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/search", response_model=SearchResponse)
+async def search_claims(
+    q: str,
+    source: Optional[List[str]] = Query(None),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 20,
+    offset: int = 0,
+    db: Session = Depends(get_read_db)
+):
+    """Full-text search over damage assessment reasoning and denial comments, best matches first."""
+    try:
+        if not q.strip():
+            raise HTTPException(status_code=400, detail="q must not be empty")
+        if not 1 <= limit <= MAX_SEARCH_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and {}".format(MAX_SEARCH_PAGE_SIZE))
+        if offset < 0:
+            raise HTTPException(status_code=400, detail="offset must not be negative")
+        unknown = set(source or ()) - set(SOURCES)
+        if unknown:
+            raise HTTPException(status_code=400, detail="source must be one of: {}".format(", ".join(sorted(SOURCES))))
+
+        results = search(db, q, source or SEARCH_SOURCES, limit, offset, since, until)
+
+        return {
+            "success": True,
+            "results": results,
+            "next_offset": offset + limit if len(results) == limit else None
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/approved-repair-shops", response_model=ApprovedRepairShopsResponse)
+async def get_approved_repair_shops(db: Session = Depends(get_read_db)):
     """Claim Approval & Authorization: Get all approved repair shops."""
     try:
         shops = db.query(RepairShop).filter(RepairShop.is_approved == True).all()
@@ -382,3 +719,45 @@ async def get_approved_repair_shops(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.get("/api/export/claims", dependencies=[Depends(require_admin)])
+async def export_claims(
+    format: str = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None
+):
+    """Stream joined claim records (latest assessment, estimate and review per claim) in claim id order."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be one of: {}".format(", ".join(sorted(EXPORT_FORMATS))))
+    if format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    # The generator opens its own session, which lives as long as the response body
+    return StreamingResponse(
+        stream_export(format, since=since, until=until, after_id=after_id, limit=limit),
+        media_type=EXPORT_FORMATS[format],
+        headers={"content-disposition": 'attachment; filename="claims.{}"'.format(format)}
+    )
+
+
+@app.get("/api/images/{digest}")
+def get_image(digest: str, request: Request):
+    """Serve an uploaded claim image by its SHA-256 digest."""
+    original = find_original(digest) if is_valid_digest(digest) else None
+    if original is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path, media_type = original
+    return ImmutableFileResponse(path, media_type, digest, request.headers)
+
+
+@app.get("/api/images/{digest}/thumbnails/{size}")
+def get_image_thumbnail(digest: str, size: int, request: Request):
+    """Serve a precomputed WebP thumbnail of an uploaded claim image."""
+    if not is_valid_digest(digest) or size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = thumbnail_path(digest, size)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return ImmutableFileResponse(path, "image/webp", "{}-{}".format(digest, size), request.headers)
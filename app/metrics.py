@@ -0,0 +1,330 @@
+"""Lightweight request metrics with Prometheus text exposition.
+
+Every metric keeps one value table per thread, so recording a sample never
+takes a shared lock: a thread only writes to its own table, and the tables
+are summed when `/metrics` is scraped.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0
+)
+
+_registry: List["_Metric"] = []
+
+
+class _Metric:
+    """Base class holding per-thread value shards."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, ...], object]] = []
+        # Only taken the first time a thread touches this metric
+        self._shards_lock = threading.Lock()
+        _registry.append(self)
+
+    def _shard(self) -> Dict[Tuple[str, ...], object]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: Dict[Tuple[str, ...], object] = {}
+            with self._shards_lock:
+                self._shards.append(values)
+            self._local.values = values
+            return values
+
+    def _snapshots(self) -> List[Dict[Tuple[str, ...], object]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy() runs under the GIL, so a snapshot is never torn
+        return [shard.copy() for shard in shards]
+
+    def _format_labels(self, labelvalues: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, labelvalues))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        body = ",".join(
+            '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for key, value in pairs
+        )
+        return "{" + body + "}"
+
+    def render(self) -> List[str]:
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} {}".format(self.name, self.metric_type),
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for shard in self._snapshots():
+            for labelvalues, value in shard.items():
+                totals[labelvalues] = totals.get(labelvalues, 0.0) + value
+        return [
+            "{}{} {}".format(self.name, self._format_labels(labelvalues), _format_value(value))
+            for labelvalues, value in sorted(totals.items())
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    metric_type = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        values = self._shard()
+        values[labelvalues] = values.get(labelvalues, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Gauge that only supports relative updates (inc/dec), which sum correctly across threads."""
+
+    metric_type = "gauge"
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        values = self._shard()
+        values[labelvalues] = values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1.0) -> None:
+        values = self._shard()
+        values[labelvalues] = values.get(labelvalues, 0.0) - amount
+
+
+class Histogram(_Metric):
+    """Histogram with fixed upper bounds."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        values = self._shard()
+        state = values.get(labelvalues)
+        if state is None:
+            # Per-bucket counts (non-cumulative), then +Inf, sum
+            state = [0] * (len(self.buckets) + 1) + [0.0]
+            values[labelvalues] = state
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _render_samples(self) -> List[str]:
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for shard in self._snapshots():
+            for labelvalues, state in shard.items():
+                state = list(state)
+                merged = totals.get(labelvalues)
+                if merged is None:
+                    totals[labelvalues] = state
+                else:
+                    for i, value in enumerate(state):
+                        merged[i] += value
+
+        lines = []
+        for labelvalues, state in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append("{}_bucket{} {}".format(
+                    self.name, self._format_labels(labelvalues, ("le", _format_value(bound))), cumulative
+                ))
+            cumulative += state[len(self.buckets)]
+            lines.append("{}_bucket{} {}".format(
+                self.name, self._format_labels(labelvalues, ("le", "+Inf")), cumulative
+            ))
+            lines.append("{}_sum{} {}".format(self.name, self._format_labels(labelvalues), _format_value(state[-1])))
+            lines.append("{}_count{} {}".format(self.name, self._format_labels(labelvalues), cumulative))
+        return lines
+
+
+class DecayingMax:
+    """Largest recent sample, halving every `half_life` seconds once no larger sample arrives.
+
+    Used as an overload signal that reacts to a spike at once and recovers on its own
+    even when the spike stops the samples from coming (e.g. while load is being shed).
+    """
+
+    def __init__(self, half_life: float = 2.0):
+        self.half_life = half_life
+        self._value = 0.0
+        self._at = time.monotonic()
+
+    def value(self) -> float:
+        return self._value * 0.5 ** ((time.monotonic() - self._at) / self.half_life)
+
+    def update(self, sample: float) -> None:
+        if sample >= self.value():
+            self._value, self._at = sample, time.monotonic()
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_metrics() -> str:
+    """Render every registered metric in Prometheus text format (version 0.0.4)."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Starlette appends "; charset=utf-8" to text/* media types
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4"
+
+
+# Request-level metrics
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by endpoint.",
+    ("method", "handler"),
+)
+REQUESTS_TOTAL = Counter(
+    "http_requests_total",
+    "HTTP requests by endpoint and status code.",
+    ("method", "handler", "status"),
+)
+REQUEST_ERRORS = Counter(
+    "http_request_errors_total",
+    "HTTP requests that raised or returned a 5xx status (admission control's 503s excluded).",
+    ("method", "handler"),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served.",
+    ("method", "handler"),
+)
+
+# Read-only sessions by where app.database routed them: replica, sticky (client wrote recently,
+# so primary) or fallback (no replica configured or usable, so primary)
+DB_READ_SESSIONS = Counter(
+    "db_read_sessions_total",
+    "Read-only database sessions by routing target.",
+    ("target",),
+)
+
+# Admission control (app/admission.py)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests rejected by admission control, by endpoint and reason.",
+    ("handler", "reason"),
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a periodic timer.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check a connection out of the database pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+# Stage-level metrics (read, decode, prepare, features, image_store, db_write, commit)
+STAGE_LATENCY = Histogram(
+    "claims_stage_duration_seconds",
+    "Time spent in each processing stage.",
+    ("stage",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+class track_stage:
+    """Context manager recording the duration of a processing stage."""
+
+    __slots__ = ("stage", "_start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "track_stage":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        STAGE_LATENCY.observe(time.perf_counter() - self._start, self.stage)
+
+
+def _match_route(scope) -> str:
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+# Scope flag set by app.admission on the requests it sheds, which are counted in admission_rejections_total
+ADMISSION_REJECTED_KEY = "claims.admission_rejected"
+
+
+def route_template(scope) -> str:
+    """Path template of the route serving `scope` ("unmatched" if none).
+
+    Resolved once per request and kept in the scope, which the metrics and
+    admission middlewares share, so the route table is scanned only once.
+    """
+    # Label by route template rather than raw path to keep cardinality bounded
+    template = scope.get("claims.route_template")
+    if template is None:
+        template = scope["claims.route_template"] = _match_route(scope)
+    return template
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-endpoint latency, status codes, errors and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        handler = route_template(scope)
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc(method, handler)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status_holder[0] = 500
+            raise
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method, handler)
+            REQUESTS_IN_PROGRESS.dec(method, handler)
+            status = status_holder[0]
+            REQUESTS_TOTAL.inc(method, handler, str(status))
+            if status >= 500 and not scope.get(ADMISSION_REJECTED_KEY):
+                REQUEST_ERRORS.inc(method, handler)
@@ -1,18 +1,57 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Numeric, Boolean
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, Text, JSON, Numeric, Boolean, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.database import Base
 
 
+# Claim.status values for claims still moving through the pipeline (covered by a partial index)
+OPEN_CLAIM_STATUSES = ("assessed", "pending_review", "escalated")
+# Claim.status values waiting on a senior reviewer (served by /api/review-queue)
+REVIEW_QUEUE_STATUSES = ("pending_review", "escalated")
+# Claim.current_stage that app/persistence writes together with each status
+CLAIM_STAGES = {
+    "assessed": "damage_assessment",
+    "pending_review": "repair_estimate",
+    "escalated": "senior_review",
+    "approved": "senior_review",
+    "denied": "senior_review",
+}
+
+# Full-text search document columns (app/search.py). On PostgreSQL they are filled by
+# BEFORE INSERT/UPDATE triggers (see the add_search_vectors migration); plain unused text elsewhere.
+SearchVector = TSVECTOR().with_variant(Text(), "sqlite")
+
+
 class Claim(Base):
     __tablename__ = "claims"
 
     id = Column(Integer, primary_key=True, index=True)
     # Kept for future use - may be needed for querying claims by policy number
     policy_number = Column(String, nullable=True)
+    # Denormalized pipeline position, kept current by the stage writes in app/persistence.py
+    status = Column(String(32), nullable=False, server_default="assessed")
+    current_stage = Column(String(32), nullable=False, server_default="damage_assessment")
+    latest_estimate_id = Column(Integer, nullable=True)
+    # Review queue lease: the reviewer holding the claim and when the lease lapses
+    assigned_to = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     # Kept for standard audit pattern - automatically updated by SQLAlchemy on record updates
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        Index(
+            "ix_claims_open_status",
+            "status",
+            "id",
+            postgresql_where=status.in_(OPEN_CLAIM_STATUSES),
+            sqlite_where=status.in_(OPEN_CLAIM_STATUSES),
+        ),
+        # Repeat-policy counts in auto-adjudication
+        Index("ix_claims_policy_number_created_at", "policy_number", "created_at"),
+    )
+
 
 class DamageAssessment(Base):
     __tablename__ = "damage_assessments"
@@ -20,7 +59,17 @@ class DamageAssessment(Base):
     id = Column(Integer, primary_key=True, index=True)
     claim_id = Column(Integer, nullable=True)
     assessment_data = Column(JSON, nullable=False)
+    # SHA-256 of the uploaded image in the content-addressed image store
+    image_digest = Column(String(64), nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # to_tsvector of assessment_data->>'reasoning'
+    search_vector = deferred(Column(SearchVector, nullable=True))
+
+    __table_args__ = (
+        Index("ix_damage_assessments_search_vector", "search_vector", postgresql_using="gin"),
+        # Latest assessment per claim (export)
+        Index("ix_damage_assessments_claim_id_id", "claim_id", "id"),
+    )
 
 
 class RepairEstimate(Base):
@@ -41,7 +90,19 @@ class SeniorReview(Base):
     claim_id = Column(Integer, nullable=True)
     repair_estimate_id = Column(Integer, nullable=True)
     review_data = Column(JSON, nullable=False)
+    # Claim status this review moved its claim to; NULL if the claim was already decided or the
+    # review was for a superseded estimate. The analytics rollups count these transitions.
+    claim_status = Column(String(32), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # to_tsvector of review_data->>'denial_comments'
+    search_vector = deferred(Column(SearchVector, nullable=True))
+
+    __table_args__ = (
+        Index("ix_senior_reviews_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_senior_reviews_repair_estimate_id", "repair_estimate_id"),
+        # Latest review per claim (export)
+        Index("ix_senior_reviews_claim_id_id", "claim_id", "id"),
+    )
 
 
 class SystemLog(Base):
@@ -51,6 +112,38 @@ class SystemLog(Base):
     log_type = Column(String, nullable=False)
     log_data = Column(JSON, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # to_tsvector of log_data->>'comments' (only claim_denial logs carry comments)
+    search_vector = deferred(Column(SearchVector, nullable=True))
+
+    __table_args__ = (
+        Index(
+            "ix_system_logs_search_vector",
+            "search_vector",
+            postgresql_using="gin",
+            postgresql_where=log_type == "claim_denial",
+        ),
+    )
+
+
+class ClaimDailyRollup(Base):
+    """Per-day estimate and review totals by damage type and severity, maintained by app/analytics.py.
+
+    Claim-level totals are stored under damage_type = damage_severity = "all". Each key is split
+    into shards written by different workers; the totals are the sum over shards.
+    """
+    __tablename__ = "claim_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    damage_type = Column(String(64), primary_key=True)
+    damage_severity = Column(String(32), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True, autoincrement=False, server_default="0")
+    estimates = Column(Integer, nullable=False, server_default="0")
+    line_items = Column(Integer, nullable=False, server_default="0")
+    estimated_cost = Column(Numeric(14, 2), nullable=False, server_default="0")
+    approvals = Column(Integer, nullable=False, server_default="0")
+    denials = Column(Integer, nullable=False, server_default="0")
+    escalations = Column(Integer, nullable=False, server_default="0")
+    approved_amount = Column(Numeric(14, 2), nullable=False, server_default="0")
 
 
 class DamageCostReference(Base):
@@ -0,0 +1,338 @@
+"""Single-statement persistence for the claim stage handlers.
+
+Each stage used to be written through the ORM as a sequence of round trips
+(parent SELECT, INSERT + flush per row, the system log INSERT, and refresh
+SELECTs after commit). On PostgreSQL each function here issues one
+data-modifying CTE that looks up the parent row, inserts the stage row and
+its system log entry, moves the claim's denormalized status/current_stage
+along, and returns the new ids. Other dialects (the SQLite stand-in used by
+the benchmarks) fall back to plain Core statements inside the same
+transaction. Estimates, and reviews that moved their claim (recorded in
+senior_reviews.claim_status), are then folded into the daily rollups
+(app/analytics.py) with one upsert, still in the caller's transaction.
+
+The statements are module-level constants so SQLAlchemy's compiled-statement
+cache is hit on every request. Callers still own the transaction and commit.
+"""
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import JSON, bindparam, insert, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from app.analytics import record_estimate_rollup, record_review_rollups
+from app.models import REVIEW_QUEUE_STATUSES, Claim, DamageAssessment, RepairEstimate, SeniorReview, SystemLog
+
+
+_ANALYSIS_CTE = text("""
+    WITH new_claim AS (
+        INSERT INTO claims (policy_number, status, current_stage)
+        VALUES (:policy_number, 'assessed', 'damage_assessment')
+        RETURNING id
+    ), new_assessment AS (
+        INSERT INTO damage_assessments (claim_id, assessment_data, image_digest)
+        SELECT id, CAST(:assessment_data AS json), CAST(:image_digest AS varchar) FROM new_claim
+        RETURNING id, claim_id
+    ), new_log AS (
+        INSERT INTO system_logs (log_type, log_data)
+        SELECT 'damage_analysis', json_build_object(
+            'claim_id', claim_id,
+            'result', CAST(:assessment_data AS json),
+            'image_filename', CAST(:image_filename AS text),
+            'image_digest', CAST(:image_digest AS text)
+        )
+        FROM new_assessment
+    )
+    SELECT id, claim_id FROM new_assessment
+""").bindparams(bindparam("assessment_data", type_=JSON))
+
+_ESTIMATE_CTE = text("""
+    WITH new_estimate AS (
+        INSERT INTO repair_estimates (claim_id, damage_assessment_id, estimate_data)
+        VALUES (
+            (SELECT claim_id FROM damage_assessments WHERE id = CAST(:damage_assessment_id AS integer)),
+            CAST(:damage_assessment_id AS integer),
+            CAST(:estimate_data AS json)
+        )
+        RETURNING id, claim_id
+    ), claim_update AS (
+        UPDATE claims SET
+            status = 'pending_review', current_stage = 'repair_estimate',
+            latest_estimate_id = new_estimate.id, updated_at = now()
+        FROM new_estimate WHERE claims.id = new_estimate.claim_id
+    ), new_log AS (
+        INSERT INTO system_logs (log_type, log_data)
+        SELECT 'estimate_generation', json_build_object(
+            'estimate_id', id,
+            'result', CAST(:estimate_data AS json)
+        )
+        FROM new_estimate
+    )
+    SELECT id, claim_id FROM new_estimate
+""").bindparams(bindparam("estimate_data", type_=JSON))
+
+_REVIEW_CTE = text("""
+    WITH estimate AS (
+        SELECT id, claim_id, estimate_data FROM repair_estimates WHERE id = CAST(:repair_estimate_id AS integer)
+    ), claim_update AS (
+        UPDATE claims SET
+            status = CAST(:claim_status AS varchar), current_stage = 'senior_review',
+            assigned_to = NULL, lease_expires_at = NULL, updated_at = now()
+        FROM estimate
+        WHERE claims.id = estimate.claim_id
+            AND claims.status IN ('pending_review', 'escalated')
+            AND (claims.latest_estimate_id IS NULL OR claims.latest_estimate_id = estimate.id)
+        RETURNING claims.status
+    ), new_review AS (
+        INSERT INTO senior_reviews (claim_id, repair_estimate_id, review_data, claim_status)
+        VALUES (
+            (SELECT claim_id FROM estimate),
+            CAST(:repair_estimate_id AS integer),
+            CAST(:review_data AS json),
+            (SELECT status FROM claim_update)
+        )
+        RETURNING id, claim_id, claim_status
+    ), new_log AS (
+        INSERT INTO system_logs (log_type, log_data)
+        SELECT 'claim_approval_authorization', json_build_object(
+            'review_id', id,
+            'result', CAST(:review_data AS json)
+        )
+        FROM new_review
+    )
+    SELECT id, claim_id, claim_status, (SELECT estimate_data FROM estimate) AS estimate_data
+    FROM new_review
+""").bindparams(bindparam("review_data", type_=JSON))
+
+_DENIAL_CTE = text("""
+    WITH estimate AS (
+        SELECT id, claim_id, estimate_data FROM repair_estimates WHERE id = CAST(:repair_estimate_id AS integer)
+    ), claim_update AS (
+        UPDATE claims SET
+            status = CAST(:claim_status AS varchar), current_stage = 'senior_review',
+            assigned_to = NULL, lease_expires_at = NULL, updated_at = now()
+        FROM estimate
+        WHERE claims.id = estimate.claim_id
+            AND claims.status IN ('pending_review', 'escalated')
+            AND (claims.latest_estimate_id IS NULL OR claims.latest_estimate_id = estimate.id)
+        RETURNING claims.status
+    ), new_review AS (
+        INSERT INTO senior_reviews (claim_id, repair_estimate_id, review_data, claim_status)
+        VALUES (
+            (SELECT claim_id FROM estimate),
+            CAST(:repair_estimate_id AS integer),
+            CAST(:review_data AS json),
+            (SELECT status FROM claim_update)
+        )
+        RETURNING id, claim_id, claim_status
+    ), new_log AS (
+        INSERT INTO system_logs (log_type, log_data)
+        SELECT 'claim_denial', json_build_object(
+            'review_id', id,
+            'comments', CAST(:comments AS text)
+        )
+        FROM new_review
+    )
+    SELECT id, claim_id, claim_status, (SELECT estimate_data FROM estimate) AS estimate_data
+    FROM new_review
+""").bindparams(bindparam("review_data", type_=JSON))
+
+# Fallback statements for dialects without data-modifying CTEs
+_INSERT_CLAIM = insert(Claim.__table__).returning(Claim.__table__.c.id)
+_INSERT_ASSESSMENT = insert(DamageAssessment.__table__).returning(DamageAssessment.__table__.c.id)
+_INSERT_ESTIMATE = insert(RepairEstimate.__table__).returning(RepairEstimate.__table__.c.id)
+_INSERT_REVIEW = insert(SeniorReview.__table__).returning(SeniorReview.__table__.c.id)
+_INSERT_LOG = insert(SystemLog.__table__)
+_ASSESSMENT_CLAIM_ID = select(DamageAssessment.claim_id).where(DamageAssessment.id == bindparam("id"))
+_ESTIMATE_PARENT = select(RepairEstimate.claim_id, RepairEstimate.estimate_data).where(
+    RepairEstimate.id == bindparam("id")
+)
+_ESTIMATES_DATA = select(RepairEstimate.id, RepairEstimate.estimate_data).where(
+    RepairEstimate.id.in_(bindparam("ids", expanding=True))
+)
+_MARK_ESTIMATED = (
+    update(Claim.__table__)
+    .where(Claim.__table__.c.id == bindparam("claim_id"))
+    .values(status="pending_review", current_stage="repair_estimate", latest_estimate_id=bindparam("estimate_id"))
+)
+
+# Used by the fallback path and, on every dialect, by the bulk review writes. Only claims still
+# awaiting review move, so a late review never reverts an approval or denial.
+_INSERT_REVIEWS = insert(SeniorReview.__table__)
+_MARK_REVIEWED = (
+    update(Claim.__table__)
+    .where(
+        Claim.__table__.c.id.in_(bindparam("claim_ids", expanding=True)),
+        Claim.__table__.c.status.in_(REVIEW_QUEUE_STATUSES),
+    )
+    .values(status=bindparam("new_status"), current_stage="senior_review", assigned_to=None, lease_expires_at=None)
+)
+# A single review moves its claim only if it reviews the claim's latest estimate
+_MARK_ESTIMATE_REVIEWED = _MARK_REVIEWED.where(or_(
+    Claim.__table__.c.latest_estimate_id.is_(None),
+    Claim.__table__.c.latest_estimate_id == bindparam("estimate_id"),
+))
+_MARK_CLAIMS_REVIEWED = _MARK_REVIEWED.returning(Claim.__table__.c.id)
+
+
+def _supports_cte_writes(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def record_damage_analysis(
+    db: Session,
+    policy_number: Optional[str],
+    assessment_data: Dict[str, Any],
+    image_filename: str,
+    image_digest: Optional[str],
+) -> Tuple[int, int]:
+    """Insert the claim, its damage assessment and the system log. Returns (claim_id, assessment_id)."""
+    if _supports_cte_writes(db):
+        row = db.execute(_ANALYSIS_CTE, {
+            "policy_number": policy_number,
+            "assessment_data": assessment_data,
+            "image_filename": image_filename,
+            "image_digest": image_digest,
+        }).one()
+        return row.claim_id, row.id
+
+    claim_id = db.execute(_INSERT_CLAIM, {
+        "policy_number": policy_number, "status": "assessed", "current_stage": "damage_assessment"
+    }).scalar_one()
+    assessment_id = db.execute(_INSERT_ASSESSMENT, {
+        "claim_id": claim_id, "assessment_data": assessment_data, "image_digest": image_digest
+    }).scalar_one()
+    db.execute(_INSERT_LOG, {
+        "log_type": "damage_analysis",
+        "log_data": {
+            "claim_id": claim_id,
+            "result": assessment_data,
+            "image_filename": image_filename,
+            "image_digest": image_digest,
+        },
+    })
+    return claim_id, assessment_id
+
+
+def record_estimate(
+    db: Session,
+    damage_assessment_id: Optional[int],
+    estimate_data: Dict[str, Any],
+) -> Tuple[Optional[int], int]:
+    """Insert a repair estimate linked to its assessment's claim, plus the system log. Returns (claim_id, estimate_id)."""
+    if _supports_cte_writes(db):
+        row = db.execute(_ESTIMATE_CTE, {
+            "damage_assessment_id": damage_assessment_id,
+            "estimate_data": estimate_data,
+        }).one()
+        record_estimate_rollup(db, estimate_data)
+        return row.claim_id, row.id
+
+    claim_id = None
+    if damage_assessment_id:
+        claim_id = db.execute(_ASSESSMENT_CLAIM_ID, {"id": damage_assessment_id}).scalar()
+    estimate_id = db.execute(_INSERT_ESTIMATE, {
+        "claim_id": claim_id, "damage_assessment_id": damage_assessment_id, "estimate_data": estimate_data
+    }).scalar_one()
+    if claim_id:
+        db.execute(_MARK_ESTIMATED, {"claim_id": claim_id, "estimate_id": estimate_id})
+    db.execute(_INSERT_LOG, {
+        "log_type": "estimate_generation",
+        "log_data": {"estimate_id": estimate_id, "result": estimate_data},
+    })
+    record_estimate_rollup(db, estimate_data)
+    return claim_id, estimate_id
+
+
+def _record_review(
+    db: Session,
+    cte,
+    repair_estimate_id: Optional[int],
+    review_data: Dict[str, Any],
+    cte_params: Dict[str, Any],
+    log_type: str,
+    log_fields: Dict[str, Any],
+) -> Tuple[Optional[int], int]:
+    claim_status = review_data.get("status") or "approved"
+    if _supports_cte_writes(db):
+        params = {"repair_estimate_id": repair_estimate_id, "review_data": review_data, "claim_status": claim_status}
+        params.update(cte_params)
+        row = db.execute(cte, params).one()
+        record_review_rollups(db, [(row.estimate_data, review_data, row.claim_status)])
+        return row.claim_id, row.id
+
+    claim_id = estimate_data = moved_to = None
+    if repair_estimate_id:
+        parent = db.execute(_ESTIMATE_PARENT, {"id": repair_estimate_id}).first()
+        if parent is not None:
+            claim_id, estimate_data = parent
+    if claim_id:
+        moved = db.execute(_MARK_ESTIMATE_REVIEWED, {
+            "claim_ids": [claim_id], "new_status": claim_status, "estimate_id": repair_estimate_id
+        }).rowcount
+        moved_to = claim_status if moved else None
+    review_id = db.execute(_INSERT_REVIEW, {
+        "claim_id": claim_id, "repair_estimate_id": repair_estimate_id, "review_data": review_data,
+        "claim_status": moved_to,
+    }).scalar_one()
+    log_data = {"review_id": review_id}
+    log_data.update(log_fields)
+    db.execute(_INSERT_LOG, {"log_type": log_type, "log_data": log_data})
+    record_review_rollups(db, [(estimate_data, review_data, moved_to)])
+    return claim_id, review_id
+
+
+def record_review(
+    db: Session,
+    repair_estimate_id: Optional[int],
+    review_data: Dict[str, Any],
+) -> Tuple[Optional[int], int]:
+    """Insert an approval review and its system log. Returns (claim_id, review_id)."""
+    return _record_review(
+        db, _REVIEW_CTE, repair_estimate_id, review_data, {},
+        "claim_approval_authorization", {"result": review_data},
+    )
+
+
+def record_denial(
+    db: Session,
+    repair_estimate_id: Optional[int],
+    review_data: Dict[str, Any],
+    comments: str,
+) -> Tuple[Optional[int], int]:
+    """Insert a denial review and its system log. Returns (claim_id, review_id)."""
+    return _record_review(
+        db, _DENIAL_CTE, repair_estimate_id, review_data, {"comments": comments},
+        "claim_denial", {"comments": comments},
+    )
+
+
+def record_reviews_bulk(
+    db: Session,
+    reviews: Sequence[Dict[str, Any]],
+    claim_statuses: Dict[str, Sequence[int]],
+    log_type: str,
+    log_data: Dict[str, Any],
+) -> int:
+    """Insert many reviews (claim_id, repair_estimate_id, review_data) as one executemany plus a single batch log.
+
+    `claim_statuses` maps each new claim status to the claim ids moving to it (one UPDATE per status);
+    claims no longer pending or escalated are left as they are, and their reviews get no claim_status.
+    """
+    if not reviews:
+        return 0
+    moved_to: Dict[int, str] = {}
+    for status, claim_ids in claim_statuses.items():
+        if claim_ids:
+            for claim_id in db.execute(_MARK_CLAIMS_REVIEWED, {"claim_ids": list(claim_ids), "new_status": status}).scalars():
+                moved_to[claim_id] = status
+    rows = [dict(review, claim_status=moved_to.get(review["claim_id"])) for review in reviews]
+    # executemany is batched into multi-row INSERTs by the driver / insertmanyvalues
+    db.execute(_INSERT_REVIEWS, rows)
+    db.execute(_INSERT_LOG, {"log_type": log_type, "log_data": log_data})
+
+    estimate_ids = [row["repair_estimate_id"] for row in rows if row["repair_estimate_id"]]
+    estimates = dict(db.execute(_ESTIMATES_DATA, {"ids": estimate_ids}).all()) if estimate_ids else {}
+    record_review_rollups(db, [
+        (estimates.get(row["repair_estimate_id"]), row["review_data"], row["claim_status"]) for row in rows
+    ])
+    return len(rows)
@@ -0,0 +1,38 @@
+"""Repair estimate pricing from the damage_cost_reference table."""
+from typing import Any, Dict, Optional, Sequence
+
+# Damage types / severities with cost reference rows
+DAMAGE_TYPES = ("scratches", "dents", "structural_damage")
+DAMAGE_SEVERITIES = ("minor", "major")
+
+LABOR_RATE = 100  # $ per labor hour
+
+
+def normalize_damage_type(damage_type: str) -> Optional[str]:
+    """Map a damage label ("structural damage", "Dents", ...) to its reference value, or None if unknown."""
+    normalized = damage_type.lower().replace(" ", "_")
+    return normalized if normalized in DAMAGE_TYPES else None
+
+
+def build_estimate(cost_refs: Sequence[Any]) -> Dict[str, Any]:
+    """Estimate totals and line items for DamageCostReference rows (or objects with the same attributes)."""
+    line_items = [
+        {
+            "damage_type": ref.damage_type,
+            "damage_severity": ref.damage_severity,
+            "base_cost": ref.base_cost,
+            "parts_cost": ref.parts_cost,
+            "labor_hours": float(ref.labor_hours),
+            "labor_cost": float(ref.labor_hours) * LABOR_RATE,
+            "notes": ref.notes
+        }
+        for ref in cost_refs
+    ]
+    total_labor_hours = sum(item["labor_hours"] for item in line_items)
+    return {
+        "total_base_cost": sum(item["base_cost"] for item in line_items),
+        "total_parts_cost": sum(item["parts_cost"] for item in line_items),
+        "total_labor_hours": total_labor_hours,
+        "total_labor_cost": total_labor_hours * LABOR_RATE,
+        "line_items": line_items
+    }
@@ -0,0 +1,272 @@
+"""Opt-in statistical profiling of live API requests.
+
+A sampled request registers the thread it runs on, and a background thread
+periodically captures that thread's stack via `sys._current_frames()`. Work
+the request hands to the threadpool (sync `def` endpoints and dependencies,
+run_in_threadpool calls) registers its worker thread with the request's
+session for as long as it runs, so it is sampled too. The sampler thread
+only exists while profiling is enabled, and the middleware does a single
+attribute check per request otherwise.
+
+Async endpoints all run on the event-loop thread, so overlapping requests
+share samples; profiles are statistical views of the worker, not exact
+per-request traces. Profiles are written from the threadpool, off the loop.
+"""
+import contextvars
+import functools
+import itertools
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio.to_thread
+from starlette.concurrency import run_in_threadpool
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "speedscope")  # speedscope or collapsed
+PROFILE_SAMPLE_RATE = _env_float("PROFILE_SAMPLE_RATE", 0.01)
+PROFILE_INTERVAL = _env_float("PROFILE_INTERVAL", 0.005)  # seconds between stack samples
+
+Frame = Tuple[str, str, int]  # (function, file, line)
+
+# Profile session of the request being handled; copied into threadpool workers with the context
+_current_session: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar(
+    "profile_session", default=None
+)
+_run_sync = anyio.to_thread.run_sync
+
+
+async def _run_sync_profiled(func, *args, **kwargs):
+    session = _current_session.get()
+    if session is not None:
+        func = functools.partial(session.run_in_thread, func)
+    return await _run_sync(func, *args, **kwargs)
+
+
+def _install_threadpool_hook() -> None:
+    """Route threadpool calls through _run_sync_profiled.
+
+    Starlette's run_in_threadpool (sync endpoints and dependencies) looks up
+    anyio.to_thread.run_sync on every call, so this covers them all. Installed
+    on first enable, so workers that never profile are untouched.
+    """
+    anyio.to_thread.run_sync = _run_sync_profiled
+
+
+class ProfileSession:
+    """Stack samples collected for a single request."""
+
+    def __init__(self, name: str, thread_id: int):
+        self.name = name
+        # The request's own thread plus any threadpool workers currently running its work
+        self.thread_ids = {thread_id}
+        self.started_at = time.time()
+        self.samples: List[Tuple[Frame, ...]] = []
+
+    def run_in_thread(self, func, *args):
+        """Run `func` on the current (worker) thread, sampling the thread while it does."""
+        thread_id = threading.get_ident()
+        self.thread_ids.add(thread_id)
+        try:
+            return func(*args)
+        finally:
+            self.thread_ids.discard(thread_id)
+
+    def add_sample(self, frame) -> None:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, frame.f_lineno))
+            frame = frame.f_back
+        stack.reverse()
+        self.samples.append(tuple(stack))
+
+    def to_collapsed(self) -> str:
+        counts = Counter(
+            ";".join("{} ({}:{})".format(name, filename, line) for name, filename, line in stack)
+            for stack in self.samples
+        )
+        return "".join("{} {}\n".format(stack, count) for stack, count in counts.items())
+
+    def to_speedscope(self, interval: float) -> Dict[str, Any]:
+        frame_index: Dict[Frame, int] = {}
+        frames: List[Dict[str, Any]] = []
+        samples = []
+        for stack in self.samples:
+            indices = []
+            for frame in stack:
+                index = frame_index.get(frame)
+                if index is None:
+                    index = frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indices.append(index)
+            samples.append(indices)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "claims-api",
+            "name": self.name,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": len(samples) * interval,
+                "samples": samples,
+                "weights": [interval] * len(samples),
+            }],
+        }
+
+
+class Profiler:
+    """Samples a fraction of /api/* requests with a background stack sampler."""
+
+    def __init__(
+        self,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        interval: float = PROFILE_INTERVAL,
+        output_dir: str = PROFILE_OUTPUT_DIR,
+        output_format: str = PROFILE_FORMAT,
+    ):
+        self.enabled = False
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.output_dir = output_dir
+        self.output_format = output_format
+        # Replaced wholesale under the lock so the sampler can read it without locking
+        self._sessions: Tuple[ProfileSession, ...] = ()
+        # Reentrant: the SIGUSR2 handler calls enable() on the main thread, possibly while that thread
+        # (the event loop) already holds the lock in start_session/finish_session
+        self._lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._sequence = itertools.count(1)
+        self.profiles_written = 0
+
+    def enable(self, sample_rate: Optional[float] = None) -> None:
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        with self._lock:
+            self.enabled = True
+            _install_threadpool_hook()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+                self._thread.start()
+
+    def disable(self) -> None:
+        # The sampler thread exits on its next tick
+        self.enabled = False
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "interval": self.interval,
+            "output_dir": self.output_dir,
+            "output_format": self.output_format,
+            "active_sessions": len(self._sessions),
+            "profiles_written": self.profiles_written,
+        }
+
+    def should_sample(self, path: str) -> bool:
+        return path.startswith("/api/") and random.random() < self.sample_rate
+
+    def start_session(self, name: str) -> ProfileSession:
+        session = ProfileSession(name, threading.get_ident())
+        with self._lock:
+            self._sessions = self._sessions + (session,)
+        return session
+
+    def finish_session(self, session: ProfileSession) -> bool:
+        """Stop sampling `session`; True if it has samples to write."""
+        with self._lock:
+            self._sessions = tuple(s for s in self._sessions if s is not session)
+        return bool(session.samples)
+
+    def _run(self) -> None:
+        while self.enabled:
+            sessions = self._sessions
+            if sessions:
+                frames = sys._current_frames()
+                for session in sessions:
+                    for thread_id in tuple(session.thread_ids):
+                        frame = frames.get(thread_id)
+                        if frame is not None:
+                            session.add_sample(frame)
+                del frames
+            time.sleep(self.interval)
+
+    def write(self, session: ProfileSession) -> str:
+        """Write a finished session's profile (blocking file I/O; call it off the event loop)."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = "{}-{}-{}-{}".format(
+            time.strftime("%Y%m%dT%H%M%S", time.gmtime(session.started_at)),
+            session.name.strip("/").replace("/", "_") or "root",
+            os.getpid(),
+            next(self._sequence),
+        )
+        if self.output_format == "collapsed":
+            path = os.path.join(self.output_dir, stem + ".collapsed.txt")
+            with open(path, "w") as f:
+                f.write(session.to_collapsed())
+        else:
+            path = os.path.join(self.output_dir, stem + ".speedscope.json")
+            with open(path, "w") as f:
+                json.dump(session.to_speedscope(self.interval), f)
+        self.profiles_written += 1
+        return path
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles a sampled fraction of /api/* requests."""
+
+    def __init__(self, app, profiler: Profiler = profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if not self.profiler.enabled or scope["type"] != "http" or not self.profiler.should_sample(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.start_session(scope["path"])
+        token = _current_session.set(session)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_session.reset(token)
+            if self.profiler.finish_session(session):
+                await run_in_threadpool(self.profiler.write, session)
+
+
+def install_signal_handler(sig: int = getattr(signal, "SIGUSR2", 0)) -> bool:
+    """Toggle profiling when the worker receives `sig` (SIGUSR2 by default)."""
+    if not sig:
+        return False
+
+    def _toggle(signum, frame):
+        if profiler.enabled:
+            profiler.disable()
+        else:
+            profiler.enable()
+
+    try:
+        signal.signal(sig, _toggle)
+    except ValueError:
+        # Signal handlers can only be installed from the main thread
+        return False
+    return True
@@ -0,0 +1,88 @@
+"""Senior review work queue over the denormalized Claim.status.
+
+Listing uses keyset pagination on claims.id, served by the partial index on
+open statuses. Claiming picks the oldest unleased claims with FOR UPDATE SKIP
+LOCKED and stamps the lease in the same UPDATE, so concurrent reviewers never
+wait on each other or receive the same claim. An expired lease puts the claim
+back in the queue; recording a review or denial clears it.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import REVIEW_QUEUE_STATUSES, Claim
+
+DEFAULT_LEASE_SECONDS = 300
+MAX_PAGE_SIZE = 200
+
+_claims = Claim.__table__
+
+QUEUE_COLUMNS = (
+    _claims.c.id,
+    _claims.c.policy_number,
+    _claims.c.status,
+    _claims.c.current_stage,
+    _claims.c.latest_estimate_id,
+    _claims.c.assigned_to,
+    _claims.c.lease_expires_at,
+    _claims.c.created_at,
+)
+
+
+def _unleased(now: datetime):
+    return or_(_claims.c.lease_expires_at.is_(None), _claims.c.lease_expires_at < now)
+
+
+def list_queue(
+    db: Session,
+    after_id: Optional[int] = None,
+    limit: int = 50,
+    statuses: Sequence[str] = REVIEW_QUEUE_STATUSES,
+    include_leased: bool = False,
+):
+    """One page of claims awaiting review, oldest first, starting after `after_id`."""
+    query = select(*QUEUE_COLUMNS).where(_claims.c.status.in_(list(statuses)))
+    if after_id is not None:
+        query = query.where(_claims.c.id > after_id)
+    if not include_leased:
+        query = query.where(_unleased(datetime.now(timezone.utc)))
+    return db.execute(query.order_by(_claims.c.id).limit(limit)).all()
+
+
+def claim_next(
+    db: Session,
+    reviewer_id: str,
+    limit: int = 1,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    statuses: Sequence[str] = REVIEW_QUEUE_STATUSES,
+):
+    """Lease up to `limit` of the oldest available claims to `reviewer_id` and return them."""
+    now = datetime.now(timezone.utc)
+    candidates = (
+        select(_claims.c.id)
+        .where(_claims.c.status.in_(list(statuses)), _unleased(now))
+        .order_by(_claims.c.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        update(_claims)
+        .where(_claims.c.id.in_(candidates))
+        .values(assigned_to=reviewer_id, lease_expires_at=now + timedelta(seconds=lease_seconds))
+        .returning(*QUEUE_COLUMNS)
+    ).all()
+    # RETURNING order is unspecified
+    return sorted(rows, key=lambda row: row.id)
+
+
+def release(db: Session, claim_id: int, reviewer_id: str) -> bool:
+    """Give a leased claim back to the queue. Returns False if `reviewer_id` does not hold it."""
+    result = db.execute(
+        update(_claims)
+        .where(_claims.c.id == claim_id, _claims.c.assigned_to == reviewer_id)
+        .values(assigned_to=None, lease_expires_at=None)
+    )
+    return result.rowcount > 0
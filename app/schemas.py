@@ -0,0 +1,32 @@
+"""Pydantic request models shared by the API and the bulk importer.
+
+Kept apart from app/main.py so offline tools (app/bulk_import.py and its
+worker processes) can validate records without importing the application.
+"""
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class DamageAssessmentItem(BaseModel):
+    damage_type: str
+    severity: str
+
+class GenerateEstimateRequest(BaseModel):
+    damage_assessment_id: Optional[int] = None
+    damage_labels: Optional[List[str]] = None
+    # Kept for backward compatibility/fallback purposes when damage_assessments is not provided
+    damage_severity: Optional[str] = None  # minor or major (deprecated, use damage_assessments)
+    damage_assessments: Optional[List[DamageAssessmentItem]] = None
+
+
+class ClaimApprovalAuthorizationRequest(BaseModel):
+    """Request model for Claim Approval & Authorization stage."""
+    estimate_id: Optional[int] = None
+    estimate_data: Optional[Dict[str, Any]] = None
+
+
+class ClaimDenialRequest(BaseModel):
+    """Request model for Claim Approval & Authorization: claim denial."""
+    estimate_id: Optional[int] = None
+    denial_comments: str
@@ -0,0 +1,156 @@
+"""Full-text search over damage assessment reasoning and denial comments.
+
+On PostgreSQL each searchable table has a `search_vector` tsvector column,
+kept current by a trigger and covered by a GIN index (see the
+add_search_vectors migration). Queries use websearch syntax ("rear bumper",
+-scratches, dents OR cracks), are ranked with ts_rank_cd across all sources
+and paginated by offset; ts_headline runs only for the rows of the returned
+page. Other dialects fall back to an unranked substring match on every term,
+newest first. Highlights are HTML: the stored text is escaped and only the
+<mark> tags around matches are markup.
+"""
+import html
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import Integer, and_, cast, func, literal, literal_column, null, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models import DamageAssessment, SeniorReview, SystemLog
+
+TEXT_SEARCH_CONFIG = "english"
+MAX_PAGE_SIZE = 100
+# ts_headline marks matches with control characters rather than <mark> tags, so the stored text
+# can be HTML-escaped afterwards (it is user input) without escaping the markup as well
+_START_SEL, _STOP_SEL = "\x02", "\x03"
+HEADLINE_OPTIONS = "StartSel={}, StopSel={}, MaxFragments=2, MaxWords=30, MinWords=10".format(_START_SEL, _STOP_SEL)
+
+# source -> (model, JSON column, key of the searched text); keep in step with the migration's triggers
+SOURCES = {
+    "assessments": (DamageAssessment, "assessment_data", "reasoning"),
+    "denials": (SeniorReview, "review_data", "denial_comments"),
+    # The claim_denial system logs repeat the denial comments, so they are only searched on request
+    "logs": (SystemLog, "log_data", "comments"),
+}
+DEFAULT_SOURCES = ("assessments", "denials")
+
+# Best rank first; ties (and the unranked fallback) newest first
+_ORDER = (literal_column("rank").desc(), literal_column("created_at").desc(), literal_column("id").desc())
+
+
+def _source_query(source: str, rank, match, since: Optional[datetime], until: Optional[datetime]):
+    model, column, key = SOURCES[source]
+    document = getattr(model, column)[key].as_string()
+    query = select(
+        literal(source).label("source"),
+        model.id,
+        model.claim_id if source != "logs" else cast(null(), Integer).label("claim_id"),
+        model.created_at,
+        rank(model).label("rank"),
+        document.label("document"),
+    ).where(match(model, document))
+    if source == "logs":
+        query = query.where(SystemLog.log_type == "claim_denial")
+    if since is not None:
+        query = query.where(model.created_at >= since)
+    if until is not None:
+        query = query.where(model.created_at < until)
+    return query
+
+
+def search(
+    db: Session,
+    text: str,
+    sources: Sequence[str] = DEFAULT_SOURCES,
+    limit: int = 20,
+    offset: int = 0,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """One page of matches across `sources`, best first, each with a highlighted excerpt."""
+    if db.get_bind().dialect.name != "postgresql":
+        return _search_substring(db, text, sources, limit, offset, since, until)
+
+    tsquery = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, text)
+    hits = (
+        union_all(*[
+            _source_query(
+                source,
+                lambda model: func.ts_rank_cd(model.search_vector, tsquery),
+                lambda model, document: model.search_vector.op("@@")(tsquery),
+                since, until,
+            )
+            for source in sources
+        ])
+        .order_by(*_ORDER)
+        .limit(limit)
+        .offset(offset)
+        .subquery("hits")
+    )
+    rows = db.execute(
+        select(
+            hits.c.source, hits.c.id, hits.c.claim_id, hits.c.created_at, hits.c.rank,
+            func.ts_headline(
+                TEXT_SEARCH_CONFIG,
+                # Drop any selector characters already in the text so only ts_headline's mark matches
+                func.translate(hits.c.document, _START_SEL + _STOP_SEL, ""),
+                tsquery,
+                HEADLINE_OPTIONS,
+            ).label("highlight"),
+        ).order_by(hits.c.rank.desc(), hits.c.created_at.desc(), hits.c.id.desc())
+    ).all()
+    return [_result(row, _markup_headline(row.highlight)) for row in rows]
+
+
+def _markup_headline(headline: Optional[str]) -> Optional[str]:
+    """HTML-escape a ts_headline excerpt and turn its selector characters into <mark> tags."""
+    if headline is None:
+        return None
+    return html.escape(headline).replace(_START_SEL, "<mark>").replace(_STOP_SEL, "</mark>")
+
+
+def _highlight_terms(document: Optional[str], pattern) -> Optional[str]:
+    """HTML-escape `document`, wrapping each match of `pattern` in <mark> tags."""
+    if document is None:
+        return None
+    if pattern is None:
+        return html.escape(document)
+    parts, end = [], 0
+    for match in pattern.finditer(document):
+        parts.append(html.escape(document[end:match.start()]))
+        parts.append("<mark>{}</mark>".format(html.escape(match.group(0))))
+        end = match.end()
+    parts.append(html.escape(document[end:]))
+    return "".join(parts)
+
+
+def _search_substring(db, text, sources, limit, offset, since, until) -> List[Dict[str, Any]]:
+    terms = re.findall(r"\w+", text.lower())
+    query = (
+        union_all(*[
+            _source_query(
+                source,
+                lambda model: literal(0.0),
+                lambda model, document: and_(*[func.lower(document).contains(term, autoescape=True) for term in terms]),
+                since, until,
+            )
+            for source in sources
+        ])
+        .order_by(*_ORDER)
+        .limit(limit)
+        .offset(offset)
+    )
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE) if terms else None
+    return [_result(row, _highlight_terms(row.document, pattern)) for row in db.execute(query).all()]
+
+
+def _result(row, highlight: Optional[str]) -> Dict[str, Any]:
+    return {
+        "source": row.source,
+        "id": row.id,
+        "claim_id": row.claim_id,
+        "created_at": row.created_at,
+        "rank": float(row.rank),
+        "highlight": highlight,
+    }
@@ -0,0 +1,33 @@
+"""orjson-backed JSON helpers shared by API responses and the JSON columns."""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse as StarletteJSONResponse
+
+# Match stdlib json's handling of non-string dict keys; serialize NumPy values natively
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    # Numeric columns (e.g. labor_hours) come back from the database as Decimal
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError("Object of type {} is not JSON serializable".format(type(obj).__name__))
+
+
+def json_dumps(obj: Any) -> str:
+    """Serializer for SQLAlchemy JSON columns (DBAPI drivers expect str)."""
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS).decode()
+
+
+def json_loads(data: Any) -> Any:
+    """Deserializer for SQLAlchemy JSON columns."""
+    return orjson.loads(data)
+
+
+class JSONResponse(StarletteJSONResponse):
+    """Default API response class: orjson rendering with Decimal support."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
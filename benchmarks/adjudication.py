@@ -0,0 +1,163 @@
+"""Auto-adjudication throughput: rule evaluation in memory, and bulk reviews against a database.
+
+"rules" cases time feature extraction plus the compiled rule evaluation over
+synthetic estimates. "reviews" cases seed pending estimates and compare one
+review per estimate through app.persistence.record_review ("before") with
+app.adjudication + a bulk insert, as /api/reviews/auto-adjudicate does ("after").
+
+    python -m benchmarks.adjudication --batch-sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import latency_summary, prepare_database, print_table, save_results
+
+DAMAGE_TYPES = ("scratches", "dents", "structural_damage")
+
+
+def synthetic_estimates(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    estimates = []
+    for _ in range(count):
+        items = [
+            {"damage_type": damage_type, "damage_severity": rng.choice(("minor", "major"))}
+            for damage_type in rng.sample(DAMAGE_TYPES, rng.randint(1, 3))
+        ]
+        estimates.append({
+            "total_parts_cost": rng.randint(0, 3000),
+            "total_labor_cost": float(rng.randint(0, 2000)),
+            "line_items": items,
+        })
+    return estimates
+
+
+def bench_rules(batch_size: int, iterations: int) -> Dict[str, Any]:
+    from app.adjudication import extract_features, get_compiled_rules
+
+    rules = get_compiled_rules()
+    estimates = synthetic_estimates(batch_size)
+    policy_claims = [i % 4 for i in range(batch_size)]
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        rules.evaluate(extract_features(estimates, policy_claims))
+        timings.append(time.perf_counter() - start)
+    result = latency_summary(timings)
+    result["estimates_per_sec"] = batch_size * iterations / sum(timings)
+    return result
+
+
+def bench_reviews(session_factory, batch_size: int) -> Dict[str, Dict[str, Any]]:
+    from sqlalchemy import delete
+
+    from app import adjudication, models, persistence
+
+    def seed():
+        db = session_factory()
+        try:
+            db.execute(delete(models.SeniorReview))
+            db.execute(delete(models.RepairEstimate))
+            claims = [
+                models.Claim(policy_number="BENCH-{}".format(i % 500), status="pending_review")
+                for i in range(batch_size)
+            ]
+            db.add_all(claims)
+            db.flush()
+            estimates = [
+                models.RepairEstimate(claim_id=claim.id, estimate_data=estimate)
+                for claim, estimate in zip(claims, synthetic_estimates(batch_size))
+            ]
+            db.add_all(estimates)
+            db.flush()
+            # Only a claim's latest estimate is adjudicated
+            for claim, estimate in zip(claims, estimates):
+                claim.latest_estimate_id = estimate.id
+            db.commit()
+        finally:
+            db.close()
+
+    def before(db):
+        rules = adjudication.get_compiled_rules()
+        for decision in adjudication.adjudicate_pending(db, batch_size, rules):
+            row = adjudication.review_rows([decision], rules.version)[0]
+            persistence.record_review(db, row["repair_estimate_id"], row["review_data"])
+        db.commit()
+
+    def after(db):
+        rules = adjudication.get_compiled_rules()
+        decisions = adjudication.adjudicate_pending(db, batch_size, rules)
+        persistence.record_reviews_bulk(
+            db,
+            adjudication.review_rows(decisions, rules.version),
+            adjudication.claim_status_updates(decisions),
+            "auto_adjudication",
+            {"rules_version": rules.version},
+        )
+        db.commit()
+
+    results = {}
+    for label, write in (("before", before), ("after", after)):
+        seed()
+        db = session_factory()
+        try:
+            start = time.perf_counter()
+            write(db)
+            elapsed = time.perf_counter() - start
+        finally:
+            db.close()
+        results[label] = {"mean_ms": elapsed * 1000.0, "estimates_per_sec": batch_size / elapsed}
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database for the review cases (default: temporary SQLite file)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--review-batch-size", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "adjudication.json"))
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for batch_size in args.batch_sizes:
+        results["rules n={}".format(batch_size)] = bench_rules(batch_size, args.iterations)
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory(prefix="claims-adjudication-")
+        database_url = "sqlite:///{}".format(os.path.join(tmpdir.name, "adjudication.db"))
+    prepare_database(database_url)
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.serialization import json_dumps, json_loads
+
+    engine = create_engine(database_url, json_serializer=json_dumps, json_deserializer=json_loads)
+    try:
+        session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        for label, row in bench_reviews(session_factory, args.review_batch_size).items():
+            results["reviews n={} {}".format(args.review_batch_size, label)] = row
+    finally:
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print_table(results, ["mean_ms", "p95_ms", "estimates_per_sec"])
+    save_results(args.output, "adjudication", results, {
+        "database": database_url.split("://")[0],
+        "batch_sizes": args.batch_sizes,
+        "review_batch_size": args.review_batch_size,
+        "iterations": args.iterations,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
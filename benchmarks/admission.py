@@ -0,0 +1,139 @@
+"""Admission control check: uploads at a sustainable rate must never be shed.
+
+Starts the API with admission control on (app.admission defaults) and runs:
+
+- "sequential uploads": one client posting `--resolution` images to
+  /api/analyze-damage one after another, `--gap-ms` apart;
+- "reads during uploads": GET /api/approved-repair-shops while
+  `--upload-clients` clients upload back to back.
+
+Reports latency and the 429/503 responses per case, and exits with status 1
+if any sequential upload or read was rejected.
+
+    python -m benchmarks.admission --uploads 20 --resolution 4032x3024
+"""
+import argparse
+import http.client
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import (
+    latency_summary, parse_resolution, prepare_database, print_table, save_results, synthetic_damage_image
+)
+from benchmarks.load import Server, _free_port, _json_request, _multipart, send
+
+REJECTED = (429, 503)
+
+
+def _summary(latencies: List[float], statuses: List[int]) -> Dict[str, Any]:
+    result: Dict[str, Any] = dict(latency_summary(latencies))
+    result["requests"] = len(statuses)
+    result["rejected"] = sum(1 for status in statuses if status in REJECTED)
+    result["errors"] = sum(1 for status in statuses if status >= 400 and status not in REJECTED)
+    return result
+
+
+def _upload(conn: http.client.HTTPConnection, image: bytes, index: int):
+    body, content_type = _multipart(
+        {"policy_number": "ADMISSION-{}".format(index)}, "image", "damage.jpg", image, "image/jpeg"
+    )
+    start = time.perf_counter()
+    status, _ = send(conn, ("POST", "/api/analyze-damage", body, {"Content-Type": content_type}))
+    return status, time.perf_counter() - start
+
+
+def sequential_uploads(port: int, image: bytes, uploads: int, gap: float) -> Dict[str, Any]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    latencies, statuses = [], []
+    for index in range(uploads):
+        status, elapsed = _upload(conn, image, index)
+        statuses.append(status)
+        latencies.append(elapsed)
+        time.sleep(gap)
+    conn.close()
+    return _summary(latencies, statuses)
+
+
+def reads_during_uploads(port: int, image: bytes, upload_clients: int, reads: int) -> Dict[str, Any]:
+    done = threading.Event()
+
+    def uploader(client: int):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        index = client * 100000
+        while not done.is_set():
+            _upload(conn, image, index)
+            index += 1
+        conn.close()
+
+    threads = [threading.Thread(target=uploader, args=(client,)) for client in range(upload_clients)]
+    for thread in threads:
+        thread.start()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    latencies, statuses = [], []
+    try:
+        time.sleep(0.5)  # let the uploads get going
+        for _ in range(reads):
+            start = time.perf_counter()
+            status, _ = send(conn, _json_request("GET", "/api/approved-repair-shops"))
+            latencies.append(time.perf_counter() - start)
+            statuses.append(status)
+            time.sleep(0.02)
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+        conn.close()
+    return _summary(latencies, statuses)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to run against (default: temporary SQLite file)")
+    parser.add_argument("--uploads", type=int, default=10)
+    parser.add_argument("--resolution", default="4032x3024")
+    parser.add_argument("--gap-ms", type=float, default=300.0, help="Pause between sequential uploads")
+    parser.add_argument("--upload-clients", type=int, default=4)
+    parser.add_argument("--reads", type=int, default=100)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "admission.json"))
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory(prefix="claims-admission-")
+        database_url = "sqlite:///{}".format(os.path.join(tmpdir.name, "admission.db"))
+    prepare_database(database_url)
+
+    width, height = parse_resolution(args.resolution)
+    image = synthetic_damage_image(width, height)
+    server = Server(database_url, _free_port(), {"ADMISSION_CONTROL_ENABLED": "1"})
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        server.wait_ready()
+        results["sequential uploads"] = sequential_uploads(server.port, image, args.uploads, args.gap_ms / 1000.0)
+        results["reads during uploads"] = reads_during_uploads(server.port, image, args.upload_clients, args.reads)
+    finally:
+        server.stop()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print_table(results, ["requests", "rejected", "errors", "p50_ms", "p95_ms", "max_ms"])
+    save_results(args.output, "admission", results, {
+        "database": database_url.split("://")[0],
+        "resolution": args.resolution,
+        "gap_ms": args.gap_ms,
+        "upload_clients": args.upload_clients,
+    })
+    rejected = sum(result["rejected"] for result in results.values())
+    if rejected:
+        print("FAIL: {} requests were shed or rate limited".format(rejected))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Bulk claim import throughput (app.bulk_import).
+
+Generates `--claims` synthetic NDJSON records and imports them with
+estimates priced from damage_cost_reference. "validate" times parsing and
+Pydantic validation alone (the single-process CPU ceiling of the importer);
+"import" is the full load, COPY on PostgreSQL and executemany elsewhere, with
+validation in one process and then in `--workers` processes.
+
+    python -m benchmarks.bulk_import --database-url postgresql://localhost:5432/claims_bench --claims 500000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import prepare_database, print_table, save_results
+
+DAMAGE_TYPES = ("scratches", "dents", "structural damage")
+
+
+def write_records(path: str, count: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({
+                "external_id": "BENCH-{}".format(i),
+                "policy_number": "P-{}".format(i % 10000),
+                "created_at": "2024-{:02d}-{:02d}T10:00:00Z".format(1 + i % 12, 1 + i % 28),
+                "damage_assessments": [
+                    {"damage_type": damage_type, "severity": rng.choice(("minor", "major"))}
+                    for damage_type in rng.sample(DAMAGE_TYPES, rng.randint(1, 3))
+                ],
+            }) + "\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to import into (default: temporary SQLite file)")
+    parser.add_argument("--claims", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "bulk_import.json"))
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.TemporaryDirectory(prefix="claims-import-")
+    database_url = args.database_url or "sqlite:///{}".format(os.path.join(tmpdir.name, "import.db"))
+    records_path = os.path.join(tmpdir.name, "claims.ndjson")
+    write_records(records_path, args.claims)
+    prepare_database(database_url)
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import bulk_import
+    from app.serialization import json_dumps, json_loads
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        start = time.perf_counter()
+        with open(records_path, "rb") as lines:
+            for chunk in bulk_import.read_chunks(lines, args.chunk_size):
+                bulk_import.validate_chunk(chunk)
+        elapsed = time.perf_counter() - start
+        results["validate"] = {"claims": args.claims, "seconds": elapsed, "claims_per_sec": args.claims / elapsed}
+
+        engine = create_engine(database_url, json_serializer=json_dumps, json_deserializer=json_loads)
+        session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        for workers in sorted({1, args.workers}):
+            db = session()
+            try:
+                with open(records_path, "rb") as lines:
+                    totals = bulk_import.run_import(
+                        db, lines, args.chunk_size, price_estimates=True, source="benchmark", workers=workers
+                    )
+            finally:
+                db.close()
+            results["import ({} workers)".format(workers)] = {
+                "claims": totals["claims"], "seconds": totals["seconds"],
+                "claims_per_sec": totals["claims"] / totals["seconds"],
+            }
+        engine.dispose()
+    finally:
+        tmpdir.cleanup()
+
+    print_table(results, ["claims", "seconds", "claims_per_sec"])
+    save_results(args.output, "bulk_import", results, {
+        "database": database_url.split("://")[0], "claims": args.claims, "chunk_size": args.chunk_size,
+        "workers": args.workers,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Threshold calibration throughput (app.calibration).
+
+Writes `--images` synthetic damage photos with labels (the current
+thresholds' verdict, with `--noise` of them relabeled at random), then times
+feature extraction into the store with one process and with `--workers`, and
+the threshold sweep at `--grid-size` candidates per feature. "sweep naive"
+re-scores the corpus once per candidate combination, at a coarser grid so it
+finishes, to show what the cumulative-histogram sweep replaces.
+
+    python -m benchmarks.calibration --images 2000 --workers 8 --grid-size 128
+"""
+import argparse
+import csv
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import print_table, save_results, synthetic_damage_image
+
+
+def write_corpus(directory: str, count: int, noise: float, seed: int = 0) -> str:
+    from PIL import Image
+
+    from app.agents.mock_agent import DEFAULT_THRESHOLDS, classify, extract_features, prepare_image
+
+    rng = random.Random(seed)
+    labels_path = os.path.join(directory, "labels.csv")
+    with open(labels_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["path"] + list(DEFAULT_THRESHOLDS))
+        for i in range(count):
+            data = synthetic_damage_image(rng.choice((640, 1280, 1920)), 960, seed=i)
+            name = "{:06d}.jpg".format(i)
+            with open(os.path.join(directory, name), "wb") as image:
+                image.write(data)
+            severities = {
+                assessment["damage_type"]: assessment["severity"]
+                for assessment in classify(extract_features(prepare_image(Image.open(BytesIO(data)))), DEFAULT_THRESHOLDS)
+            }
+            writer.writerow([name] + [
+                rng.choice(("none", "minor", "major")) if rng.random() < noise else severities.get(damage_type, "none")
+                for damage_type in DEFAULT_THRESHOLDS
+            ])
+    return labels_path
+
+
+def naive_sweep(features, labels, grid_size: int) -> int:
+    """Score every candidate combination with a full pass over the corpus; returns the number scored."""
+    import numpy as np
+
+    from app import calibration
+    from app.agents.mock_agent import DEFAULT_THRESHOLDS, FEATURE_NAMES
+
+    scored = 0
+    for t, (damage_type, rules) in enumerate(DEFAULT_THRESHOLDS.items()):
+        columns = [features[:, FEATURE_NAMES.index(name)] for name in rules]
+        grids = [calibration.candidate_grid(column, grid_size) for column in columns]
+        positive = labels[:, t] > 0
+        for combination in itertools.product(*grids):
+            predicted = np.logical_or.reduce([column > value for column, value in zip(columns, combination)])
+            tp = (predicted & positive).sum()
+            calibration._fbeta(np.array([tp]), np.array([predicted.sum() - tp]), np.array([positive.sum() - tp]), 1.0)
+            scored += 1
+    return scored
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.1, help="Fraction of labels replaced at random")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--grid-size", type=int, default=64)
+    parser.add_argument("--naive-grid-size", type=int, default=16)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "calibration.json"))
+    args = parser.parse_args(argv)
+
+    import numpy as np
+
+    from app import calibration
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="claims-calibration-") as tmpdir:
+        labels_path = write_corpus(tmpdir, args.images, args.noise)
+        store = os.path.join(tmpdir, "store")
+        for workers in sorted({1, args.workers}):
+            manifest = calibration.extract(labels_path, store, workers)
+            results["extract ({} workers)".format(workers)] = {
+                "items": manifest["images"], "seconds": manifest["seconds"],
+                "items_per_sec": manifest["images"] / manifest["seconds"],
+            }
+
+        features, labels, _, rows = calibration.load_store(store)
+        # Materialized (and limited to decoded rows) so neither sweep is timed against page faults
+        features = np.array(features if rows is None else features[rows])
+        # Candidate combinations per sweep: detection plus major for each damage type
+        candidates = 2 * sum(
+            args.grid_size ** len(rules) for rules in calibration.DEFAULT_THRESHOLDS.values()
+        )
+        start = time.perf_counter()
+        calibration.sweep(features, labels, args.grid_size)
+        elapsed = time.perf_counter() - start
+        results["sweep (grid {})".format(args.grid_size)] = {
+            "items": candidates, "seconds": elapsed, "items_per_sec": candidates / elapsed,
+        }
+
+        start = time.perf_counter()
+        scored = naive_sweep(features, labels, args.naive_grid_size)
+        elapsed = time.perf_counter() - start
+        results["sweep naive (grid {})".format(args.naive_grid_size)] = {
+            "items": scored, "seconds": elapsed, "items_per_sec": scored / elapsed,
+        }
+
+    print_table(results, ["items", "seconds", "items_per_sec"])
+    save_results(args.output, "calibration", results, {
+        "images": args.images, "noise": args.noise, "workers": args.workers,
+        "grid_size": args.grid_size, "naive_grid_size": args.naive_grid_size,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Shared helpers for the benchmark suite: synthetic images, database setup, stats and result files."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_RESOLUTIONS = ((640, 480), (1280, 960), (1920, 1080), (4032, 3024))
+
+# Mirrors the seed data in the damage_cost_reference / repair_shops migrations
+COST_REFERENCE_SEED = [
+    ("scratches", "minor", 80, 30, 0.5),
+    ("scratches", "major", 250, 50, 2.0),
+    ("dents", "minor", 150, 50, 1.0),
+    ("dents", "major", 600, 300, 3.0),
+    ("structural_damage", "minor", 900, 400, 5.0),
+    ("structural_damage", "major", 2500, 1300, 12.0),
+]
+REPAIR_SHOP_SEED = [
+    ("Premier Auto Body & Paint", True),
+    ("Elite Collision Center", True),
+    ("Precision Auto Repair", True),
+    ("Quick Fix Auto Shop", False),
+]
+
+
+def parse_resolution(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def synthetic_damage_image(width: int, height: int, seed: int = 0, quality: int = 90) -> bytes:
+    """Generate a deterministic JPEG resembling a car panel with scratches and dents."""
+    rng = np.random.default_rng(seed)
+    # Smooth body-panel gradient with a random paint colour
+    base_colour = rng.integers(60, 220, size=3)
+    gradient = np.linspace(0.7, 1.1, width)[None, :, None]
+    img = np.clip(np.ones((height, width, 3)) * base_colour * gradient, 0, 255)
+
+    # Scratches: thin bright diagonal lines
+    for _ in range(max(3, width // 200)):
+        x0, y0 = rng.integers(0, width), rng.integers(0, height)
+        length = rng.integers(width // 8, width // 3)
+        xs = np.clip(x0 + np.arange(length), 0, width - 1)
+        ys = np.clip(y0 + (np.arange(length) * rng.uniform(-0.5, 0.5)).astype(int), 0, height - 1)
+        img[ys, xs] = 245
+
+    # Dents: dark elliptical blobs
+    yy, xx = np.ogrid[:height, :width]
+    for _ in range(max(1, width // 800)):
+        cx, cy = rng.integers(0, width), rng.integers(0, height)
+        rx, ry = rng.integers(width // 40, width // 12), rng.integers(height // 40, height // 12)
+        mask = ((xx - cx) / rx) ** 2 + ((yy - cy) / ry) ** 2 <= 1
+        img[mask] *= 0.25
+
+    img += rng.normal(0, 6, img.shape)
+    buf = BytesIO()
+    Image.fromarray(np.clip(img, 0, 255).astype(np.uint8)).save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def prepare_database(database_url: str) -> None:
+    """Create and seed the schema on SQLite; Postgres databases are expected to be migrated already."""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        from app.database import Base
+        import app.models  # noqa: F401  (registers tables on Base.metadata)
+        Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        if not conn.execute(text("SELECT COUNT(*) FROM damage_cost_reference")).scalar():
+            conn.execute(
+                text(
+                    "INSERT INTO damage_cost_reference (damage_type, damage_severity, base_cost, parts_cost, labor_hours) "
+                    "VALUES (:damage_type, :damage_severity, :base_cost, :parts_cost, :labor_hours)"
+                ),
+                [
+                    {"damage_type": t, "damage_severity": s, "base_cost": b, "parts_cost": p, "labor_hours": h}
+                    for t, s, b, p, h in COST_REFERENCE_SEED
+                ],
+            )
+        if not conn.execute(text("SELECT COUNT(*) FROM repair_shops")).scalar():
+            conn.execute(
+                text("INSERT INTO repair_shops (name, is_approved) VALUES (:name, :is_approved)"),
+                [{"name": name, "is_approved": approved} for name, approved in REPAIR_SHOP_SEED],
+            )
+    engine.dispose()
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Summarize latencies (seconds) as milliseconds."""
+    values = sorted(latencies)
+    return {
+        "mean_ms": (sum(values) / len(values) * 1000) if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": (values[-1] * 1000) if values else 0.0,
+    }
+
+
+def process_rss_mb(pid: int) -> Optional[float]:
+    """Current resident set size of `pid` in MiB (Linux only)."""
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+def environment_info() -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": revision,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save_results(path: str, kind: str, results: Dict[str, Dict[str, Any]], settings: Dict[str, Any]) -> None:
+    payload = {"kind": kind, "environment": environment_info(), "settings": settings, "results": results}
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    print("Saved results to {}".format(path))
+
+
+def print_table(results: Dict[str, Dict[str, Any]], columns: Sequence[str]) -> None:
+    name_width = max([len(name) for name in results] + [4])
+    print("{:<{w}}  ".format("case", w=name_width) + "  ".join("{:>12}".format(c) for c in columns))
+    for name, row in results.items():
+        cells = []
+        for column in columns:
+            value = row.get(column)
+            cells.append("{:>12}".format("-" if value is None else "{:.2f}".format(value) if isinstance(value, float) else value))
+        print("{:<{w}}  ".format(name, w=name_width) + "  ".join(cells))
@@ -0,0 +1,74 @@
+"""Compare two benchmark result files and fail on regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+
+Exits with status 1 when any case present in both files is slower (latency
+up, or throughput down) by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# Metrics where a larger value is a regression, and where a smaller one is
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "peak_rss_mb")
+HIGHER_IS_BETTER = ("throughput_rps", "ops_per_sec", "estimates_per_sec", "rows_per_sec", "claims_per_sec", "items_per_sec")
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(
+    baseline: Dict[str, Dict[str, Any]],
+    candidate: Dict[str, Dict[str, Any]],
+    threshold: float,
+    metrics: Optional[List[str]] = None,
+) -> Tuple[List[str], List[str]]:
+    """Return (report lines, regression lines)."""
+    lines: List[str] = []
+    regressions: List[str] = []
+    for case in sorted(set(baseline) & set(candidate)):
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            if metrics and metric not in metrics:
+                continue
+            old, new = baseline[case].get(metric), candidate[case].get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            line = "{:<60} {:<15} {:>12.2f} -> {:>12.2f} ({:+.1%})".format(case, metric, old, new, change)
+            lines.append(line + ("  REGRESSION" if worse else ""))
+            if worse:
+                regressions.append(line)
+    for case in sorted(set(baseline) ^ set(candidate)):
+        lines.append("{:<60} only in {}".format(case, "baseline" if case in baseline else "candidate"))
+    return lines, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown (default 0.10 = 10%%)")
+    parser.add_argument("--metrics", nargs="*", help="Restrict the comparison to these metrics")
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    if baseline.get("kind") != candidate.get("kind"):
+        print("Cannot compare '{}' results with '{}' results".format(baseline.get("kind"), candidate.get("kind")))
+        return 2
+
+    lines, regressions = compare(baseline["results"], candidate["results"], args.threshold, args.metrics)
+    print("\n".join(lines))
+    if regressions:
+        print("\n{} regression(s) beyond {:.0%}:".format(len(regressions), args.threshold))
+        print("\n".join(regressions))
+        return 1
+    print("\nNo regressions beyond {:.0%}".format(args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Claims export throughput and peak memory, buffered vs streamed.
+
+Seeds `--claims` claims with an assessment, estimate and review each, then
+exports them in a fresh worker process per case so peak RSS is that of the
+export alone. "before" loads the whole joined result with `.all()` and encodes
+it in one go; "after" is app.export's server-side cursor stream.
+
+    python -m benchmarks.export --claims 200000 --formats ndjson csv parquet
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import REPO_ROOT, prepare_database, print_table, save_results
+
+ANALYSIS = {
+    "status": "success",
+    "damage_labels": ["scratches", "dents"],
+    "damage_assessments": [
+        {"damage_type": "scratches", "severity": "minor"},
+        {"damage_type": "dents", "severity": "major"},
+    ],
+    "reasoning": "Surface-level scratches identified. Substantial dents detected in multiple areas.",
+}
+ESTIMATE = {
+    "total_base_cost": 680, "total_parts_cost": 330, "total_labor_hours": 3.5, "total_labor_cost": 350.0,
+    "line_items": [
+        {"damage_type": "scratches", "damage_severity": "minor", "base_cost": 80, "parts_cost": 30,
+         "labor_hours": 0.5, "labor_cost": 50.0, "notes": None},
+        {"damage_type": "dents", "damage_severity": "major", "base_cost": 600, "parts_cost": 300,
+         "labor_hours": 3.0, "labor_cost": 300.0, "notes": None},
+    ],
+}
+REVIEW = {"status": "approved", "reviewer_id": "senior_reviewer_001", "approved_amount": 680.0}
+
+
+def seed(database_url: str, claims: int, chunk: int = 10000) -> None:
+    from sqlalchemy import create_engine, func, insert, select
+
+    from app.models import Claim, DamageAssessment, RepairEstimate, SeniorReview
+    from app.serialization import json_dumps, json_loads
+
+    engine = create_engine(database_url, json_serializer=json_dumps, json_deserializer=json_loads)
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count(Claim.id))).scalar()
+        start = (conn.execute(select(func.max(Claim.id))).scalar() or 0) + 1
+        for first in range(start, start + max(0, claims - existing), chunk):
+            ids = range(first, min(first + chunk, start + claims - existing))
+            conn.execute(insert(Claim), [
+                {"id": i, "policy_number": "BENCH-{}".format(i % 1000), "status": "approved",
+                 "current_stage": "senior_review", "latest_estimate_id": i}
+                for i in ids
+            ])
+            conn.execute(insert(DamageAssessment), [
+                {"id": i, "claim_id": i, "assessment_data": ANALYSIS, "image_digest": "0" * 64} for i in ids
+            ])
+            conn.execute(insert(RepairEstimate), [
+                {"id": i, "claim_id": i, "damage_assessment_id": i, "estimate_data": ESTIMATE} for i in ids
+            ])
+            conn.execute(insert(SeniorReview), [
+                {"id": i, "claim_id": i, "repair_estimate_id": i, "review_data": REVIEW} for i in ids
+            ])
+    engine.dispose()
+
+
+def worker(mode: str, fmt: str, batch_size: int) -> Dict[str, Any]:
+    """Run one export to /dev/null in this process and report rows/sec and peak RSS."""
+    from app import export
+    from app.database import SessionLocal, get_engine
+
+    get_engine()
+    db = SessionLocal()
+    rows = 0
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, "wb") as sink:
+            if mode == "before":
+                records = [export._record(row) for row in db.execute(export.export_query(dialect_name=db.get_bind().dialect.name)).all()]
+                rows = len(records)
+                chunks = {
+                    "ndjson": export._ndjson_chunks, "csv": export._csv_chunks, "parquet": export._parquet_chunks
+                }[fmt](iter([records]))
+            else:
+                def count(batch):
+                    nonlocal rows
+                    rows += len(batch)
+
+                chunks = export.iter_export(db, fmt, batch_size, count)
+            for chunk in chunks:
+                sink.write(chunk)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed else 0.0,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to export from (default: temporary SQLite file)")
+    parser.add_argument("--claims", type=int, default=100000, help="Claims to seed (tops up an existing database)")
+    parser.add_argument("--formats", nargs="+", default=["ndjson", "csv", "parquet"])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "export.json"))
+    parser.add_argument("--worker", choices=["before", "after"], help=argparse.SUPPRESS)
+    parser.add_argument("--format", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.format, args.batch_size)))
+        return 0
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory(prefix="claims-export-")
+        database_url = "sqlite:///{}".format(os.path.join(tmpdir.name, "export.db"))
+    prepare_database(database_url)
+    seed(database_url, args.claims)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for fmt in args.formats:
+            for label in ("before", "after"):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.export", "--worker", label, "--format", fmt,
+                     "--batch-size", str(args.batch_size)],
+                    cwd=REPO_ROOT, env=dict(os.environ, DATABASE_URL=database_url),
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                results["{} {}".format(fmt, label)] = json.loads(output.strip().splitlines()[-1])
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print_table(results, ["rows", "seconds", "rows_per_sec", "peak_rss_mb"])
+    save_results(args.output, "export", results, {
+        "database": database_url.split("://")[0],
+        "claims": args.claims,
+        "batch_size": args.batch_size,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""End-to-end load benchmark for every endpoint in app/main.py.
+
+Starts the API under uvicorn in a subprocess against the given database
+(a throwaway SQLite file by default), then drives each endpoint at fixed
+concurrency levels and reports throughput, latency percentiles and the
+server's peak RSS per case.
+
+    python -m benchmarks.load --output benchmarks/results/load.json
+    python -m benchmarks.load --database-url postgresql://localhost/claims_bench --concurrency 1 8 32
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.common import (
+    DEFAULT_RESOLUTIONS,
+    REPO_ROOT,
+    latency_summary,
+    parse_resolution,
+    prepare_database,
+    print_table,
+    process_rss_mb,
+    save_results,
+    synthetic_damage_image,
+)
+
+Request = Tuple[str, str, Optional[bytes], Dict[str, str]]  # method, path, body, headers
+
+# Admin token the benchmark server is started with, for the export and profiling endpoints
+ADMIN_TOKEN = "benchmark-admin-token"
+REVIEWER_ID = "benchmark-reviewer"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _multipart(fields: Dict[str, str], file_field: str, filename: str, content: bytes, content_type: str) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            "--{}\r\nContent-Disposition: form-data; name=\"{}\"\r\n\r\n{}\r\n".format(boundary, name, value).encode()
+        )
+    parts.append(
+        "--{}\r\nContent-Disposition: form-data; name=\"{}\"; filename=\"{}\"\r\nContent-Type: {}\r\n\r\n".format(
+            boundary, file_field, filename, content_type
+        ).encode() + content + b"\r\n"
+    )
+    parts.append("--{}--\r\n".format(boundary).encode())
+    return b"".join(parts), "multipart/form-data; boundary={}".format(boundary)
+
+
+def _json_request(
+    method: str, path: str, payload: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None
+) -> Request:
+    if payload is None:
+        return method, path, None, dict(headers or {})
+    return method, path, json.dumps(payload).encode(), dict(headers or {}, **{"Content-Type": "application/json"})
+
+
+class Server:
+    """uvicorn running app.main:app in a child process."""
+
+    def __init__(self, database_url: str, port: int, extra_env: Optional[Dict[str, str]] = None):
+        self.port = port
+        env = dict(os.environ, DATABASE_URL=database_url)
+        env.update(extra_env or {})
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=REPO_ROOT,
+            env=env,
+        )
+
+    def wait_ready(self, timeout: float = 30.0) -> float:
+        """Block until the server answers, returning seconds since launch."""
+        start = time.perf_counter()
+        while time.perf_counter() - start < timeout:
+            if self.process.poll() is not None:
+                raise RuntimeError("server exited with code {}".format(self.process.returncode))
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=1)
+                conn.request("GET", "/")
+                if conn.getresponse().status == 200:
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("server did not become ready within {}s".format(timeout))
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def send(conn: http.client.HTTPConnection, request: Request) -> Tuple[int, bytes]:
+    method, path, body, headers = request
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def run_case(
+    port: int,
+    pid: int,
+    make_request: Callable[[int], Request],
+    concurrency: int,
+    total_requests: int,
+) -> Dict[str, Any]:
+    """Issue `total_requests` requests from `concurrency` keep-alive clients."""
+    latencies: List[float] = []
+    errors = [0]
+    counter = iter(range(total_requests))
+    counter_lock = threading.Lock()
+    peak_rss = [process_rss_mb(pid) or 0.0]
+    done = threading.Event()
+
+    def sample_rss():
+        while not done.is_set():
+            rss = process_rss_mb(pid)
+            if rss is not None and rss > peak_rss[0]:
+                peak_rss[0] = rss
+            done.wait(0.01)
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local_latencies = []
+        local_errors = 0
+        while True:
+            with counter_lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            request = make_request(index)
+            start = time.perf_counter()
+            try:
+                status, _ = send(conn, request)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                status = 0
+            local_latencies.append(time.perf_counter() - start)
+            if status >= 400 or status == 0:
+                local_errors += 1
+        conn.close()
+        with counter_lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    monitor = threading.Thread(target=sample_rss, daemon=True)
+    monitor.start()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    monitor.join()
+
+    result: Dict[str, Any] = {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors[0],
+        "elapsed_s": elapsed,
+        "throughput_rps": total_requests / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss[0] or None,
+    }
+    result.update(latency_summary(latencies))
+    return result
+
+
+def build_cases(port: int, resolutions) -> Dict[str, Tuple[Callable[[int], Request], float]]:
+    """Build request factories for each endpoint; the float scales the request count for heavy cases."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    # Seed one claim through the pipeline so downstream endpoints reference real rows
+    seed_body, seed_type = _multipart({"policy_number": "BENCH-0"}, "image", "seed.jpg",
+                                      synthetic_damage_image(640, 480), "image/jpeg")
+    status, body = send(conn, ("POST", "/api/analyze-damage", seed_body, {"Content-Type": seed_type}))
+    if status != 200:
+        raise RuntimeError("seeding analyze-damage failed: {} {}".format(status, body[:200]))
+    analysis = json.loads(body)
+    estimate_payload = {
+        "damage_assessment_id": analysis["assessment_id"],
+        "damage_assessments": analysis["result"]["damage_assessments"],
+    }
+    status, body = send(conn, _json_request("POST", "/api/generate-estimate", estimate_payload))
+    if status != 200:
+        raise RuntimeError("seeding generate-estimate failed: {} {}".format(status, body[:200]))
+    estimate = json.loads(body)
+    image_url = analysis["image_url"]
+    thumbnail_url = analysis["thumbnail_urls"][min(analysis["thumbnail_urls"], key=int)]
+    conn.request("GET", image_url)
+    response = conn.getresponse()
+    response.read()
+    image_etag = response.getheader("ETag")
+    conn.close()
+    admin = {"X-Admin-Token": ADMIN_TOKEN}
+
+    cases: Dict[str, Tuple[Callable[[int], Request], float]] = {
+        "GET /": (lambda i: _json_request("GET", "/"), 1.0),
+        "GET /api/approved-repair-shops": (lambda i: _json_request("GET", "/api/approved-repair-shops"), 1.0),
+        "POST /api/generate-estimate": (
+            lambda i: _json_request("POST", "/api/generate-estimate", estimate_payload), 1.0
+        ),
+        # Dry run over the seeded estimate (before the review cases decide it); rolled back
+        "POST /api/reviews/auto-adjudicate": (
+            lambda i: _json_request("POST", "/api/reviews/auto-adjudicate", {"limit": 100, "dry_run": True}), 1.0
+        ),
+        # Before the review cases decide it, only the seeded claim is queued: the first claim leases it and
+        # the rest find nothing available; the release cases then hand it back (a no-op after the first)
+        "POST /api/review-queue/claim": (
+            lambda i: _json_request("POST", "/api/review-queue/claim", {"reviewer_id": REVIEWER_ID, "limit": 1}), 1.0
+        ),
+        "POST /api/review-queue/release": (
+            lambda i: _json_request("POST", "/api/review-queue/release", {
+                "claim_id": analysis["claim_id"], "reviewer_id": REVIEWER_ID
+            }), 1.0
+        ),
+        "POST /api/review-estimate": (
+            lambda i: _json_request("POST", "/api/review-estimate", {
+                "estimate_id": estimate["estimate_id"], "estimate_data": estimate["result"]
+            }), 1.0
+        ),
+        "POST /api/deny-claim": (
+            lambda i: _json_request("POST", "/api/deny-claim", {
+                "estimate_id": estimate["estimate_id"], "denial_comments": "Benchmark denial {}".format(i)
+            }), 1.0
+        ),
+        "GET /api/review-queue": (lambda i: _json_request("GET", "/api/review-queue?limit=50"), 1.0),
+        "GET /api/analytics": (lambda i: _json_request("GET", "/api/analytics"), 1.0),
+        "GET /api/search": (lambda i: _json_request("GET", "/api/search?q=scratches%20OR%20dents"), 1.0),
+        "GET /api/images/{digest}": (lambda i: _json_request("GET", image_url), 1.0),
+        "GET /api/images/{digest} [304]": (lambda i: ("GET", image_url, None, {"If-None-Match": image_etag}), 1.0),
+        "GET /api/images/{digest}/thumbnails/{size}": (lambda i: _json_request("GET", thumbnail_url), 1.0),
+        "GET /api/export/claims": (lambda i: ("GET", "/api/export/claims?limit=1000", None, admin), 0.25),
+        "GET /metrics": (lambda i: _json_request("GET", "/metrics"), 1.0),
+        "GET /admin/profiling": (lambda i: ("GET", "/admin/profiling", None, admin), 1.0),
+        # Keeps the profiler off so it does not skew the cases that follow
+        "POST /admin/profiling": (
+            lambda i: _json_request("POST", "/admin/profiling", {"enabled": False}, headers=admin), 1.0
+        ),
+    }
+
+    for width, height in resolutions:
+        images = [synthetic_damage_image(width, height, seed=s) for s in range(4)]
+        bodies = [
+            _multipart({"policy_number": "BENCH-{}".format(s)}, "image", "damage_{}.jpg".format(s), img, "image/jpeg")
+            for s, img in enumerate(images)
+        ]
+
+        def make(i, bodies=bodies):
+            body, content_type = bodies[i % len(bodies)]
+            return "POST", "/api/analyze-damage", body, {"Content-Type": content_type}
+
+        # Large uploads are much slower; scale their request count down
+        scale = max(0.1, min(1.0, (640 * 480) / float(width * height) * 4))
+        cases["POST /api/analyze-damage [{}x{}]".format(width, height)] = (make, scale)
+    return cases
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to benchmark against (default: temporary SQLite file)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per case (scaled down for large images)")
+    parser.add_argument("--resolutions", nargs="+", default=["{}x{}".format(w, h) for w, h in DEFAULT_RESOLUTIONS])
+    parser.add_argument("--endpoints", nargs="*", help="Only run cases whose name contains one of these substrings")
+    parser.add_argument("--admission-control", action="store_true",
+                        help="Keep app.admission's limits on (off by default: one client would hit its rate limits)")
+    parser.add_argument("--replica-urls", default="",
+                        help="DATABASE_REPLICA_URLS for the server; read endpoints use them, writes stay on --database-url")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "load.json"))
+    args = parser.parse_args(argv)
+
+    # Holds the uploaded images (and the SQLite file by default) so a run leaves nothing in public/uploads
+    tmpdir = tempfile.TemporaryDirectory(prefix="claims-bench-")
+    database_url = args.database_url
+    if not database_url:
+        database_url = "sqlite:///{}".format(os.path.join(tmpdir.name, "bench.db"))
+    prepare_database(database_url)
+
+    port = _free_port()
+    server = Server(database_url, port, {
+        "ADMISSION_CONTROL_ENABLED": "1" if args.admission_control else "0",
+        "DATABASE_REPLICA_URLS": args.replica_urls,
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+        "IMAGE_STORE_DIR": os.path.join(tmpdir.name, "images"),
+    })
+    try:
+        startup_s = server.wait_ready()
+        cases = build_cases(port, [parse_resolution(r) for r in args.resolutions])
+        results: Dict[str, Dict[str, Any]] = {}
+        for name, (make_request, scale) in cases.items():
+            if args.endpoints and not any(e in name for e in args.endpoints):
+                continue
+            for concurrency in args.concurrency:
+                total = max(concurrency, int(args.requests * scale))
+                case_name = "{} c={}".format(name, concurrency)
+                results[case_name] = run_case(port, server.process.pid, make_request, concurrency, total)
+                results[case_name]["endpoint"] = name
+                print("{:<60} {:>8.1f} req/s  p95 {:>8.2f} ms".format(
+                    case_name, results[case_name]["throughput_rps"], results[case_name]["p95_ms"]
+                ))
+    finally:
+        server.stop()
+        tmpdir.cleanup()
+
+    print()
+    print_table(results, ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb", "errors"])
+    save_results(args.output, "load", results, {
+        "database": database_url.split("://")[0],
+        "concurrency": args.concurrency,
+        "admission_control": args.admission_control,
+        "replicas": len([url for url in args.replica_urls.split(",") if url.strip()]),
+        "requests": args.requests,
+        "resolutions": args.resolutions,
+        "startup_s": startup_s,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
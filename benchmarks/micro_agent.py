@@ -0,0 +1,67 @@
+"""Micro-benchmarks for MockAgent.analyze_damage on synthetic images.
+
+Runs the agent in-process (no HTTP, no database) so regressions in the
+decode/feature pipeline show up separately from the end-to-end numbers.
+
+    python -m benchmarks.micro_agent --output benchmarks/results/micro_agent.json
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import (
+    DEFAULT_RESOLUTIONS,
+    latency_summary,
+    parse_resolution,
+    print_table,
+    save_results,
+    synthetic_damage_image,
+)
+
+
+def bench_analyze_damage(agent, image_bytes: bytes, iterations: int, warmup: int = 2) -> Dict[str, Any]:
+    payload = {"image_filename": "bench.jpg", "image_content_type": "image/jpeg", "image_bytes": image_bytes}
+    for _ in range(warmup):
+        agent.analyze_damage(payload)
+    timings: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        agent.analyze_damage(payload)
+        timings.append(time.perf_counter() - start)
+    result: Dict[str, Any] = {
+        "iterations": iterations,
+        "image_kb": len(image_bytes) / 1024.0,
+        "ops_per_sec": iterations / sum(timings) if timings else 0.0,
+    }
+    result.update(latency_summary(timings))
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--resolutions", nargs="+", default=["{}x{}".format(w, h) for w, h in DEFAULT_RESOLUTIONS])
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "micro_agent.json"))
+    args = parser.parse_args(argv)
+
+    from app.agents.mock_agent import MockAgent
+    agent = MockAgent()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for resolution in args.resolutions:
+        width, height = parse_resolution(resolution)
+        image_bytes = synthetic_damage_image(width, height)
+        name = "analyze_damage {}x{}".format(width, height)
+        results[name] = bench_analyze_damage(agent, image_bytes, args.iterations)
+        print("{:<32} {:>8.2f} ops/s  p95 {:>8.2f} ms".format(name, results[name]["ops_per_sec"], results[name]["p95_ms"]))
+
+    print()
+    print_table(results, ["ops_per_sec", "p50_ms", "p95_ms", "p99_ms", "image_kb"])
+    save_results(args.output, "micro_agent", results, {"iterations": args.iterations, "resolutions": args.resolutions})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Claim search latency: JSON-to-text ILIKE scan vs app.search.
+
+Seeds `--rows` damage assessments with synthetic reasoning text (plus one
+denial review per ten assessments) and times each query in `--queries` both
+ways: "before" is the JSON-to-text ILIKE full scan adjusters used to run,
+"after" is app.search.search (GIN-indexed tsvector match, ts_rank_cd ranking
+and ts_headline on PostgreSQL; substring fallback elsewhere). Run against a
+migrated PostgreSQL database for meaningful numbers:
+
+    python -m benchmarks.search --database-url postgresql://localhost:5432/claims_bench --rows 5000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import latency_summary, prepare_database, print_table, save_results
+
+VOCABULARY = (
+    "scratches dents paint panel door bumper rear front fender hood quarter impact surface deep shallow "
+    "crease chip rust corrosion alignment frame structural crack headlight mirror trim replacement repair "
+    "minor major significant visible multiple areas contact collision parking pole hail gravel vandalism"
+).split()
+DENIAL_PHRASES = (
+    "Pre-existing rust not covered by policy",
+    "Damage inconsistent with reported collision",
+    "Policy lapsed before the incident date",
+    "Wear and tear excluded under section 4",
+)
+DEFAULT_QUERIES = ("bumper", "rear bumper", '"deep scratches"', "hail -gravel", "rust not covered")
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(12, 40))).capitalize() + "."
+
+
+def seed(database_url: str, rows: int, chunk: int = 10000) -> None:
+    from sqlalchemy import create_engine, func, insert, select
+
+    from app.models import DamageAssessment, SeniorReview
+    from app.serialization import json_dumps, json_loads
+
+    rng = random.Random(0)
+    engine = create_engine(database_url, json_serializer=json_dumps, json_deserializer=json_loads)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count(DamageAssessment.id))).scalar()
+    for first in range(existing, rows, chunk):
+        ids = range(first, min(first + chunk, rows))
+        # Commit per chunk so the search_vector triggers' work is not one giant transaction
+        with engine.begin() as conn:
+            conn.execute(insert(DamageAssessment), [
+                {"claim_id": i, "assessment_data": {"status": "success", "reasoning": _sentence(rng)}} for i in ids
+            ])
+            conn.execute(insert(SeniorReview), [
+                {"claim_id": i, "review_data": {"status": "denied", "denial_comments": rng.choice(DENIAL_PHRASES)}}
+                for i in ids if i % 10 == 0
+            ])
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM ANALYZE damage_assessments")
+            conn.exec_driver_sql("VACUUM ANALYZE senior_reviews")
+    engine.dispose()
+
+
+def ilike_scan(db, query: str, limit: int):
+    """The old approach: substring match on the whole JSON documents, newest first."""
+    from sqlalchemy import String, cast, literal, literal_column, select, union_all
+
+    from app.models import DamageAssessment, SeniorReview
+
+    pattern = "%{}%".format(query.strip('"'))
+    return db.execute(
+        union_all(
+            select(literal("assessments").label("source"), DamageAssessment.id)
+            .where(cast(DamageAssessment.assessment_data, String).ilike(pattern)),
+            select(literal("denials").label("source"), SeniorReview.id)
+            .where(cast(SeniorReview.review_data, String).ilike(pattern)),
+        ).order_by(literal_column("id").desc()).limit(limit)
+    ).all()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to search (default: temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=200000, help="Assessments to seed (tops up an existing database)")
+    parser.add_argument("--queries", nargs="+", default=list(DEFAULT_QUERIES))
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "search.json"))
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory(prefix="claims-search-")
+        database_url = "sqlite:///{}".format(os.path.join(tmpdir.name, "search.db"))
+    prepare_database(database_url)
+    seed(database_url, args.rows)
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import search
+    from app.serialization import json_dumps, json_loads
+
+    engine = create_engine(database_url, json_serializer=json_dumps, json_deserializer=json_loads)
+    db = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for query in args.queries:
+            for label, run in (
+                ("before", lambda: ilike_scan(db, query, args.limit)),
+                ("after", lambda: search.search(db, query, limit=args.limit)),
+            ):
+                run()  # warm the cache and the plan
+                timings = []
+                for _ in range(args.iterations):
+                    start = time.perf_counter()
+                    hits = run()
+                    timings.append(time.perf_counter() - start)
+                results["{} {}".format(query, label)] = dict(latency_summary(timings), hits=len(hits))
+    finally:
+        db.close()
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print_table(results, ["hits", "mean_ms", "p50_ms", "p95_ms", "max_ms"])
+    save_results(args.output, "search", results, {
+        "database": database_url.split("://")[0],
+        "rows": args.rows,
+        "limit": args.limit,
+        "iterations": args.iterations,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
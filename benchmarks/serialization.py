@@ -0,0 +1,162 @@
+"""Serialization cost per endpoint and per JSON column, before and after orjson.
+
+"before" is FastAPI's default path for an untyped endpoint (jsonable_encoder
+followed by stdlib json); "after" is the typed path (pydantic-core validate
+and dump of the response_model, rendered by orjson). JSON column cases
+compare stdlib json with the engine's orjson serializer/deserializer.
+
+    python -m benchmarks.serialization --line-items 1 50 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import latency_summary, print_table, save_results
+
+
+def _time(fn: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    for _ in range(min(10, iterations)):
+        fn()
+    timings: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    result: Dict[str, Any] = {"iterations": iterations, "ops_per_sec": iterations / sum(timings)}
+    result.update(latency_summary(timings))
+    return result
+
+
+def _analysis_result() -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "damage_labels": ["scratches", "dents", "structural_damage"],
+        "damage_assessments": [
+            {"damage_type": "scratches", "severity": "major"},
+            {"damage_type": "dents", "severity": "minor"},
+            {"damage_type": "structural_damage", "severity": "major"},
+        ],
+        "reasoning": "Extensive paint scratches detected across the vehicle surface. " * 4,
+    }
+
+
+def _estimate_result(line_items: int) -> Dict[str, Any]:
+    items = [
+        {
+            "damage_type": ("scratches", "dents", "structural_damage")[i % 3],
+            "damage_severity": ("minor", "major")[i % 2],
+            "base_cost": 250 + i,
+            "parts_cost": 50 + i,
+            "labor_hours": 2.0,
+            "labor_cost": 200.0,
+            "notes": None,
+        }
+        for i in range(line_items)
+    ]
+    return {
+        "total_base_cost": sum(item["base_cost"] for item in items),
+        "total_parts_cost": sum(item["parts_cost"] for item in items),
+        "total_labor_hours": 2.0 * line_items,
+        "total_labor_cost": 200.0 * line_items,
+        "line_items": items,
+    }
+
+
+_IMAGE_DIGEST = "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08"
+
+
+def build_payloads(line_items: int) -> Dict[str, Any]:
+    """Representative response bodies keyed by endpoint, as the handlers build them."""
+    return {
+        "POST /api/analyze-damage": {
+            "success": True, "assessment_id": 1, "claim_id": 1, "result": _analysis_result(),
+            "image_digest": _IMAGE_DIGEST, "image_url": "/api/images/{}".format(_IMAGE_DIGEST),
+            "thumbnail_urls": {
+                str(size): "/api/images/{}/thumbnails/{}".format(_IMAGE_DIGEST, size) for size in (1024, 256)
+            },
+        },
+        "POST /api/generate-estimate": {
+            "success": True, "estimate_id": 1, "result": _estimate_result(line_items),
+        },
+        "POST /api/review-estimate": {
+            "success": True, "review_id": 1, "result": {
+                "status": "approved", "reviewer_id": "senior_reviewer_001", "review_timestamp": "2024-01-15T10:30:00Z",
+                "approved_amount": 2450.0, "notes": "Approved.", "requires_additional_approval": False,
+            },
+        },
+        "POST /api/deny-claim": {"success": True, "review_id": 1, "status": "denied"},
+        "GET /api/approved-repair-shops": {
+            "success": True, "repair_shops": [
+                {"id": i, "name": "Shop {}".format(i), "address": "{} Main Street".format(i), "phone": "(415) 555-0101"}
+                for i in range(max(5, line_items))
+            ],
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--line-items", type=int, nargs="+", default=[3, 50, 500],
+                        help="Payload sizes (estimate line items / repair shops)")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "serialization.json"))
+    args = parser.parse_args(argv)
+
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from starlette.responses import JSONResponse as StdlibJSONResponse
+
+    from app import main as api
+    from app.serialization import JSONResponse, json_dumps, json_loads
+
+    response_models = {
+        "POST /api/analyze-damage": api.AnalyzeDamageResponse,
+        "POST /api/generate-estimate": api.GenerateEstimateResponse,
+        "POST /api/review-estimate": api.ClaimApprovalAuthorizationResponse,
+        "POST /api/deny-claim": api.ClaimDenialResponse,
+        "GET /api/approved-repair-shops": api.ApprovedRepairShopsResponse,
+    }
+    stdlib_response = StdlibJSONResponse.__new__(StdlibJSONResponse)
+    orjson_response = JSONResponse.__new__(JSONResponse)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in args.line_items:
+        for endpoint, payload in build_payloads(size).items():
+            adapter = TypeAdapter(response_models[endpoint])
+
+            def before(payload=payload):
+                return stdlib_response.render(jsonable_encoder(payload))
+
+            def after(payload=payload, adapter=adapter):
+                return orjson_response.render(adapter.dump_python(adapter.validate_python(payload), mode="json"))
+
+            results["{} n={} before".format(endpoint, size)] = _time(before, args.iterations)
+            results["{} n={} after".format(endpoint, size)] = _time(after, args.iterations)
+
+        estimate = _estimate_result(size)
+        log = {"estimate_id": 1, "result": estimate}
+        for column, value in (("estimate_data", estimate), ("log_data", log), ("assessment_data", _analysis_result())):
+            encoded = json.dumps(value)
+            results["{} n={} before".format(column, size)] = _time(
+                lambda value=value, encoded=encoded: json.loads(encoded) and json.dumps(value), args.iterations
+            )
+            results["{} n={} after".format(column, size)] = _time(
+                lambda value=value, encoded=encoded: json_loads(encoded) and json_dumps(value), args.iterations
+            )
+
+    print_table(results, ["mean_ms", "p50_ms", "p95_ms", "ops_per_sec"])
+    print()
+    for name in results:
+        if name.endswith(" before"):
+            case = name[: -len(" before")]
+            speedup = results[name]["mean_ms"] / max(results[case + " after"]["mean_ms"], 1e-9)
+            print("{:<60} {:>6.2f}x faster".format(case, speedup))
+    save_results(args.output, "serialization", results, {"iterations": args.iterations, "line_items": args.line_items})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
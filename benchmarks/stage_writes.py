@@ -0,0 +1,191 @@
+"""Round trips and latency of the stage writes, ORM sequence vs app.persistence.
+
+"before" replays the handlers' original ORM sequence (parent SELECT, add +
+flush per row, system log, commit, then the refresh SELECTs triggered by
+reading ids after commit). "after" calls the app.persistence functions used
+by the handlers now. Round trips are counted from engine events: every
+cursor execute plus each transaction BEGIN and COMMIT.
+
+    python -m benchmarks.stage_writes --database-url postgresql://localhost:5432/claims_bench
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import latency_summary, prepare_database, print_table, save_results
+
+ANALYSIS = {
+    "status": "success",
+    "damage_labels": ["scratches", "dents"],
+    "damage_assessments": [
+        {"damage_type": "scratches", "severity": "minor"},
+        {"damage_type": "dents", "severity": "major"},
+    ],
+    "reasoning": "Surface-level scratches identified. Substantial dents detected in multiple areas.",
+}
+ESTIMATE = {
+    "total_base_cost": 680, "total_parts_cost": 330, "total_labor_hours": 3.5, "total_labor_cost": 350.0,
+    "line_items": [
+        {"damage_type": "scratches", "damage_severity": "minor", "base_cost": 80, "parts_cost": 30,
+         "labor_hours": 0.5, "labor_cost": 50.0, "notes": None},
+        {"damage_type": "dents", "damage_severity": "major", "base_cost": 600, "parts_cost": 300,
+         "labor_hours": 3.0, "labor_cost": 300.0, "notes": None},
+    ],
+}
+REVIEW = {"status": "approved", "reviewer_id": "senior_reviewer_001", "approved_amount": 680.0}
+
+
+class RoundTripCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        for name in ("before_cursor_execute", "begin", "commit", "rollback"):
+            event.listen(engine, name, self._increment)
+
+    def _increment(self, *args, **kwargs):
+        self.count += 1
+
+
+def legacy_writes(models):
+    """The handlers' original ORM write sequences."""
+
+    def analysis(db, ctx):
+        claim = models.Claim(policy_number="BENCH")
+        db.add(claim)
+        db.flush()
+        assessment = models.DamageAssessment(claim_id=claim.id, assessment_data=ANALYSIS, image_digest="0" * 64)
+        db.add(assessment)
+        db.flush()
+        db.add(models.SystemLog(log_type="damage_analysis", log_data={
+            "claim_id": claim.id, "result": ANALYSIS, "image_filename": "bench.jpg", "image_digest": "0" * 64
+        }))
+        db.commit()
+        ctx["assessment_id"], ctx["claim_id"] = assessment.id, claim.id
+
+    def estimate(db, ctx):
+        parent = db.query(models.DamageAssessment).filter(models.DamageAssessment.id == ctx["assessment_id"]).first()
+        row = models.RepairEstimate(
+            claim_id=parent.claim_id if parent else None,
+            damage_assessment_id=ctx["assessment_id"], estimate_data=ESTIMATE,
+        )
+        db.add(row)
+        db.flush()
+        db.add(models.SystemLog(log_type="estimate_generation", log_data={"estimate_id": row.id, "result": ESTIMATE}))
+        db.commit()
+        ctx["estimate_id"] = row.id
+
+    def review(db, ctx, log_type="claim_approval_authorization", log_fields=None):
+        parent = db.query(models.RepairEstimate).filter(models.RepairEstimate.id == ctx["estimate_id"]).first()
+        row = models.SeniorReview(
+            claim_id=parent.claim_id if parent else None, repair_estimate_id=ctx["estimate_id"], review_data=REVIEW
+        )
+        db.add(row)
+        db.flush()
+        log_data = {"review_id": row.id}
+        log_data.update(log_fields or {"result": REVIEW})
+        db.add(models.SystemLog(log_type=log_type, log_data=log_data))
+        db.commit()
+        return row.id
+
+    def denial(db, ctx):
+        return review(db, ctx, "claim_denial", {"comments": "Benchmark denial"})
+
+    return {"analyze-damage": analysis, "generate-estimate": estimate, "review-estimate": review, "deny-claim": denial}
+
+
+def persistence_writes():
+    from app import persistence
+
+    def analysis(db, ctx):
+        ctx["claim_id"], ctx["assessment_id"] = persistence.record_damage_analysis(
+            db, "BENCH", ANALYSIS, "bench.jpg", "0" * 64
+        )
+        db.commit()
+
+    def estimate(db, ctx):
+        _, ctx["estimate_id"] = persistence.record_estimate(db, ctx["assessment_id"], ESTIMATE)
+        db.commit()
+
+    def review(db, ctx):
+        persistence.record_review(db, ctx["estimate_id"], REVIEW)
+        db.commit()
+
+    def denial(db, ctx):
+        persistence.record_denial(db, ctx["estimate_id"], REVIEW, "Benchmark denial")
+        db.commit()
+
+    return {"analyze-damage": analysis, "generate-estimate": estimate, "review-estimate": review, "deny-claim": denial}
+
+
+def run(session_factory, counter: RoundTripCounter, writes: Dict[str, Callable], iterations: int) -> Dict[str, Dict[str, Any]]:
+    timings: Dict[str, List[float]] = {name: [] for name in writes}
+    round_trips: Dict[str, int] = {name: 0 for name in writes}
+    for _ in range(iterations):
+        ctx: Dict[str, Any] = {}
+        # Stages run in pipeline order so each one has a parent row
+        for name, write in writes.items():
+            db = session_factory()
+            try:
+                start_count = counter.count
+                start = time.perf_counter()
+                write(db, ctx)
+                timings[name].append(time.perf_counter() - start)
+                round_trips[name] += counter.count - start_count
+            finally:
+                db.close()
+
+    results = {}
+    for name in writes:
+        results[name] = latency_summary(timings[name])
+        results[name]["round_trips"] = round_trips[name] / float(iterations)
+        results[name]["ops_per_sec"] = iterations / sum(timings[name])
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to write to (default: temporary SQLite file)")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "stage_writes.json"))
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory(prefix="claims-writes-")
+        database_url = "sqlite:///{}".format(os.path.join(tmpdir.name, "writes.db"))
+    prepare_database(database_url)
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import models
+    from app.serialization import json_dumps, json_loads
+
+    engine = create_engine(database_url, json_serializer=json_dumps, json_deserializer=json_loads)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    counter = RoundTripCounter(engine)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for label, writes in (("before", legacy_writes(models)), ("after", persistence_writes())):
+            for name, row in run(session_factory, counter, writes, args.iterations).items():
+                results["{} {}".format(name, label)] = row
+    finally:
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print_table(results, ["round_trips", "mean_ms", "p50_ms", "p95_ms", "ops_per_sec"])
+    save_results(args.output, "stage_writes", results, {
+        "database": database_url.split("://")[0], "iterations": args.iterations
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
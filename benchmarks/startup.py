@@ -0,0 +1,124 @@
+"""Cold-start benchmark: import time and time to first successful request.
+
+Each measurement runs in a fresh interpreter. With --check-lazy the run
+also fails if importing the API or the models (as Alembic's env.py does)
+loads PIL, NumPy or the database driver, which makes it usable as a CI gate.
+
+    python -m benchmarks.startup --runs 5 --check-lazy
+    python -m benchmarks.compare old_startup.json benchmarks/results/startup.json
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import (
+    REPO_ROOT,
+    latency_summary,
+    prepare_database,
+    print_table,
+    save_results,
+    synthetic_damage_image,
+)
+from benchmarks.load import Server, _free_port, _multipart, send
+
+HEAVY_MODULES = ("numpy", "PIL.Image", "psycopg2")
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, database_url: str) -> Dict[str, Any]:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=REPO_ROOT,
+        env=dict(os.environ, DATABASE_URL=database_url),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_first_requests(database_url: str, extra_env: Dict[str, str]) -> Dict[str, float]:
+    """Seconds from process launch until the first successful response of each kind."""
+    port = _free_port()
+    launched = time.perf_counter()
+    server = Server(database_url, port, extra_env)
+    try:
+        server.wait_ready()
+        timings = {"first_root": time.perf_counter() - launched}
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        body, content_type = _multipart({}, "image", "first.jpg", synthetic_damage_image(640, 480), "image/jpeg")
+        for key, request in (
+            ("first_db_read", ("GET", "/api/approved-repair-shops", None, {})),
+            ("first_analysis", ("POST", "/api/analyze-damage", body, {"Content-Type": content_type})),
+        ):
+            status, _ = send(conn, request)
+            if status != 200:
+                raise RuntimeError("{} {} failed with {}".format(request[0], request[1], status))
+            timings[key] = time.perf_counter() - launched
+        conn.close()
+        return timings
+    finally:
+        server.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", help="Database to start against (default: temporary SQLite file)")
+    parser.add_argument("--check-lazy", action="store_true", help="Fail if heavy modules load at import time")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "startup.json"))
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory(prefix="claims-startup-")
+        database_url = "sqlite:///{}".format(os.path.join(tmpdir.name, "startup.db"))
+    prepare_database(database_url)
+
+    samples: Dict[str, List[float]] = {}
+    leaked: Dict[str, List[str]] = {}
+    try:
+        for _ in range(args.runs):
+            for module in ("app.main", "app.models"):
+                measured = measure_import(module, database_url)
+                samples.setdefault("import {}".format(module), []).append(measured["elapsed"])
+                if measured["loaded"]:
+                    leaked[module] = measured["loaded"]
+            for label, env in (("cold", {}), ("warm-up", {"WARMUP_ON_STARTUP": "1"})):
+                for key, value in measure_first_requests(database_url, env).items():
+                    samples.setdefault("{} ({})".format(key, label), []).append(value)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, values in samples.items():
+        results[name] = latency_summary(values)
+        results[name]["runs"] = len(values)
+    print_table(results, ["mean_ms", "p50_ms", "max_ms", "runs"])
+    save_results(args.output, "startup", results, {"runs": args.runs, "database": database_url.split("://")[0]})
+
+    if leaked:
+        for module, loaded in leaked.items():
+            print("import {} loaded heavy modules: {}".format(module, ", ".join(loaded)))
+        if args.check_lazy:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,12 +8,22 @@ interface ApiResponse {
   estimate_id?: number
   review_id?: number
   claim_id?: number
+  image_digest?: string
+  image_url?: string
+  thumbnail_urls?: Record<string, string>
 }
 
 type SectionStatus = 'locked' | 'active' | 'completed'
 
 type ProcessingMode = 'assisted' | 'automated' | 'fully_automated'
 
+// URL of the server-stored image (large thumbnail) for an analyze-damage response.
+// Persisted in localStorage instead of a base64 data URL of the whole photo.
+const getStoredImageUrl = (analyzeData: ApiResponse | null): string | null => {
+  const path = analyzeData?.thumbnail_urls?.['1024'] || analyzeData?.image_url
+  return path ? `http://localhost:8000${path}` : null
+}
+
 export default function ClaimDamageCostAssessment() {
   const router = useRouter()
   
@@ -58,6 +68,14 @@ export default function ClaimDamageCostAssessment() {
   // Labor rate for converting dollars to hours (standard auto repair rate)
   const LABOR_RATE_PER_HOUR = 100
   
+  // Release a blob: preview's object URL once it is replaced (new upload, stored image URL, cleared) or on unmount
+  useEffect(() => {
+    if (!imagePreview || !imagePreview.startsWith('blob:')) {
+      return
+    }
+    return () => URL.revokeObjectURL(imagePreview)
+  }, [imagePreview])
+
   // Load Claim Damage & Cost Assessment state from localStorage on mount
   useEffect(() => {
     const savedMode = localStorage.getItem('claimDamageCostAssessment_processingMode')
@@ -208,24 +226,20 @@ export default function ClaimDamageCostAssessment() {
 
       setUploadedImage(file)
       setError1(null)
-      // Create preview
-      const reader = new FileReader()
-      reader.onloadend = () => {
-        const previewUrl = reader.result as string
-        setImagePreview(previewUrl)
-        // Unlock Damage Analysis when image is uploaded
-        setDamageAnalysisStatus('active')
-        
-        // Trigger automated flows based on mode
-        // Use currentMode from closure to ensure we have the correct mode
-        // Pass file and previewUrl directly to avoid state timing issues
-        if (currentMode === 'automated') {
-          runAutomatedCostEstimate(file, previewUrl)
-        } else if (currentMode === 'fully_automated') {
-          runFullyAutomated(file, previewUrl)
-        }
+      // Create preview (object URL, no base64 copy of the image)
+      const previewUrl = URL.createObjectURL(file)
+      setImagePreview(previewUrl)
+      // Unlock Damage Analysis when image is uploaded
+      setDamageAnalysisStatus('active')
+
+      // Trigger automated flows based on mode
+      // Use currentMode from closure to ensure we have the correct mode
+      // Pass file directly to avoid state timing issues
+      if (currentMode === 'automated') {
+        runAutomatedCostEstimate(file)
+      } else if (currentMode === 'fully_automated') {
+        runFullyAutomated(file)
       }
-      reader.readAsDataURL(file)
     }
   }
 
@@ -329,7 +343,7 @@ export default function ClaimDamageCostAssessment() {
   }
 
   // Automated flow for "Automated Cost Estimate" mode
-  const runAutomatedCostEstimate = async (imageFile: File, imagePreviewUrl: string) => {
+  const runAutomatedCostEstimate = async (imageFile: File) => {
     if (!imageFile) {
       console.error('No image file provided for automated processing')
       return
@@ -420,14 +434,15 @@ export default function ClaimDamageCostAssessment() {
       localStorage.setItem('confirmedDamageAssessments', JSON.stringify(finalAssessments))
       localStorage.setItem('costEstimate', JSON.stringify(estimateData))
       
-      // Use the imagePreviewUrl passed as parameter
-      if (imagePreviewUrl) {
-        localStorage.setItem('uploadedImagePreview', imagePreviewUrl)
+      // Reference the server-stored image rather than the uploaded file
+      const storedImageUrl = getStoredImageUrl(analyzeData)
+      if (storedImageUrl) {
+        localStorage.setItem('uploadedImagePreview', storedImageUrl)
       }
 
       // Also save Claim Damage & Cost Assessment state for navigation back
-      if (imagePreviewUrl) {
-        localStorage.setItem('claimDamageCostAssessment_imagePreview', imagePreviewUrl)
+      if (storedImageUrl) {
+        localStorage.setItem('claimDamageCostAssessment_imagePreview', storedImageUrl)
       }
       localStorage.setItem('claimDamageCostAssessment_damageAnalysis', JSON.stringify(analyzeData))
       localStorage.setItem('claimDamageCostAssessment_confirmedDamageLabels', JSON.stringify(labels))
@@ -446,7 +461,7 @@ export default function ClaimDamageCostAssessment() {
   }
 
   // Automated flow for "Fully Automated Cost Estimate and Approval" mode
-  const runFullyAutomated = async (imageFile: File, imagePreviewUrl: string) => {
+  const runFullyAutomated = async (imageFile: File) => {
     if (!imageFile) {
       console.error('No image file provided for fully automated processing')
       return
@@ -528,8 +543,9 @@ export default function ClaimDamageCostAssessment() {
       
       localStorage.setItem('confirmedDamageAssessments', JSON.stringify(finalAssessments))
       localStorage.setItem('costEstimate', JSON.stringify(estimateData))
-      if (imagePreviewUrl) {
-        localStorage.setItem('uploadedImagePreview', imagePreviewUrl)
+      const storedImageUrl = getStoredImageUrl(analyzeData)
+      if (storedImageUrl) {
+        localStorage.setItem('uploadedImagePreview', storedImageUrl)
       }
 
       // Set flag for fully automated mode - Claim Approval & Authorization will auto-approve
@@ -726,10 +742,11 @@ export default function ClaimDamageCostAssessment() {
     setCostEstimationStatus('completed')
     
     // Save all Claim Damage & Cost Assessment state to localStorage for restoration when navigating back
-    if (imagePreview) {
-      localStorage.setItem('claimDamageCostAssessment_imagePreview', imagePreview)
+    const storedImageUrl = getStoredImageUrl(damageAnalysis)
+    if (storedImageUrl) {
+      localStorage.setItem('claimDamageCostAssessment_imagePreview', storedImageUrl)
       // Also save for Claim Approval & Authorization
-      localStorage.setItem('uploadedImagePreview', imagePreview)
+      localStorage.setItem('uploadedImagePreview', storedImageUrl)
     }
     if (damageAnalysis) {
       localStorage.setItem('claimDamageCostAssessment_damageAnalysis', JSON.stringify(damageAnalysis))
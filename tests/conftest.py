@@ -0,0 +1,46 @@
+"""Shared fixtures: each test gets a fresh SQLite database built from the models.
+
+Tests of PostgreSQL-only paths use `postgres_db` instead, which needs
+TEST_POSTGRES_URL and builds the schema inside a transaction it rolls back.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401  (registers the tables on Base.metadata)
+from app.database import Base
+from app.serialization import json_dumps, json_loads
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        "sqlite:///{}".format(tmp_path / "claims.db"), json_serializer=json_dumps, json_deserializer=json_loads
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def postgres_db():
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(url, json_serializer=json_dumps, json_deserializer=json_loads)
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        Base.metadata.create_all(connection)
+        # Commits inside the test become savepoints, so everything goes with the outer rollback
+        with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+            yield session
+        transaction.rollback()
+    engine.dispose()
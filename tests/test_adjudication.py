@@ -0,0 +1,97 @@
+import random
+
+from app.adjudication import (
+    DEFAULT_ACTION, DEFAULT_RULES, AdjudicationRule, CompiledRules, approved_amount, extract_features,
+)
+
+DAMAGE_TYPES = ["scratches", "dents", "structural_damage", "glass"]
+
+
+def _scalar_decision(rules, estimate_data, policy_claims):
+    """Reference evaluation: check each rule in order on one estimate; the first match decides."""
+    items = estimate_data.get("line_items") or []
+    types = {item["damage_type"] for item in items}
+    majors = {item["damage_type"] for item in items if item["damage_severity"] == "major"}
+    amount = approved_amount(estimate_data)
+    major_count = sum(1 for item in items if item["damage_severity"] == "major")
+    major_ratio = major_count / max(len(items), 1)
+
+    def within(value, low, high):
+        return (low is None or value >= low) and (high is None or value <= high)
+
+    for rule in rules:
+        if (
+            within(amount, rule.min_amount, rule.max_amount)
+            and within(major_count, rule.min_major_count, rule.max_major_count)
+            and within(major_ratio, rule.min_major_ratio, rule.max_major_ratio)
+            and within(policy_claims, rule.min_policy_claims, rule.max_policy_claims)
+            and (not rule.damage_types_any or types & set(rule.damage_types_any))
+            and not (types & set(rule.damage_types_none or ()))
+            and (not rule.major_damage_types_any or majors & set(rule.major_damage_types_any))
+        ):
+            return rule.name, rule.action
+    return "default", DEFAULT_ACTION
+
+
+def _estimate(items):
+    return {
+        "total_parts_cost": sum(parts for _, _, parts, _ in items),
+        "total_labor_cost": sum(labor for _, _, _, labor in items),
+        "line_items": [
+            {"damage_type": damage_type, "damage_severity": severity, "parts_cost": parts, "labor_cost": labor}
+            for damage_type, severity, parts, labor in items
+        ],
+    }
+
+
+def _cases():
+    # Boundaries of the default rules, overlapping matches and estimates with no line items
+    cases = [
+        (_estimate([]), 0),
+        (_estimate([("structural_damage", "major", 4000, 2000)]), 5),  # several escalations match
+        (_estimate([("dents", "minor", 1000, 500)]), 0),  # exactly max_amount 1500
+        (_estimate([("dents", "minor", 1000, 500.01)]), 0),
+        (_estimate([("scratches", "major", 2500, 2500)]), 0),  # exactly min_amount 5000
+        (_estimate([("structural_damage", "minor", 300, 200)]), 2),
+        (_estimate([("glass", "major", 800, 200), ("dents", "major", 300, 100)]), 3),
+        (_estimate([("scratches", "major", 1000, 500), ("dents", "minor", 500, 500)]), 0),
+    ]
+    rng = random.Random(0)
+    for _ in range(500):
+        items = [
+            (rng.choice(DAMAGE_TYPES), rng.choice(["minor", "major"]), rng.randrange(0, 3000), rng.randrange(0, 1500))
+            for _ in range(rng.randrange(0, 5))
+        ]
+        cases.append((_estimate(items), rng.randrange(0, 5)))
+    return cases
+
+
+def _vectorized_decisions(rules, cases):
+    compiled = CompiledRules(rules)
+    features = extract_features([estimate for estimate, _ in cases], [claims for _, claims in cases])
+    return [(compiled.names[index], compiled.actions[index]) for index in compiled.evaluate(features)]
+
+
+def test_compiled_default_rules_match_scalar_first_match_wins():
+    rules = [AdjudicationRule(**rule) for rule in DEFAULT_RULES]
+    cases = _cases()
+
+    decisions = _vectorized_decisions(rules, cases)
+
+    assert decisions == [_scalar_decision(rules, estimate, claims) for estimate, claims in cases]
+    # The structural, high-value, repeat-policy estimate is decided by the first of its three matches
+    assert decisions[1] == ("escalate_major_structural", "escalate")
+
+
+def test_rule_order_decides_between_overlapping_rules():
+    approve_all = AdjudicationRule(name="approve_all", action="approve")
+    escalate_dents = AdjudicationRule(name="escalate_dents", action="escalate", damage_types_any=["dents"])
+    cases = [(_estimate([("dents", "minor", 100, 100)]), 0), (_estimate([("scratches", "minor", 100, 100)]), 0)]
+
+    assert _vectorized_decisions([approve_all, escalate_dents], cases) == [
+        ("approve_all", "approve"), ("approve_all", "approve")
+    ]
+    assert _vectorized_decisions([escalate_dents, approve_all], cases) == [
+        ("escalate_dents", "escalate"), ("approve_all", "approve")
+    ]
+    assert _vectorized_decisions([], cases) == [("default", DEFAULT_ACTION)] * 2
@@ -0,0 +1,50 @@
+import asyncio
+
+from app import admission
+from app.metrics import REQUEST_ERRORS, REQUESTS_TOTAL, MetricsMiddleware
+
+
+def _count(metric, sample):
+    return sum(float(line.rsplit(" ", 1)[1]) for line in metric.render() if line.startswith(sample))
+
+
+def _run(app, path):
+    scope = {"type": "http", "method": "POST", "path": path, "headers": [], "claims.route_template": path}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def call():
+        await app(scope, receive, send)
+        # The lag probe started by the first request is not needed here
+        admission._lag_probe.cancel()
+
+    asyncio.run(call())
+    return messages[0]["status"]
+
+
+async def _failing_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 500, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def test_shed_requests_are_not_counted_as_server_errors(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_CONTROL_ENABLED", True)
+    monkeypatch.setattr(admission, "overload_level", lambda: 10.0)
+    app = MetricsMiddleware(admission.AdmissionControlMiddleware(_failing_app))
+    shed = 'http_requests_total{method="POST",handler="/test/shed",status="503"}'
+    errors = 'http_request_errors_total{method="POST",handler="/test/shed"}'
+    before = _count(REQUESTS_TOTAL, shed), _count(REQUEST_ERRORS, errors)
+
+    assert _run(app, "/test/shed") == 503
+    assert (_count(REQUESTS_TOTAL, shed), _count(REQUEST_ERRORS, errors)) == (before[0] + 1, before[1])
+
+    # Real failures behind the middleware still count
+    monkeypatch.setattr(admission, "overload_level", lambda: 0.0)
+    failed = 'http_request_errors_total{method="POST",handler="/test/failing"}'
+    assert _run(app, "/test/failing") == 500
+    assert _count(REQUEST_ERRORS, failed) == 1
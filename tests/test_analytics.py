@@ -0,0 +1,24 @@
+from datetime import date, datetime
+
+from app import analytics
+from app.models import RepairEstimate
+
+ESTIMATE = {
+    "total_base_cost": 100, "total_parts_cost": 50, "total_labor_cost": 150.0,
+    "line_items": [{"damage_type": "dents", "damage_severity": "minor", "base_cost": 100, "parts_cost": 50,
+                    "labor_cost": 150.0}],
+}
+
+
+def test_rebuild_since_starts_at_midnight_utc(db):
+    db.add_all([
+        RepairEstimate(estimate_data=ESTIMATE, created_at=datetime(2024, 3, 1, 23, 30)),
+        RepairEstimate(estimate_data=ESTIMATE, created_at=datetime(2024, 3, 2, 0, 30)),
+    ])
+    db.commit()
+
+    analytics.rebuild(db, since=date(2024, 3, 2))
+    db.commit()
+
+    rows = db.execute(analytics._rollups.select().where(analytics._rollups.c.damage_type == "dents")).all()
+    assert [(row.day, row.estimates) for row in rows] == [(date(2024, 3, 2), 1)]
@@ -0,0 +1,46 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from app.bulk_import import _copy_field, import_chunk, prepare_chunk
+from app.models import Claim, SeniorReview
+
+ESTIMATE = {"total_base_cost": 100, "total_parts_cost": 50, "total_labor_cost": 150.0, "line_items": []}
+
+
+def _chunk(*records):
+    return [(number, json.dumps(record).encode()) for number, record in enumerate(records, 1)]
+
+
+def test_imported_claims_get_the_stage_of_their_status(db):
+    claims, rejects = prepare_chunk(_chunk(
+        {"policy_number": "P-1", "damage_labels": ["dents"]},
+        {"policy_number": "P-2", "estimate": ESTIMATE},
+        {"policy_number": "P-3", "status": "approved", "estimate": ESTIMATE, "review": {"approved_amount": 300}},
+        {"policy_number": "P-4", "status": "denied", "damage_labels": ["dents"]},
+        {"policy_number": "P-5", "status": "escalated", "estimate": ESTIMATE},
+    ))
+    assert rejects == []
+
+    import_chunk(db, claims)
+    db.commit()
+
+    rows = db.query(Claim.policy_number, Claim.status, Claim.current_stage).order_by(Claim.id).all()
+    assert rows == [
+        ("P-1", "assessed", "damage_assessment"),
+        ("P-2", "pending_review", "repair_estimate"),
+        ("P-3", "approved", "senior_review"),
+        ("P-4", "denied", "senior_review"),
+        ("P-5", "escalated", "senior_review"),
+    ]
+    assert [review.claim_status for review in db.query(SeniorReview).order_by(SeniorReview.id)] == [
+        "approved", "denied", "escalated"
+    ]
+
+
+def test_copy_fields_quote_empty_strings_and_write_utc_timestamps():
+    assert _copy_field(None) == ""
+    assert _copy_field("") == '""'
+    assert _copy_field('say "hi"') == '"say ""hi"""'
+    assert _copy_field(datetime(2024, 3, 1, 23, 30)) == '"2024-03-01T23:30:00+00:00"'
+    eastern = timezone(timedelta(hours=-5))
+    assert _copy_field(datetime(2024, 3, 1, 20, 0, tzinfo=eastern)) == '"2024-03-02T01:00:00+00:00"'
@@ -0,0 +1,26 @@
+from io import BytesIO
+
+from PIL import Image
+
+from app import image_store
+
+
+def _oriented_jpeg(width: int, height: int, orientation: int) -> bytes:
+    exif = Image.Exif()
+    exif[0x0112] = orientation  # Orientation
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, "JPEG", exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def test_thumbnails_apply_exif_orientation(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_store, "IMAGE_STORE_DIR", str(tmp_path))
+    # A portrait phone photo: landscape pixels rotated 90 degrees by Orientation=6
+    upload = _oriented_jpeg(2048, 1536, 6)
+
+    stored = image_store.store_image(upload, image_store.decode_image(upload))
+
+    assert stored["thumbnails"] == [1024, 256]
+    for size in image_store.THUMBNAIL_SIZES:
+        with Image.open(image_store.thumbnail_path(stored["digest"], size)) as thumbnail:
+            assert thumbnail.size == (size * 3 // 4, size)
@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import select, true
+
+from app import analytics, persistence
+from app.models import Claim, DamageAssessment, RepairEstimate, SeniorReview, SystemLog
+
+ASSESSMENT = {"damage_assessments": [{"damage_type": "dents", "severity": "minor"}], "reasoning": "Dented door."}
+ESTIMATE = {
+    "total_base_cost": 100, "total_parts_cost": 50, "total_labor_cost": 150.0,
+    "line_items": [{"damage_type": "dents", "damage_severity": "minor", "base_cost": 100, "parts_cost": 50,
+                    "labor_cost": 150.0}],
+}
+APPROVAL = {"status": "approved", "approved_amount": 300.0}
+DENIAL = {"status": "denied", "denial_comments": "Pre-existing damage."}
+
+
+def _record_claims(db):
+    """Every stage write, including the cases that must not move a claim."""
+    persistence.record_damage_analysis(db, "P-1", ASSESSMENT, "one.jpg", "a" * 64)  # claim 1, assessment 1
+    persistence.record_damage_analysis(db, "P-2", ASSESSMENT, "two.jpg", None)  # claim 2, assessment 2
+    persistence.record_estimate(db, 1, ESTIMATE)  # estimate 1
+    persistence.record_estimate(db, 2, ESTIMATE)  # estimate 2
+    persistence.record_estimate(db, 1, ESTIMATE)  # estimate 3 supersedes estimate 1
+    persistence.record_estimate(db, None, ESTIMATE)  # estimate 4, no claim
+    persistence.record_review(db, 1, APPROVAL)  # stale estimate: claim 1 stays pending
+    persistence.record_review(db, 3, APPROVAL)
+    persistence.record_denial(db, 2, DENIAL, "Pre-existing damage.")
+    persistence.record_denial(db, 3, DENIAL, "Too late.")  # claim 1 is already approved
+    db.commit()
+
+
+def _rows(db):
+    return {
+        "claims": db.execute(select(
+            Claim.id, Claim.policy_number, Claim.status, Claim.current_stage, Claim.latest_estimate_id
+        ).order_by(Claim.id)).all(),
+        "assessments": db.execute(select(
+            DamageAssessment.id, DamageAssessment.claim_id, DamageAssessment.image_digest
+        ).order_by(DamageAssessment.id)).all(),
+        "estimates": db.execute(select(
+            RepairEstimate.id, RepairEstimate.claim_id, RepairEstimate.damage_assessment_id
+        ).order_by(RepairEstimate.id)).all(),
+        "reviews": db.execute(select(
+            SeniorReview.id, SeniorReview.claim_id, SeniorReview.repair_estimate_id, SeniorReview.claim_status
+        ).order_by(SeniorReview.id)).all(),
+        "logs": [
+            (log_type, log_data)
+            for log_type, log_data in db.execute(select(SystemLog.log_type, SystemLog.log_data).order_by(SystemLog.id))
+        ],
+        # Every write lands on today's rollups
+        "rollups": {
+            (damage_type, severity): totals
+            for (_, damage_type, severity), totals in analytics._current_totals(db, true()).items()
+        },
+    }
+
+
+EXPECTED = {
+    "claims": [
+        (1, "P-1", "approved", "senior_review", 3),
+        (2, "P-2", "denied", "senior_review", 2),
+    ],
+    "assessments": [(1, 1, "a" * 64), (2, 2, None)],
+    "estimates": [(1, 1, 1), (2, 2, 2), (3, 1, 1), (4, None, None)],
+    "reviews": [(1, 1, 1, None), (2, 1, 3, "approved"), (3, 2, 2, "denied"), (4, 1, 3, None)],
+    "logs": [
+        ("damage_analysis", {
+            "claim_id": 1, "result": ASSESSMENT, "image_filename": "one.jpg", "image_digest": "a" * 64
+        }),
+        ("damage_analysis", {
+            "claim_id": 2, "result": ASSESSMENT, "image_filename": "two.jpg", "image_digest": None
+        }),
+        ("estimate_generation", {"estimate_id": 1, "result": ESTIMATE}),
+        ("estimate_generation", {"estimate_id": 2, "result": ESTIMATE}),
+        ("estimate_generation", {"estimate_id": 3, "result": ESTIMATE}),
+        ("estimate_generation", {"estimate_id": 4, "result": ESTIMATE}),
+        ("claim_approval_authorization", {"review_id": 1, "result": APPROVAL}),
+        ("claim_approval_authorization", {"review_id": 2, "result": APPROVAL}),
+        ("claim_denial", {"review_id": 3, "comments": "Pre-existing damage."}),
+        ("claim_denial", {"review_id": 4, "comments": "Too late."}),
+    ],
+}
+
+
+@pytest.mark.parametrize("session", ["db", "postgres_db"])
+def test_cte_and_fallback_writes_produce_the_same_rows(session, request):
+    """The SQLite fallback and the PostgreSQL CTEs must agree row for row."""
+    db = request.getfixturevalue(session)
+    assert persistence._supports_cte_writes(db) == (session == "postgres_db")
+
+    _record_claims(db)
+
+    rows = _rows(db)
+    rollups = rows.pop("rollups")
+    assert rows == EXPECTED
+    # Four estimates, and one approval and one denial that moved their claims
+    assert {column: rollups[("dents", "minor")][column] for column in ("estimates", "approvals", "denials")} == {
+        "estimates": 4, "approvals": 1, "denials": 1
+    }
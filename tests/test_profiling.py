@@ -0,0 +1,22 @@
+import os
+import signal
+
+import pytest
+
+from app import profiling
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR2"), reason="needs SIGUSR2")
+def test_signal_toggles_profiling_while_the_main_thread_holds_the_lock():
+    previous = signal.getsignal(signal.SIGUSR2)
+    assert profiling.install_signal_handler()
+    try:
+        with profiling.profiler._lock:
+            # The handler runs on this thread, inside the critical section
+            os.kill(os.getpid(), signal.SIGUSR2)
+            assert profiling.profiler.enabled
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert not profiling.profiler.enabled
+    finally:
+        profiling.profiler.disable()
+        signal.signal(signal.SIGUSR2, previous)
@@ -0,0 +1,30 @@
+from app.models import SeniorReview
+from app.search import _START_SEL, _STOP_SEL, _markup_headline, search
+
+PAYLOAD = "bumper <script>x</script> fraud"
+
+
+def test_substring_highlight_escapes_stored_html(db):
+    db.add(SeniorReview(claim_id=1, review_data={"status": "denied", "denial_comments": PAYLOAD}))
+    db.commit()
+
+    [result] = search(db, "script", sources=["denials"])
+
+    assert result["highlight"] == "bumper &lt;<mark>script</mark>&gt;x&lt;/<mark>script</mark>&gt; fraud"
+
+
+def test_substring_highlight_without_terms_is_escaped(db):
+    db.add(SeniorReview(claim_id=1, review_data={"status": "denied", "denial_comments": PAYLOAD}))
+    db.commit()
+
+    [result] = search(db, "<>", sources=["denials"])
+
+    assert result["highlight"] == "bumper &lt;script&gt;x&lt;/script&gt; fraud"
+
+
+def test_headline_markup_escapes_text_between_selectors():
+    # What ts_headline returns for the payload on PostgreSQL, with the control-character selectors
+    headline = "bumper <{0}script{1}>x</{0}script{1}> fraud".format(_START_SEL, _STOP_SEL)
+
+    assert _markup_headline(headline) == "bumper &lt;<mark>script</mark>&gt;x&lt;/<mark>script</mark>&gt; fraud"
+    assert _markup_headline(None) is None